@@ -0,0 +1,225 @@
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from call_store import CallStore, CallStoreTransaction
+
+
+logger = logging.getLogger(__name__)
+
+# Dimensions every completed call is folded into, one bucket per (key, day).
+ANALYTICS_DIMENSIONS = ("all", "agent", "purpose", "program")
+
+_MEASURES = (
+    "calls",
+    "positive_calls",
+    "neutral_calls",
+    "negative_calls",
+    "success_calls",
+    "pending_calls",
+    "unsuccessful_calls",
+    "positive_segments",
+    "neutral_segments",
+    "negative_segments",
+    "duration_ms",
+)
+
+_UNKNOWN_KEY = "unknown"
+# Day bucket of calls without a start time; kept out of every date-bounded query.
+_UNDATED_DAY = "unknown"
+
+
+def _day_from_timestamp(timestamp: Any) -> str:
+    if isinstance(timestamp, (int, float)) and timestamp > 0:
+        # Retell timestamps are epoch milliseconds
+        return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+    return _UNDATED_DAY
+
+
+def _category_counts(analysis_results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Segment category counts, from the merged result when there is one."""
+    counts = {"positive": 0, "neutral": 0, "negative": 0}
+    combined = [r for r in analysis_results if "_combined" in (r.get("filename") or "").lower()]
+    for result in combined[:1] or analysis_results:
+        for source in ("prosody", "burst"):
+            for segment in result.get(source) or []:
+                category = segment.get("primary_category")
+                if category in counts:
+                    counts[category] += 1
+    return counts
+
+
+def call_contribution(
+    call_id: str,
+    entry: Dict[str, Any],
+    analysis_results: Optional[List[Dict[str, Any]]] = None,
+    program: Optional[str] = None,
+) -> Dict[str, Any]:
+    """What one analysed call adds to every aggregate it belongs to."""
+    overall = entry.get("overall_emotion") or {}
+    label = overall.get("label") or entry.get("overall_emotion_label")
+    outcome = overall.get("call_outcome")
+    counts = _category_counts(analysis_results or [])
+    duration_ms = entry.get("duration_ms")
+    return {
+        "call_id": call_id,
+        "day": _day_from_timestamp(entry.get("start_timestamp")),
+        "keys": {
+            "all": "",
+            "agent": entry.get("agent_name") or entry.get("agent_id") or _UNKNOWN_KEY,
+            "purpose": entry.get("call_purpose") or _UNKNOWN_KEY,
+            "program": program or _UNKNOWN_KEY,
+        },
+        "measures": {
+            "calls": 1,
+            "positive_calls": int(label == "positive"),
+            "neutral_calls": int(label == "neutral"),
+            "negative_calls": int(label == "negative"),
+            "success_calls": int(outcome == "success"),
+            "pending_calls": int(outcome == "pending"),
+            "unsuccessful_calls": int(outcome == "unsuccessful"),
+            "positive_segments": counts["positive"],
+            "neutral_segments": counts["neutral"],
+            "negative_segments": counts["negative"],
+            "duration_ms": int(duration_ms) if isinstance(duration_ms, (int, float)) else 0,
+        },
+    }
+
+
+def _with_rates(row: Dict[str, Any]) -> Dict[str, Any]:
+    calls = row.get("calls") or 0
+    segments = sum(row.get(f"{label}_segments", 0) for label in ("positive", "neutral", "negative"))
+    row["negative_call_rate"] = round(row["negative_calls"] / calls, 4) if calls else None
+    row["success_rate"] = round(row["success_calls"] / calls, 4) if calls else None
+    row["negative_segment_rate"] = round(row["negative_segments"] / segments, 4) if segments else None
+    row["average_duration_ms"] = round(row["duration_ms"] / calls) if calls else None
+    return row
+
+
+class AnalyticsStore:
+    """
+    Incrementally maintained cross-call aggregates in the call store database.
+
+    Each analysed call's contribution is kept in ``analytics_calls`` so a
+    re-analysis first subtracts what the call added before; aggregates are
+    bucketed per (dimension, key, day) and queries only read buckets.
+    """
+
+    def __init__(self, store: CallStore):
+        self.store = store
+        self._initialize()
+
+    def _initialize(self) -> None:
+        measure_columns = ", ".join(f"{name} INTEGER NOT NULL DEFAULT 0" for name in _MEASURES)
+        with self.store.transaction() as txn:
+            txn.connection.execute(
+                "CREATE TABLE IF NOT EXISTS analytics_calls ("
+                "call_id TEXT PRIMARY KEY, day TEXT NOT NULL, keys TEXT NOT NULL, measures TEXT NOT NULL)"
+            )
+            txn.connection.execute(
+                "CREATE TABLE IF NOT EXISTS analytics_aggregates ("
+                "dimension TEXT NOT NULL, key TEXT NOT NULL, day TEXT NOT NULL, "
+                f"{measure_columns}, PRIMARY KEY (dimension, day, key))"
+            )
+
+    @staticmethod
+    def _apply(txn: CallStoreTransaction, day: str, keys: Dict[str, str], measures: Dict[str, int], sign: int) -> None:
+        columns = ", ".join(_MEASURES)
+        placeholders = ", ".join("?" for _ in _MEASURES)
+        updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in _MEASURES)
+        values = [sign * int(measures.get(name, 0)) for name in _MEASURES]
+        for dimension in ANALYTICS_DIMENSIONS:
+            txn.connection.execute(
+                f"INSERT INTO analytics_aggregates (dimension, key, day, {columns}) "
+                f"VALUES (?, ?, ?, {placeholders}) "
+                f"ON CONFLICT(dimension, day, key) DO UPDATE SET {updates}",
+                [dimension, keys.get(dimension, _UNKNOWN_KEY), day, *values],
+            )
+
+    def _fold(self, txn: CallStoreTransaction, contribution: Dict[str, Any]) -> None:
+        call_id = contribution["call_id"]
+        previous = txn.connection.execute(
+            "SELECT day, keys, measures FROM analytics_calls WHERE call_id = ?", (call_id,)
+        ).fetchone()
+        if previous is not None:
+            self._apply(txn, previous[0], json.loads(previous[1]), json.loads(previous[2]), -1)
+        self._apply(txn, contribution["day"], contribution["keys"], contribution["measures"], 1)
+        txn.connection.execute(
+            "INSERT INTO analytics_calls (call_id, day, keys, measures) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(call_id) DO UPDATE SET day = excluded.day, keys = excluded.keys, "
+            "measures = excluded.measures",
+            (call_id, contribution["day"], json.dumps(contribution["keys"]), json.dumps(contribution["measures"])),
+        )
+
+    def record(self, contribution: Dict[str, Any]) -> None:
+        """Fold one call into the aggregates, replacing its previous contribution."""
+        with self.store.transaction() as txn:
+            self._fold(txn, contribution)
+
+    def rebuild(self, contributions: Iterable[Dict[str, Any]]) -> int:
+        """Recompute every aggregate from scratch in one transaction."""
+        count = 0
+        with self.store.transaction() as txn:
+            txn.connection.execute("DELETE FROM analytics_aggregates")
+            txn.connection.execute("DELETE FROM analytics_calls")
+            for contribution in contributions:
+                self._fold(txn, contribution)
+                count += 1
+            txn.connection.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('analytics_built', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (datetime.utcnow().replace(microsecond=0).isoformat() + "Z",),
+            )
+        return count
+
+    def is_built(self) -> bool:
+        with self.store.snapshot() as txn:
+            row = txn.connection.execute(
+                "SELECT 1 FROM store_meta WHERE key = 'analytics_built'"
+            ).fetchone()
+        return row is not None
+
+    def query(
+        self,
+        dimension: str,
+        start_day: Optional[str] = None,
+        end_day: Optional[str] = None,
+        key: Optional[str] = None,
+        by_day: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregates for one dimension between two ``YYYY-MM-DD`` days (inclusive).
+
+        Rows are grouped by key, or by (day, key) with ``by_day``. Calls
+        without a start time only count when neither bound is given.
+        """
+        if dimension not in ANALYTICS_DIMENSIONS:
+            raise ValueError(f"Unknown analytics dimension: {dimension}")
+        conditions = ["dimension = ?"]
+        params: List[Any] = [dimension]
+        if start_day or end_day:
+            # The undated bucket would otherwise compare as a day after every ISO date
+            conditions.append("day != ?")
+            params.append(_UNDATED_DAY)
+        if start_day:
+            conditions.append("day >= ?")
+            params.append(start_day)
+        if end_day:
+            conditions.append("day <= ?")
+            params.append(end_day)
+        if key is not None:
+            conditions.append("key = ?")
+            params.append(key)
+        group: Tuple[str, ...] = ("day", "key") if by_day else ("key",)
+        sums = ", ".join(f"SUM({name}) AS {name}" for name in _MEASURES)
+        sql = (
+            f"SELECT {', '.join(group)}, {sums} FROM analytics_aggregates "
+            f"WHERE {' AND '.join(conditions)} GROUP BY {', '.join(group)} "
+            f"HAVING SUM(calls) > 0 ORDER BY {', '.join(group)}"
+        )
+        with self.store.snapshot() as txn:
+            cursor = txn.connection.execute(sql, params)
+            names = [description[0] for description in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        return [_with_rates(row) for row in rows]
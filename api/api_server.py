@@ -1,13 +1,16 @@
 
+import copy
+import hmac
 import json
 import logging
 import os
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Callable, Optional, List, Set, Tuple
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Depends, status, Body, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Depends, status, Body, BackgroundTasks, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
@@ -15,15 +18,73 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from fastapi.concurrency import run_in_threadpool
+
+import audio_chunking
+import audio_encoding
+import audio_gating
+import emotion_categories
+import prediction_engine
+from analytics_store import AnalyticsStore, call_contribution
+from call_store import CallStore
+from score_store import StoredScores, score_matrix_available
+from search_index import SearchIndex
+from timeline import (
+    DEFAULT_TIMELINE_RESOLUTION,
+    MIN_TIMELINE_RESOLUTION,
+    TIMELINE_VERSION,
+    bucket_rollup,
+    build_timeline,
+    collect_timeline_segments,
+    find_emotion_shifts,
+    timeline_view,
+)
+from llm_batch import BatchCollectingClient, OpenAIBatchRunner, PendingBatchRequest, collect_pending
+from pipeline_stages import (
+    code_fingerprint,
+    is_stale,
+    module_fingerprint,
+    parse_stages,
+    stage_fingerprint,
+    stage_record,
+)
+from prompt_compaction import collapse_segment_runs, compact_summary_data
+from http_clients import get_client_registry
+from metrics import ANALYSIS_TASKS, REGISTRY, current_timings, record_timings, stage_span
+from profiling import list_profiles, load_profile, profile_paths, profile_run
+from resilience import resilience_metrics
+from tracing import (
+    attached_context,
+    configure_tracing,
+    framework_traces_requests,
+    inject_context,
+    mark_span_error,
+    set_span_attributes,
+    shutdown_tracing,
+    start_span,
+)
+from webhook_dedup import RecentEventIndex, payload_fingerprint
+from webhook_log import WebhookLog
 from extractor import (
+    OPENAI_COMBINED_ANALYSIS,
+    _find_best_transcript_match,
+    analyze_call_with_llm,
     analyze_audio_files,
     derive_short_call_title,
+    determine_overall_call_emotion,
     download_retell_recording,
+    enrich_results_with_transcript,
     extract_retell_transcript_segments,
+    extract_top_emotions,
     generate_call_purpose_from_summary,
+    generate_call_title_from_summary,
     get_openai_client,
+    get_retell_call_cache_stats,
     get_retell_call_details,
+    retell_talk_time,
     split_stereo_wav_channels,
+    submit_hume_job,
+    summarize_predictions_with_usage,
 )
 
 
@@ -36,6 +97,8 @@ AUTH_PASSWORD = os.getenv("AUTH_PASSWORD", "password")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
+# Static bearer token Prometheus can scrape /metrics with; a login JWT works as well.
+METRICS_SCRAPE_TOKEN = os.getenv("METRICS_SCRAPE_TOKEN", "")
 
 security = HTTPBearer()
 
@@ -44,15 +107,42 @@ RETELL_CALLS_FILENAME = os.getenv(
     "RETELL_CALLS_FILENAME",
     os.path.join(RETELL_RESULTS_DIR, "retell_calls.json"),
 )
+RETELL_CALLS_DB = os.getenv(
+    "RETELL_CALLS_DB",
+    os.path.join(RETELL_RESULTS_DIR, "retell_calls.db"),
+)
 RETELL_AUDIO_DIR = os.path.join(RETELL_RESULTS_DIR, "audio")
+RETELL_WEBHOOK_LOG_DIR = os.getenv(
+    "RETELL_WEBHOOK_LOG_DIR",
+    os.path.join(RETELL_RESULTS_DIR, "webhook_log"),
+)
+RETELL_WEBHOOK_LOG_ENABLED = os.getenv("RETELL_WEBHOOK_LOG_ENABLED", "true").lower() in {"1", "true", "yes"}
+# Threads generating the LLM purpose and title of calls folded in from the webhook log.
+RETELL_WEBHOOK_ENRICH_WORKERS = max(1, int(os.getenv("RETELL_WEBHOOK_ENRICH_WORKERS", "4")))
+
+# Calls whose timed transcript has the customer talking for less than this many seconds are
+# blocked before any audio is downloaded; 0 disables the check.
+CALL_MIN_CUSTOMER_SPEECH_SECONDS = float(os.getenv("CALL_MIN_CUSTOMER_SPEECH_SECONDS", "0"))
+# A channel whose speaker talked for less than this many seconds is left out of the Hume job; 0 sends both.
+HUME_CHANNEL_MIN_SPEECH_SECONDS = float(os.getenv("HUME_CHANNEL_MIN_SPEECH_SECONDS", "0"))
 
 if not os.path.exists(RETELL_RESULTS_DIR):
     os.makedirs(RETELL_RESULTS_DIR, exist_ok=True)
 
-_RETELL_CALLS_LOCK = threading.Lock()
 if not os.path.exists(RETELL_AUDIO_DIR):
     os.makedirs(RETELL_AUDIO_DIR, exist_ok=True)
 
+# Shared across uvicorn workers; the legacy JSON file is imported once on first start.
+_CALL_STORE = CallStore(RETELL_CALLS_DB, legacy_json_path=RETELL_CALLS_FILENAME)
+_WEBHOOK_EVENTS = RecentEventIndex(_CALL_STORE)
+_ANALYTICS = AnalyticsStore(_CALL_STORE)
+_SEARCH_INDEX = SearchIndex(_CALL_STORE)
+# Keeps OpenAI latency off the webhook log compactor
+_ENRICHMENT_EXECUTOR = ThreadPoolExecutor(max_workers=RETELL_WEBHOOK_ENRICH_WORKERS, thread_name_prefix="webhook-enrich")
+
+# Statuses a redelivered webhook must not reset back to "pending".
+_WEBHOOK_STICKY_STATUSES = {"processing", "completed"}
+
 app = FastAPI(title="Hume Emotion Analysis API")
 
 # Enable CORS for frontend access
@@ -65,6 +155,30 @@ app.add_middleware(
 )
 
 
+async def _trace_http_request(request: Request, call_next):
+    """Server span per request, continuing a caller's ``traceparent`` when one is sent."""
+    with start_span(
+        f"{request.method} {request.url.path}",
+        kind="server",
+        attributes={"http.request.method": request.method, "url.path": request.url.path},
+        carrier=dict(request.headers),
+    ) as span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if span is not None and route is not None:
+            # Name by route template so per-call URLs group together
+            span.update_name(f"{request.method} {route.path}")
+            span.set_attribute("http.route", route.path)
+        set_span_attributes(span, {"http.response.status_code": response.status_code})
+        if response.status_code >= 500:
+            mark_span_error(span, str(response.status_code))
+        return response
+
+
+if configure_tracing() and not framework_traces_requests():
+    app.middleware("http")(_trace_http_request)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -154,7 +268,8 @@ async def analyze_audio(file: UploadFile = File(...), token_data: Dict[str, Any]
 
         file_contents = [(filename, file_content)]
 
-        results = analyze_audio_files(file_contents, include_summary=True)
+        with record_timings("upload") as timings:
+            results = analyze_audio_files(file_contents, include_summary=True)
 
         if not results:
             raise HTTPException(
@@ -164,6 +279,7 @@ async def analyze_audio(file: UploadFile = File(...), token_data: Dict[str, Any]
 
         analysis_payload = results[0]
         analysis_payload.setdefault("metadata", {})["analysis_type"] = "custom_upload"
+        analysis_payload["metadata"]["timings"] = timings.as_dict()
 
         return JSONResponse(
             content={
@@ -193,29 +309,20 @@ def _prune_zero_duration_calls(calls: Dict[str, Any]) -> Dict[str, Any]:
     if not removed_ids:
         return calls
 
-    for call_id in removed_ids:
-        logger.info("Removing zero-duration Retell call %s from metadata store", call_id)
-        calls.pop(call_id, None)
+    with _CALL_STORE.transaction() as txn:
+        for call_id in removed_ids:
+            logger.info("Removing zero-duration Retell call %s from metadata store", call_id)
+            calls.pop(call_id, None)
+            # Re-check inside the transaction in case another worker updated the entry
+            current = txn.get(call_id)
+            if current is not None and _is_zero_duration_call(current):
+                txn.delete(call_id)
 
-    _save_retell_calls(calls)
     return calls
 
 
 def _load_retell_calls() -> Dict[str, Any]:
-    if not os.path.exists(RETELL_CALLS_FILENAME):
-        return {}
-
-    try:
-        with open(RETELL_CALLS_FILENAME, "r", encoding="utf-8") as file:
-            data = json.load(file)
-            if isinstance(data, dict):
-                calls = data.get("calls")
-                if isinstance(calls, dict):
-                    return _prune_zero_duration_calls(dict(calls))
-    except json.JSONDecodeError:
-        logger.error("Failed to decode %s; resetting call metadata store", RETELL_CALLS_FILENAME)
-
-    return {}
+    return _prune_zero_duration_calls(_CALL_STORE.load_all())
 
 
 def _calculate_duration_ms(call_data: Dict[str, Any]) -> Optional[int]:
@@ -245,11 +352,6 @@ def _is_zero_duration_call(call_data: Dict[str, Any]) -> bool:
     return duration_ms <= 0
 
 
-def _save_retell_calls(calls: Dict[str, Any]) -> None:
-    with open(RETELL_CALLS_FILENAME, "w", encoding="utf-8") as file:
-        json.dump({"calls": calls}, file, indent=2)
-
-
 def _normalize_retell_payload(payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
     """
     Normalize Retell webhook payload to handle multiple formats:
@@ -319,6 +421,14 @@ def _evaluate_call_constraints(call_data: Dict[str, Any]) -> Dict[str, Any]:
 
     too_short = duration_ms is not None and duration_ms < 15_000
 
+    # Only a timed transcript can show the customer never really spoke
+    talk_time = retell_talk_time(call_data)
+    no_customer_speech = (
+        CALL_MIN_CUSTOMER_SPEECH_SECONDS > 0
+        and talk_time is not None
+        and talk_time["Customer"] < CALL_MIN_CUSTOMER_SPEECH_SECONDS
+    )
+
     call_summary = ""
     if isinstance(call_analysis, dict):
         call_summary = call_analysis.get("call_summary") or ""
@@ -360,6 +470,9 @@ def _evaluate_call_constraints(call_data: Dict[str, Any]) -> Dict[str, Any]:
     elif too_short:
         analysis_allowed = False
         block_reason = "Call too short, insufficient audio for analysis."
+    elif no_customer_speech:
+        analysis_allowed = False
+        block_reason = "Customer barely spoke; nothing to analyze."
 
     constraints_detail = {
         "voicemail_detected": voicemail_detected,
@@ -373,6 +486,8 @@ def _evaluate_call_constraints(call_data: Dict[str, Any]) -> Dict[str, Any]:
         },
         "too_short": too_short,
         "duration_ms": duration_ms,
+        "talk_time_seconds": talk_time,
+        "no_customer_speech": no_customer_speech,
     }
 
     return {
@@ -382,33 +497,110 @@ def _evaluate_call_constraints(call_data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def _upsert_retell_call_metadata(call_data: Dict[str, Any], status: Optional[str] = None) -> Dict[str, Any]:
+def _extract_call_summary_text(call_data: Dict[str, Any]) -> Optional[str]:
+    call_analysis = call_data.get("call_analysis")
+    if isinstance(call_analysis, dict):
+        summary_candidate = call_analysis.get("call_summary") or call_analysis.get("summary")
+        if isinstance(summary_candidate, str) and summary_candidate.strip():
+            return summary_candidate.strip()
+    for key in ("summary", "call_summary"):
+        summary_candidate = call_data.get(key)
+        if isinstance(summary_candidate, str) and summary_candidate.strip():
+            return summary_candidate.strip()
+    return None
+
+
+def _resolve_analysis_status(existing: Dict[str, Any], status: Optional[str]) -> str:
+    """Keep in-flight and finished analyses when a webhook is redelivered."""
+    current_status = existing.get("analysis_status")
+    if status == "pending" and current_status in _WEBHOOK_STICKY_STATUSES:
+        return current_status
+    return status or current_status or "pending"
+
+
+def _build_call_metadata(
+    existing: Dict[str, Any],
+    call_id: str,
+    call_data: Dict[str, Any],
+    status: Optional[str],
+) -> Dict[str, Any]:
+    merged: Dict[str, Any] = {
+        **existing,
+        "call_id": call_id,
+        "analysis_status": _resolve_analysis_status(existing, status),
+        "analysis_available": existing.get("analysis_available", False),
+        "analysis_filename": existing.get("analysis_filename"),
+        "duration_ms": call_data.get("duration_ms") or existing.get("duration_ms"),
+    }
+    # Partial payloads only touch the fields they carry
+    for key in (
+        "agent_id",
+        "agent_name",
+        "user_phone_number",
+        "start_timestamp",
+        "end_timestamp",
+        "recording_multi_channel_url",
+    ):
+        value = call_data.get(key)
+        merged[key] = value if value is not None else existing.get(key)
+
+    duration_ms = _calculate_duration_ms(merged)
+    if duration_ms is not None:
+        merged["duration_ms"] = duration_ms
+    return merged
+
+
+def _call_enrichment(call_data: Dict[str, Any], metadata: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """LLM purpose and title for a webhook call, for whichever of the two ``metadata`` still lacks."""
+    call_summary_text = _extract_call_summary_text(call_data)
+    call_purpose: Optional[str] = None
+    call_title: Optional[str] = None
+    if call_summary_text and not metadata.get("call_purpose"):
+        call_purpose = generate_call_purpose_from_summary(call_summary_text, openai_client=get_openai_client())
+    if not metadata.get("call_title"):
+        call_title = derive_short_call_title(
+            call_data,
+            fallback_summary=call_summary_text,
+        )
+    return call_purpose, call_title
+
+
+def _upsert_retell_call_metadata(
+    call_data: Dict[str, Any],
+    status: Optional[str] = None,
+    enrich: bool = True,
+) -> Dict[str, Any]:
+    """
+    Merge webhook call data into the store.
+
+    With ``enrich`` the LLM purpose and title are generated first; callers
+    that must not wait on OpenAI pass ``enrich=False`` and run
+    ``_enrich_retell_call_metadata`` later.
+    """
     call_id = call_data.get("call_id")
     if not call_id:
         raise ValueError("call_data must include call_id")
 
-    with _RETELL_CALLS_LOCK:
-        calls = _load_retell_calls()
-        existing = calls.get(call_id, {})
+    # LLM and constraint work happens before the write transaction so other
+    # workers are not blocked on OpenAI latency while the store is locked.
+    snapshot = _CALL_STORE.get(call_id) or {}
+    snapshot_merged = _build_call_metadata(snapshot, call_id, call_data, status)
+    snapshot_duration = _calculate_duration_ms(snapshot_merged)
+    skip_enrichment = not enrich or (snapshot_duration is not None and snapshot_duration <= 0)
 
-        merged: Dict[str, Any] = {
-            **existing,
-            "call_id": call_id,
-            "agent_id": call_data.get("agent_id"),
-            "agent_name": call_data.get("agent_name"),
-            "user_phone_number": call_data.get("user_phone_number"),
-            "start_timestamp": call_data.get("start_timestamp"),
-            "end_timestamp": call_data.get("end_timestamp"),
-            "recording_multi_channel_url": call_data.get("recording_multi_channel_url"),
-            "analysis_status": status or existing.get("analysis_status", "pending"),
-            "analysis_available": existing.get("analysis_available", False),
-            "analysis_filename": existing.get("analysis_filename"),
-            "duration_ms": call_data.get("duration_ms") or existing.get("duration_ms"),
-        }
+    call_summary_text = _extract_call_summary_text(call_data)
+    call_purpose: Optional[str] = None
+    call_title: Optional[str] = None
+
+    if not skip_enrichment:
+        call_purpose, call_title = _call_enrichment(call_data, snapshot_merged)
+
+    constraints = _evaluate_call_constraints(call_data)
 
+    with _CALL_STORE.transaction() as txn:
+        existing = txn.get(call_id) or {}
+        merged = _build_call_metadata(existing, call_id, call_data, status)
         duration_ms = _calculate_duration_ms(merged)
-        if duration_ms is not None:
-            merged["duration_ms"] = duration_ms
 
         if duration_ms is not None and duration_ms <= 0:
             logger.info("Skipping Retell call %s due to zero duration", call_id)
@@ -422,43 +614,16 @@ def _upsert_retell_call_metadata(call_data: Dict[str, Any], status: Optional[str
                 "analysis_filename": None,
                 "error_message": None,
             }
-            if call_id in calls:
-                calls.pop(call_id)
-                _save_retell_calls(calls)
+            txn.delete(call_id)
             return zero_duration_response
 
-        call_summary_text: Optional[str] = None
-        call_analysis = call_data.get("call_analysis")
-        if isinstance(call_analysis, dict):
-            summary_candidate = call_analysis.get("call_summary") or call_analysis.get("summary")
-            if isinstance(summary_candidate, str) and summary_candidate.strip():
-                call_summary_text = summary_candidate.strip()
-        if not call_summary_text:
-            for key in ("summary", "call_summary"):
-                summary_candidate = call_data.get(key)
-                if isinstance(summary_candidate, str) and summary_candidate.strip():
-                    call_summary_text = summary_candidate.strip()
-                    break
-
-        llm_client = None
-
         if call_summary_text:
             merged["call_summary"] = call_summary_text
-            if not merged.get("call_purpose"):
-                llm_client = llm_client or get_openai_client()
-                purpose = generate_call_purpose_from_summary(call_summary_text, openai_client=llm_client)
-                if purpose:
-                    merged["call_purpose"] = purpose
-
-        if not merged.get("call_title"):
-            call_title = derive_short_call_title(
-                call_data,
-                fallback_summary=call_summary_text,
-            )
-            if call_title:
-                merged["call_title"] = call_title
+        if call_purpose and not merged.get("call_purpose"):
+            merged["call_purpose"] = call_purpose
+        if call_title and not merged.get("call_title"):
+            merged["call_title"] = call_title
 
-        constraints = _evaluate_call_constraints(call_data)
         merged["analysis_allowed"] = constraints["analysis_allowed"]
         merged["analysis_block_reason"] = constraints["analysis_block_reason"]
         merged["analysis_constraints"] = constraints["constraints"]
@@ -478,17 +643,53 @@ def _upsert_retell_call_metadata(call_data: Dict[str, Any], status: Optional[str
             merged["transcript_object"] = existing.get("transcript_object")
             merged["transcript_available"] = True
 
+        unchanged = bool(existing) and all(
+            merged.get(key) == existing.get(key)
+            for key in set(merged) | set(existing)
+            if key != "last_updated"
+        )
+        if unchanged:
+            return existing
+
         merged["last_updated"] = _current_timestamp_iso()
-        calls[call_id] = merged
-        _save_retell_calls(calls)
+        txn.put(call_id, merged)
 
     return merged
 
 
+def _enrich_retell_call_metadata(call_data: Dict[str, Any]) -> None:
+    """Fill in the LLM purpose and title of a stored webhook call that has neither yet."""
+    call_id = call_data.get("call_id")
+    entry = _CALL_STORE.get(call_id) if call_id else None
+    if not entry:
+        return
+    duration_ms = _calculate_duration_ms(entry)
+    if duration_ms is not None and duration_ms <= 0:
+        return
+    call_purpose, call_title = _call_enrichment(call_data, entry)
+    if not call_purpose and not call_title:
+        return
+
+    with _CALL_STORE.transaction() as txn:
+        current = txn.get(call_id)
+        if current is None:
+            return
+        # The analysis may have filled them in meanwhile; never overwrite
+        changed = False
+        if call_purpose and not current.get("call_purpose"):
+            current["call_purpose"] = call_purpose
+            changed = True
+        if call_title and not current.get("call_title"):
+            current["call_title"] = call_title
+            changed = True
+        if changed:
+            current["last_updated"] = _current_timestamp_iso()
+            txn.put(call_id, current)
+
+
 def _update_retell_call_entry(call_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
-    with _RETELL_CALLS_LOCK:
-        calls = _load_retell_calls()
-        entry = calls.get(call_id)
+    with _CALL_STORE.transaction() as txn:
+        entry = txn.get(call_id)
         if entry is None:
             raise KeyError(f"Call {call_id} not found")
 
@@ -509,29 +710,62 @@ def _update_retell_call_entry(call_id: str, updates: Dict[str, Any]) -> Dict[str
             entry.setdefault("analysis_status", "blocked")
             entry["error_message"] = None
 
-        calls[call_id] = entry
-        _save_retell_calls(calls)
+        txn.put(call_id, entry)
 
         return entry
 
 
+def _claim_retell_call_for_analysis(call_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Atomically mark a call as processing.
+
+    Returns the updated entry, or None when another request (possibly in a
+    different worker process) has already claimed the call.
+    """
+    with _CALL_STORE.transaction() as txn:
+        entry = txn.get(call_id)
+        if entry is None:
+            raise KeyError(f"Call {call_id} not found")
+        if entry.get("analysis_status") == "processing":
+            return None
+
+        entry["analysis_status"] = "processing"
+        entry["error_message"] = None
+        entry["last_updated"] = _current_timestamp_iso()
+        txn.put(call_id, entry)
+        return entry
+
+
 def _get_retell_call_entry(call_id: str) -> Optional[Dict[str, Any]]:
-    with _RETELL_CALLS_LOCK:
-        calls = _load_retell_calls()
-        entry = calls.get(call_id)
+    entry = _CALL_STORE.get(call_id)
+    if entry is not None and _is_zero_duration_call(entry):
+        return None
     return entry
 
 
 def _refresh_call_metadata(call_id: str) -> Dict[str, Any]:
-    with _RETELL_CALLS_LOCK:
-        calls = _load_retell_calls()
-        entry = calls.get(call_id)
+    if _get_retell_call_entry(call_id) is None:
+        raise KeyError(f"Call {call_id} not found")
+
+    # Network and LLM calls run outside the write transaction; a refresh always revalidates
+    detailed_data = get_retell_call_details(call_id, max_age=0)
+    constraint_info = _evaluate_call_constraints(detailed_data)
+
+    fallback_summary = None
+    call_analysis = detailed_data.get("call_analysis")
+    if isinstance(call_analysis, dict):
+        fallback_summary = call_analysis.get("call_summary") or call_analysis.get("summary")
+
+    if not fallback_summary:
+        fallback_summary = detailed_data.get("call_summary") or detailed_data.get("summary")
+
+    purpose = generate_call_purpose_from_summary(fallback_summary) if fallback_summary else None
+
+    with _CALL_STORE.transaction() as txn:
+        entry = txn.get(call_id)
         if entry is None:
             raise KeyError(f"Call {call_id} not found")
 
-        detailed_data = get_retell_call_details(call_id)
-        constraint_info = _evaluate_call_constraints(detailed_data)
-
         updated_entry = {
             **entry,
             "call_id": call_id,
@@ -554,22 +788,11 @@ def _refresh_call_metadata(call_id: str) -> Dict[str, Any]:
             updated_entry["analysis_status"] = updated_entry.get("analysis_status", "pending")
             updated_entry["analysis_block_reason"] = None
 
-        fallback_summary = None
-        call_analysis = detailed_data.get("call_analysis")
-        if isinstance(call_analysis, dict):
-            fallback_summary = call_analysis.get("call_summary") or call_analysis.get("summary")
-
-        if not fallback_summary:
-            fallback_summary = detailed_data.get("call_summary") or detailed_data.get("summary")
-
-        if fallback_summary:
-            purpose = generate_call_purpose_from_summary(fallback_summary)
-            if purpose:
-                updated_entry["call_purpose"] = purpose
+        if purpose:
+            updated_entry["call_purpose"] = purpose
 
         updated_entry["last_updated"] = _current_timestamp_iso()
-        calls[call_id] = updated_entry
-        _save_retell_calls(calls)
+        txn.put(call_id, updated_entry)
 
     return updated_entry
 
@@ -587,6 +810,71 @@ def _persist_retell_results(call_id: str, payload: Dict[str, Any]) -> str:
         raise
 
 
+def _persist_call_timeline(call_id: str, analysis_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compute the timeline rollups for an analysed call and store them next to its results."""
+    timeline = build_timeline(call_id, analysis_results)
+    output_path = os.path.join(RETELL_RESULTS_DIR, f"{call_id}.timeline.json")
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(timeline, f)
+    os.replace(temp_path, output_path)
+    return timeline
+
+
+def _combined_analysis_fields(analysis_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Title and purpose a combined LLM request returned with the analysis, if one was made."""
+    for result in analysis_results:
+        fields = (result.get("metadata") or {}).get("combined_analysis")
+        if fields:
+            return fields
+    return {}
+
+
+def _analytics_contribution(call_id: str, entry: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+    customer = (payload.get("retell_metadata") or {}).get("customer") or {}
+    return call_contribution(call_id, entry, payload.get("analysis") or [], program=customer.get("program"))
+
+
+def _record_call_analytics(call_id: str, payload: Dict[str, Any]) -> None:
+    """Fold a completed analysis into the cross-call aggregates; never fails the analysis."""
+    try:
+        entry = _get_retell_call_entry(call_id)
+        if entry:
+            _ANALYTICS.record(_analytics_contribution(call_id, entry, payload))
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error("Failed to update analytics for call %s: %s", call_id, exc)
+
+
+def _rebuild_call_analytics() -> int:
+    contributions = []
+    for call_id, entry in _load_retell_calls().items():
+        if entry.get("analysis_status") != "completed":
+            continue
+        payload = _load_analysis_payload(entry)
+        if payload:
+            contributions.append(_analytics_contribution(call_id, entry, payload))
+    return _ANALYTICS.rebuild(contributions)
+
+
+def _index_call_transcript(call_id: str, payload: Dict[str, Any]) -> None:
+    """Replace a call's rows in the transcript search index; never fails the analysis."""
+    try:
+        _SEARCH_INDEX.index_call(call_id, payload.get("analysis") or [])
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error("Failed to index transcript for call %s: %s", call_id, exc)
+
+
+def _rebuild_search_index() -> int:
+    calls = []
+    for call_id, entry in _load_retell_calls().items():
+        if entry.get("analysis_status") != "completed":
+            continue
+        payload = _load_analysis_payload(entry)
+        if payload:
+            calls.append((call_id, payload.get("analysis") or []))
+    return _SEARCH_INDEX.rebuild(calls)
+
+
 def _extract_overall_emotion_from_results(
     analysis_results: Optional[List[Dict[str, Any]]],
 ) -> Optional[Dict[str, Any]]:
@@ -716,7 +1004,106 @@ def _merge_channel_results(
     return combined_result
 
 
+def _select_channels_for_analysis(
+    call_id: str,
+    file_contents: List[Tuple[str, bytes]],
+    talk_time: Optional[Dict[str, float]],
+) -> Tuple[List[Tuple[str, bytes]], List[str]]:
+    """
+    Leave out the channel of a speaker who barely talked, per the transcript.
+
+    Only split recordings are considered, and at least one channel is
+    always kept. Returns the channels to analyse and the names of the
+    skipped ones.
+    """
+    if HUME_CHANNEL_MIN_SPEECH_SECONDS <= 0 or not talk_time or len(file_contents) < 2:
+        return file_contents, []
+
+    kept: List[Tuple[str, bytes]] = []
+    skipped: List[str] = []
+    for filename, content in file_contents:
+        speaker = "Customer" if filename.endswith("_user.wav") else "Agent"
+        if talk_time.get(speaker, 0.0) < HUME_CHANNEL_MIN_SPEECH_SECONDS:
+            skipped.append(filename)
+        else:
+            kept.append((filename, content))
+    if not kept:
+        return file_contents, []
+    if skipped:
+        logger.info("Not sending %s of call %s to Hume: too little speech in the transcript", ", ".join(skipped), call_id)
+    return kept, skipped
+
+
 def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the full analysis for a call; its stage timings are stored under ``timings``.
+
+    Slow runs, and runs an admin asked for with ``profile_requested``, leave
+    a profile next to the results (see ``profile_run``).
+    """
+    call_id = call_payload.get("call_id")
+    call_entry = _get_retell_call_entry(call_id) if call_id else None
+    profile_requested = bool(call_entry and call_entry.get("profile_requested"))
+    with record_timings("retell_call"), profile_run(call_id, RETELL_RESULTS_DIR, "retell_call", requested=profile_requested):
+        try:
+            return _run_retell_call_pipeline(call_payload)
+        finally:
+            if profile_requested:
+                # The flag is one-shot; set it again to profile another run
+                try:
+                    _update_retell_call_entry(call_id, {"profile_requested": False})
+                except KeyError:
+                    pass
+
+
+def _derive_missing_call_labels(
+    call_id: str,
+    call_data: Dict[str, Any],
+    analysis_results: List[Dict[str, Any]],
+    analysis_summary: Optional[str],
+    call_summary_text: Optional[str],
+) -> Dict[str, Any]:
+    """Summary, title and purpose updates for a call entry that does not have them yet."""
+    updates: Dict[str, Any] = {}
+    try:
+        existing_entry = _get_retell_call_entry(call_id)
+    except KeyError:
+        existing_entry = None
+
+    openai_client = None
+    fallback_summary = analysis_summary or call_summary_text
+
+    if analysis_summary and (not existing_entry or not existing_entry.get("call_summary")):
+        updates["call_summary"] = analysis_summary
+
+    combined_fields = _combined_analysis_fields(analysis_results)
+    needs_title = not existing_entry or not existing_entry.get("call_title")
+    if needs_title and combined_fields.get("title"):
+        updates["call_title"] = combined_fields["title"]
+    elif needs_title and fallback_summary:
+        openai_client = openai_client or get_openai_client()
+        with stage_span("title"):
+            derived_title = derive_short_call_title(
+                call_data,
+                fallback_summary=fallback_summary,
+                openai_client=openai_client,
+            )
+        if derived_title:
+            updates["call_title"] = derived_title
+
+    needs_purpose = not existing_entry or not existing_entry.get("call_purpose")
+    if needs_purpose and combined_fields.get("purpose"):
+        updates["call_purpose"] = combined_fields["purpose"]
+    elif needs_purpose and fallback_summary:
+        openai_client = openai_client or get_openai_client()
+        with stage_span("purpose"):
+            purpose = generate_call_purpose_from_summary(fallback_summary, openai_client=openai_client)
+        if purpose:
+            updates["call_purpose"] = purpose
+    return updates
+
+
+def _run_retell_call_pipeline(call_payload: Dict[str, Any]) -> Dict[str, Any]:
     call_id = call_payload.get("call_id")
     if not call_id:
         logger.warning("Received Retell payload without call_id; skipping")
@@ -726,7 +1113,8 @@ def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
         call_data = dict(call_payload)
         detailed_data: Optional[Dict[str, Any]] = None
         try:
-            detailed_data = get_retell_call_details(call_id)
+            with stage_span("retell_details"):
+                detailed_data = get_retell_call_details(call_id)
         except Exception as fetch_exc:  # pylint: disable=broad-except
             logger.warning("Could not fetch detailed Retell data for %s: %s", call_id, fetch_exc)
 
@@ -785,18 +1173,24 @@ def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
             "agent_name": preserve_or_update("agent_name"),
         }
 
+        # In combined mode the title and purpose come back with the analysis itself
+        defer_to_analysis = OPENAI_COMBINED_ANALYSIS and constraint_info["analysis_allowed"]
         if call_summary_text:
             metadata_updates["call_summary"] = call_summary_text
-            purpose = generate_call_purpose_from_summary(call_summary_text)
-            if purpose:
-                metadata_updates["call_purpose"] = purpose
+            if not defer_to_analysis:
+                with stage_span("purpose"):
+                    purpose = generate_call_purpose_from_summary(call_summary_text)
+                if purpose:
+                    metadata_updates["call_purpose"] = purpose
 
-        call_title = derive_short_call_title(
-            call_data,
-            fallback_summary=call_summary_text,
-        )
-        if call_title:
-            metadata_updates["call_title"] = call_title
+        if not defer_to_analysis:
+            with stage_span("title"):
+                call_title = derive_short_call_title(
+                    call_data,
+                    fallback_summary=call_summary_text,
+                )
+            if call_title:
+                metadata_updates["call_title"] = call_title
 
         if not constraint_info["analysis_allowed"]:
             metadata_updates["analysis_status"] = "blocked"
@@ -829,10 +1223,12 @@ def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
         recording_url = call_data.get("recording_multi_channel_url")
 
         filename_hint = f"{call_id}.wav"
-        audio_filename, audio_bytes = download_retell_recording(recording_url, filename_hint)
+        with stage_span("download"):
+            audio_filename, audio_bytes = download_retell_recording(recording_url, filename_hint)
 
         try:
-            user_audio, agent_audio = split_stereo_wav_channels(audio_bytes)
+            with stage_span("split_channels"):
+                user_audio, agent_audio = split_stereo_wav_channels(audio_bytes)
             agent_path = os.path.join(RETELL_AUDIO_DIR, f"{call_id}_agent.wav")
             user_path = os.path.join(RETELL_AUDIO_DIR, f"{call_id}_user.wav")
             with open(agent_path, "wb") as agent_f:
@@ -847,6 +1243,9 @@ def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
         except Exception as channel_err:  # pylint: disable=broad-except
             logger.warning("Could not split channels for call %s: %s", call_id, channel_err)
             file_contents = [(audio_filename, audio_bytes)]
+        file_contents, skipped_channels = _select_channels_for_analysis(
+            call_id, file_contents, constraint_info["constraints"].get("talk_time_seconds"),
+        )
 
         transcript_segments = extract_retell_transcript_segments(call_data)
 
@@ -870,17 +1269,22 @@ def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
             },
             "analysis_constraints": constraint_info["constraints"],
         }
+        if skipped_channels:
+            retell_metadata["skipped_channels"] = skipped_channels
 
+        scores_path = os.path.join(RETELL_RESULTS_DIR, f"{call_id}.scores.npz")
         analysis_results = analyze_audio_files(
             file_contents,
             include_summary=True,
             retell_call_id=call_id,
             retell_transcript=transcript_segments,
             retell_metadata=retell_metadata,
+            scores_path=scores_path,
         )
 
-        if len(analysis_results) >= 2:
-            combined_result = _merge_channel_results(call_id, analysis_results, transcript_segments)
+        if len(analysis_results) >= 2 or skipped_channels:
+            with stage_span("merge"):
+                combined_result = _merge_channel_results(call_id, analysis_results, transcript_segments)
             analysis_results.insert(0, combined_result)
 
         overall_emotion = _extract_overall_emotion_from_results(analysis_results)
@@ -896,49 +1300,51 @@ def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
         payload_to_store = {
             "call_id": call_id,
             "retell_metadata": retell_metadata,
-            "analysis": analysis_results
+            "analysis": analysis_results,
+            "stages": {"emotions": stage_record(_emotions_stage_fingerprint(call_id, recording_url))},
         }
+        with stage_span("fingerprints"):
+            _run_analysis_stages(
+                call_id,
+                payload_to_store,
+                call_data,
+                set(),
+                fallback_summary=call_summary_text,
+                record_only=True,
+            )
 
-        saved_path = _persist_retell_results(call_id, payload_to_store)
+        # Labels are derived before saving so their LLM calls show up in the stored timings
+        try:
+            label_updates = _derive_missing_call_labels(
+                call_id, call_data, analysis_results, analysis_summary, call_summary_text,
+            )
+        except Exception as label_exc:  # pylint: disable=broad-except
+            logger.error("Failed to derive title/purpose for call %s: %s", call_id, label_exc)
+            label_updates = {}
+
+        timings = current_timings()
+        if timings is not None:
+            payload_to_store["timings"] = timings.as_dict()
+        with stage_span("persist"):
+            saved_path = _persist_retell_results(call_id, payload_to_store)
+        try:
+            with stage_span("timeline"):
+                _persist_call_timeline(call_id, analysis_results)
+        except Exception as timeline_exc:  # pylint: disable=broad-except
+            logger.warning("Failed to store timeline for call %s: %s", call_id, timeline_exc)
         try:
             final_updates: Dict[str, Any] = {
                 "analysis_status": "completed",
                 "analysis_filename": os.path.basename(saved_path),
                 "recording_multi_channel_url": recording_url,
+                "scores_filename": os.path.basename(scores_path) if os.path.exists(scores_path) else None,
             }
 
             if overall_emotion:
                 final_updates["overall_emotion"] = overall_emotion
                 final_updates["overall_emotion_label"] = overall_emotion.get("label")
 
-            try:
-                existing_entry = _get_retell_call_entry(call_id)
-            except KeyError:
-                existing_entry = None
-
-            openai_client = None
-            fallback_summary = analysis_summary or call_summary_text
-
-            if analysis_summary and (not existing_entry or not existing_entry.get("call_summary")):
-                final_updates["call_summary"] = analysis_summary
-
-            needs_title = not existing_entry or not existing_entry.get("call_title")
-            if needs_title and fallback_summary:
-                openai_client = openai_client or get_openai_client()
-                derived_title = derive_short_call_title(
-                    call_data,
-                    fallback_summary=fallback_summary,
-                    openai_client=openai_client,
-                )
-                if derived_title:
-                    final_updates["call_title"] = derived_title
-
-            needs_purpose = not existing_entry or not existing_entry.get("call_purpose")
-            if needs_purpose and fallback_summary:
-                openai_client = openai_client or get_openai_client()
-                purpose = generate_call_purpose_from_summary(fallback_summary, openai_client=openai_client)
-                if purpose:
-                    final_updates["call_purpose"] = purpose
+            final_updates.update(label_updates)
 
             try:
                 # Get existing entry to preserve metadata
@@ -984,6 +1390,10 @@ def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
         except Exception as update_exc:  # pylint: disable=broad-except
             logger.error("Failed to update metadata store for call %s after analysis: %s", call_id, update_exc)
 
+        with stage_span("analytics"):
+            _record_call_analytics(call_id, payload_to_store)
+        with stage_span("search_index"):
+            _index_call_transcript(call_id, payload_to_store)
         return payload_to_store
 
     except Exception as exc:  # pylint: disable=broad-except
@@ -1013,6 +1423,593 @@ def _process_retell_call(call_payload: Dict[str, Any]) -> Dict[str, Any]:
         raise
 
 
+_STAGE_CODE_VERSIONS: Optional[Dict[str, str]] = None
+
+
+def _stage_code_versions() -> Dict[str, str]:
+    global _STAGE_CODE_VERSIONS
+    if _STAGE_CODE_VERSIONS is None:
+        _STAGE_CODE_VERSIONS = {
+            # What shapes Hume's output, not the orchestration around it (timing spans and the like)
+            "emotions": module_fingerprint(
+                audio_chunking, audio_encoding, audio_gating, emotion_categories, prediction_engine,
+                functions=(
+                    submit_hume_job, extract_top_emotions, split_stereo_wav_channels,
+                    enrich_results_with_transcript, _find_best_transcript_match,
+                ),
+            ),
+            "summary": code_fingerprint(
+                summarize_predictions_with_usage, analyze_call_with_llm, compact_summary_data, collapse_segment_runs,
+            ),
+            "overall": code_fingerprint(determine_overall_call_emotion),
+            "merge": code_fingerprint(_merge_channel_results),
+            "timeline": code_fingerprint(build_timeline, bucket_rollup, collect_timeline_segments, find_emotion_shifts),
+            "title": code_fingerprint(derive_short_call_title, generate_call_title_from_summary),
+            "purpose": code_fingerprint(generate_call_purpose_from_summary),
+        }
+    return _STAGE_CODE_VERSIONS
+
+
+def _emotions_audio_settings() -> Dict[str, Any]:
+    """Audio preparation settings in effect that change what Hume is sent."""
+    settings: Dict[str, Any] = {}
+    if audio_encoding.HUME_AUDIO_SAMPLE_RATE > 0:
+        settings["sample_rate"] = audio_encoding.HUME_AUDIO_SAMPLE_RATE
+    if audio_encoding.HUME_AUDIO_FORMAT == "flac" and audio_encoding.soundfile is not None:
+        settings["format"] = "flac"
+    if audio_gating.HUME_SILENCE_GATING:
+        settings["silence"] = {
+            "min_seconds": audio_gating.HUME_SILENCE_MIN_SECONDS,
+            "padding_seconds": audio_gating.HUME_SILENCE_PADDING_SECONDS,
+            "threshold_dbfs": audio_gating.HUME_SILENCE_THRESHOLD_DBFS,
+            "margin_db": audio_gating.HUME_SILENCE_MARGIN_DB,
+        }
+    if audio_chunking.HUME_CHUNK_SECONDS > 0:
+        settings["chunks"] = {
+            "seconds": audio_chunking.HUME_CHUNK_SECONDS,
+            "overlap_seconds": audio_chunking.HUME_CHUNK_OVERLAP_SECONDS,
+            "search_seconds": audio_chunking.HUME_CHUNK_SEARCH_SECONDS,
+        }
+    if HUME_CHANNEL_MIN_SPEECH_SECONDS > 0:
+        settings["channel_min_speech_seconds"] = HUME_CHANNEL_MIN_SPEECH_SECONDS
+    return settings
+
+
+def _emotions_stage_fingerprint(call_id: str, recording_url: Optional[str]) -> str:
+    return stage_fingerprint(
+        "emotions",
+        {"call_id": call_id, "recording_url": recording_url, "audio": _emotions_audio_settings()},
+        _stage_code_versions()["emotions"],
+    )
+
+
+def _results_without_derived_fields(channel_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Channel results as the summary/overall stages see them, minus their own outputs."""
+    stripped = []
+    for result in channel_results:
+        metadata = {
+            key: value for key, value in (result.get("metadata") or {}).items()
+            if key not in ("overall_call_emotion", "overall_call_status", "summary_usage", "combined_analysis")
+        }
+        view = {key: value for key, value in result.items() if key not in ("summary", "metadata")}
+        view["metadata"] = metadata
+        stripped.append(view)
+    return stripped
+
+
+def _run_analysis_stages(
+    call_id: str,
+    payload: Dict[str, Any],
+    call_data: Dict[str, Any],
+    requested: Set[str],
+    fallback_summary: Optional[str] = None,
+    record_only: bool = False,
+    openai_client: Optional[Any] = None,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Bring every stage after "emotions" up to date in ``payload``.
+
+    A stage reruns when it was requested or its input/code fingerprint no
+    longer matches the stored one; its fingerprint is computed from the
+    (possibly just recomputed) outputs of the stages before it. With
+    ``record_only`` nothing reruns and the current fingerprints are stored,
+    which is how a full analysis marks everything fresh. ``openai_client``
+    replaces the shared client for the LLM stages (batch mode). Returns the
+    stages that reran and the call-entry updates they produced.
+    """
+    versions = _stage_code_versions()
+    stored: Dict[str, Any] = payload.setdefault("stages", {})
+    analysis_results = payload.get("analysis") or []
+    channel_results = [
+        result for result in analysis_results
+        if "_combined" not in (result.get("filename") or "").lower()
+    ]
+    rerun: List[str] = []
+    entry_updates: Dict[str, Any] = {}
+
+    def step(stage: str, inputs: Any, run: Callable[[], None]) -> None:
+        fingerprint = stage_fingerprint(stage, inputs, versions[stage])
+        if record_only:
+            stored[stage] = stage_record(fingerprint)
+        elif is_stale(stage, fingerprint, stored, requested):
+            logger.info("Re-running %s stage for call %s", stage, call_id)
+            with stage_span(stage):
+                run()
+            if stage == "summary" and getattr(openai_client, "pending", None):
+                # Later prompts quote the summary, so they wait for the batch that produces it
+                raise PendingBatchRequest(f"{call_id}: summary")
+            stored[stage] = stage_record(fingerprint)
+            rerun.append(stage)
+
+    def current_summary() -> Optional[str]:
+        for result in channel_results:
+            summary_candidate = result.get("summary")
+            if isinstance(summary_candidate, str) and summary_candidate.strip():
+                return summary_candidate.strip()
+        return None
+
+    # Filled by a combined LLM request so later stages can reuse its answers
+    combined: Dict[str, Any] = {}
+
+    def run_summary() -> None:
+        if OPENAI_COMBINED_ANALYSIS:
+            combined.update(analyze_call_with_llm(channel_results, openai_client) or {})
+            if not combined and getattr(openai_client, "pending", None):
+                # Queued in a batch; the per-field fallback is only for a reply that came back unusable
+                return
+        if combined:
+            for result in channel_results:
+                result["summary"] = combined["summary"]
+                metadata = result.setdefault("metadata", {})
+                metadata["summary_usage"] = combined["usage"]
+                metadata["combined_analysis"] = {"title": combined["title"], "purpose": combined["purpose"]}
+            return
+        summary, summary_usage = summarize_predictions_with_usage(channel_results, openai_client)
+        if summary:
+            for result in channel_results:
+                result["summary"] = summary
+                result.setdefault("metadata", {})["summary_usage"] = summary_usage
+
+    step("summary", _results_without_derived_fields(channel_results), run_summary)
+
+    def run_overall() -> None:
+        overall = combined.get("overall_emotion") or determine_overall_call_emotion(
+            channel_results, current_summary(), openai_client=openai_client,
+        )
+        if overall:
+            for result in channel_results:
+                result.setdefault("metadata", {})["overall_call_emotion"] = overall
+
+    step(
+        "overall",
+        {"results": _results_without_derived_fields(channel_results), "summary": current_summary()},
+        run_overall,
+    )
+
+    # A call with a channel left out still gets a combined result, as in the full pipeline
+    skipped_channels = (payload.get("retell_metadata") or {}).get("skipped_channels") or []
+
+    def run_merge() -> None:
+        merged: List[Dict[str, Any]] = list(channel_results)
+        if len(channel_results) >= 2 or (skipped_channels and channel_results):
+            transcript_segments = None
+            for result in channel_results:
+                segments = (result.get("metadata") or {}).get("retell_transcript_segments")
+                if segments:
+                    transcript_segments = segments
+                    break
+            merged.insert(0, _merge_channel_results(call_id, channel_results, transcript_segments))
+        payload["analysis"] = merged
+
+    step("merge", {"results": channel_results, "skipped_channels": bool(skipped_channels)}, run_merge)
+
+    step("timeline", payload.get("analysis") or [], lambda: _persist_call_timeline(call_id, payload.get("analysis") or []))
+
+    title_summary = current_summary() or fallback_summary
+    title_inputs = {
+        "call_analysis": call_data.get("call_analysis"),
+        "call_summary": call_data.get("call_summary"),
+        "summary": call_data.get("summary"),
+        "fallback_summary": title_summary,
+    }
+
+    def run_title() -> None:
+        title = combined.get("title") or derive_short_call_title(
+            call_data, fallback_summary=title_summary, openai_client=openai_client,
+        )
+        if title:
+            entry_updates["call_title"] = title
+
+    step("title", title_inputs, run_title)
+
+    def run_purpose() -> None:
+        purpose = combined.get("purpose")
+        if not purpose and title_summary:
+            purpose = generate_call_purpose_from_summary(title_summary, openai_client=openai_client)
+        if purpose:
+            entry_updates["call_purpose"] = purpose
+
+    step("purpose", {"summary": title_summary}, run_purpose)
+
+    return rerun, entry_updates
+
+
+def _load_analysis_payload(call_entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    analysis_filename = call_entry.get("analysis_filename")
+    if not analysis_filename:
+        return None
+    analysis_path = os.path.join(RETELL_RESULTS_DIR, analysis_filename)
+    if not os.path.exists(analysis_path):
+        return None
+    try:
+        with open(analysis_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError) as exc:
+        logger.warning("Failed to read analysis for %s: %s", call_entry.get("call_id"), exc)
+        return None
+
+
+def _process_retell_call_stages(call_payload: Dict[str, Any], requested: Set[str]) -> Dict[str, Any]:
+    """
+    Re-analyse a call by rerunning only the stale (or requested) stages.
+
+    Falls back to a full analysis when there is nothing stored yet or the
+    emotions stage itself (download, split, Hume job) has to run again.
+    """
+    call_id = call_payload.get("call_id")
+    call_entry = _get_retell_call_entry(call_id) or {}
+    payload = _load_analysis_payload(call_entry)
+    recording_url = call_entry.get("recording_multi_channel_url") or call_payload.get("recording_multi_channel_url")
+
+    if payload is None or not payload.get("analysis"):
+        logger.info("No stored analysis for call %s; running the full pipeline", call_id)
+        return _process_retell_call(call_payload)
+
+    emotions_record = (payload.get("stages") or {}).get("emotions")
+    emotions_fingerprint = _emotions_stage_fingerprint(call_id, recording_url)
+    # Analyses stored before stage tracking keep their Hume output unless it is asked for explicitly
+    if "emotions" in requested or (emotions_record and emotions_record.get("fingerprint") != emotions_fingerprint):
+        return _process_retell_call(call_payload)
+    if not emotions_record:
+        payload.setdefault("stages", {})["emotions"] = stage_record(emotions_fingerprint)
+
+    with record_timings("retell_reanalysis") as timings:
+        try:
+            with stage_span("retell_details"):
+                call_data = get_retell_call_details(call_id)
+        except Exception as fetch_exc:  # pylint: disable=broad-except
+            logger.warning("Could not fetch detailed Retell data for %s: %s", call_id, fetch_exc)
+            call_data = dict(call_payload)
+
+        rerun, entry_updates = _run_analysis_stages(
+            call_id,
+            payload,
+            call_data,
+            requested,
+            fallback_summary=call_entry.get("call_summary"),
+        )
+        payload["timings"] = timings.as_dict()
+        _save_reanalysis(call_id, payload, entry_updates)
+
+    logger.info("Re-analysed call %s; stages rerun: %s", call_id, ", ".join(rerun) or "none")
+    payload["stages_rerun"] = rerun
+    return payload
+
+
+def _save_reanalysis(call_id: str, payload: Dict[str, Any], entry_updates: Dict[str, Any]) -> None:
+    saved_path = _persist_retell_results(call_id, payload)
+    overall_emotion = _extract_overall_emotion_from_results(payload.get("analysis"))
+    final_updates: Dict[str, Any] = {
+        "analysis_status": "completed",
+        "analysis_filename": os.path.basename(saved_path),
+        "error_message": None,
+        **entry_updates,
+    }
+    if overall_emotion:
+        final_updates["overall_emotion"] = overall_emotion
+        final_updates["overall_emotion_label"] = overall_emotion.get("label")
+    _update_retell_call_entry(call_id, final_updates)
+    _record_call_analytics(call_id, payload)
+    _index_call_transcript(call_id, payload)
+
+
+# Stages that call OpenAI; a batch backfill reruns exactly these.
+_LLM_STAGES = {"summary", "overall", "title", "purpose"}
+
+# Calls per backfill chunk (all of a chunk's requests go into one batch per round)
+# and the most batch rounds a chunk may need (summary first, then what quotes it).
+OPENAI_BATCH_MAX_CALLS = int(os.getenv("OPENAI_BATCH_MAX_CALLS", "1000"))
+OPENAI_BATCH_MAX_ROUNDS = 4
+
+# Runners of backfills in progress, stopped on shutdown so their polling does not hold it up
+_ACTIVE_BATCH_RUNNERS: Set[OpenAIBatchRunner] = set()
+_ACTIVE_BATCH_RUNNERS_LOCK = threading.Lock()
+
+
+def _claim_unchanged_call(call_id: str, entry: Dict[str, Any], payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Mark a call as processing so a backfill can store its result, unless the
+    call is being analysed or was re-analysed since ``entry`` and ``payload``
+    were read. Returns the call's state before the claim, or None.
+    """
+    with _CALL_STORE.transaction() as txn:
+        current = txn.get(call_id)
+        if current is None or current.get("analysis_status") == "processing":
+            return None
+        if current.get("analysis_filename") != entry.get("analysis_filename"):
+            return None
+        stored_payload = _load_analysis_payload(current) or {}
+        if stored_payload.get("stages") != payload.get("stages"):
+            return None
+        previous = {"analysis_status": current.get("analysis_status"), "error_message": current.get("error_message")}
+        current["analysis_status"] = "processing"
+        current["error_message"] = None
+        current["last_updated"] = _current_timestamp_iso()
+        txn.put(call_id, current)
+    return previous
+
+
+def _batch_reanalyze_chunk(
+    runner: OpenAIBatchRunner,
+    calls: List[Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+) -> Dict[str, int]:
+    replies: Dict[str, Dict[str, Any]] = {}
+    failed: Dict[str, Any] = {}
+    batches = 0
+    for _ in range(OPENAI_BATCH_MAX_ROUNDS):
+        # Dry run on copies: every request whose reply is not known yet is queued
+        clients = []
+        for call_id, entry, payload, call_data in calls:
+            client = BatchCollectingClient(call_id, replies, failed)
+            try:
+                _run_analysis_stages(
+                    call_id, copy.deepcopy(payload), call_data, _LLM_STAGES,
+                    fallback_summary=entry.get("call_summary"), openai_client=client,
+                )
+            except PendingBatchRequest:
+                pass
+            clients.append(client)
+        pending = collect_pending(clients)
+        if not pending:
+            break
+        try:
+            batch_replies, errors = runner.run(pending, description=f"retell backfill of {len(calls)} calls")
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("OpenAI batch submission failed: %s", exc)
+            batch_replies, errors = {}, {custom_id: str(exc) for custom_id in pending}
+        replies.update(batch_replies)
+        failed.update(errors)
+        batches += 1
+
+    saved = skipped = 0
+    for call_id, entry, payload, call_data in calls:
+        if runner.stopped:
+            # Replies cut short by shutdown would only store fallbacks
+            break
+        # The batches may have taken hours; never overwrite an analysis that moved on meanwhile
+        previous = _claim_unchanged_call(call_id, entry, payload)
+        if previous is None:
+            logger.info("Call %s was re-analysed during the batch backfill; not storing its batch result", call_id)
+            skipped += 1
+            continue
+        client = BatchCollectingClient(call_id, replies, failed, collect=False)
+        try:
+            _, entry_updates = _run_analysis_stages(
+                call_id, payload, call_data, _LLM_STAGES,
+                fallback_summary=entry.get("call_summary"), openai_client=client,
+            )
+            _save_reanalysis(call_id, payload, entry_updates)
+            saved += 1
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("Failed to store batch re-analysis for call %s: %s", call_id, exc)
+            _update_retell_call_entry(call_id, previous)
+    return {
+        "calls": saved,
+        "skipped_calls": skipped,
+        "batches": batches,
+        "replies": len(replies),
+        "failed_requests": len(failed),
+    }
+
+
+def _batch_reanalyze_calls(call_ids: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Rerun the LLM stages of stored analyses through the OpenAI Batch API.
+
+    Each chunk of calls is dry-run against a collecting client to gather
+    its summary (or combined) requests into one batch, then the requests
+    that quote the summary into a second; a final pass replays the replies
+    through the normal stage runner and stores the results.
+    """
+    openai_client = get_openai_client()
+    if openai_client is None:
+        raise RuntimeError("OPENAI_API_KEY is not configured")
+    runner = OpenAIBatchRunner(openai_client)
+    with _ACTIVE_BATCH_RUNNERS_LOCK:
+        _ACTIVE_BATCH_RUNNERS.add(runner)
+    try:
+        return _batch_reanalyze_with(runner, call_ids)
+    finally:
+        with _ACTIVE_BATCH_RUNNERS_LOCK:
+            _ACTIVE_BATCH_RUNNERS.discard(runner)
+
+
+def _batch_reanalyze_with(runner: OpenAIBatchRunner, call_ids: Optional[List[str]]) -> Dict[str, int]:
+    entries = _load_retell_calls()
+    totals = {"calls": 0, "skipped_calls": 0, "batches": 0, "replies": 0, "failed_requests": 0}
+    chunk: List[Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]] = []
+
+    def flush() -> None:
+        if chunk:
+            for key, value in _batch_reanalyze_chunk(runner, chunk).items():
+                totals[key] += value
+            chunk.clear()
+
+    for call_id in call_ids or list(entries):
+        if runner.stopped:
+            break
+        entry = entries.get(call_id)
+        if not entry or entry.get("analysis_status") != "completed":
+            continue
+        payload = _load_analysis_payload(entry)
+        if not payload or not payload.get("analysis"):
+            continue
+        try:
+            call_data = get_retell_call_details(call_id)
+        except Exception as fetch_exc:  # pylint: disable=broad-except
+            logger.warning("Could not fetch detailed Retell data for %s: %s", call_id, fetch_exc)
+            call_data = dict(entry)
+        chunk.append((call_id, entry, payload, call_data))
+        if len(chunk) >= OPENAI_BATCH_MAX_CALLS:
+            flush()
+    flush()
+    logger.info(
+        "Batch re-analysis stored %d calls (%d skipped as re-analysed) using %d batches (%d replies, %d failed requests)",
+        totals["calls"], totals["skipped_calls"], totals["batches"], totals["replies"], totals["failed_requests"],
+    )
+    return totals
+
+
+def _batch_reanalyze_calls_background(
+    call_ids: Optional[List[str]],
+    trace_carrier: Optional[Dict[str, str]] = None,
+) -> None:
+    try:
+        with attached_context(trace_carrier), start_span("batch_reanalyze background", kind="consumer"):
+            _batch_reanalyze_calls(call_ids)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.exception("Batch re-analysis failed: %s", exc)
+
+
+def _apply_webhook_log_batch(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fold a batch of logged webhook events into the call store.
+
+    Returns the records of every call that could not be stored, so the log
+    keeps them for the next pass. The LLM purpose and title are left to the
+    enrichment pool; compaction only waits on SQLite.
+    """
+    # Later events for the same call supersede earlier ones, so each call is upserted once
+    coalesced: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        call_data = record.get("call")
+        if not isinstance(call_data, dict) or not call_data.get("call_id"):
+            continue
+        call_id = call_data["call_id"]
+        if call_id in coalesced:
+            coalesced[call_id].update({k: v for k, v in call_data.items() if v is not None})
+        else:
+            coalesced[call_id] = dict(call_data)
+
+    failed_calls: Set[str] = set()
+    # The batch span links back to the webhook requests that logged its events
+    links = [record["trace"] for record in records if record.get("trace")]
+    with start_span("webhook_log apply", kind="consumer", attributes={"webhook.events": len(records)}, links=links):
+        for call_id, call_data in coalesced.items():
+            try:
+                _upsert_retell_call_metadata(call_data, status="pending", enrich=False)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception("Failed to fold logged webhook for call %s: %s", call_id, exc)
+                failed_calls.add(call_id)
+                continue
+            _ENRICHMENT_EXECUTOR.submit(_enrich_logged_call, call_data)
+
+        # Dedup rows travel in the log too and are stored in one transaction per batch
+        with _CALL_STORE.transaction() as txn:
+            for record in records:
+                call_data = record.get("call")
+                if not isinstance(call_data, dict) or call_data.get("call_id") in failed_calls or not call_data.get("call_id"):
+                    continue
+                fingerprint = record.get("fingerprint") or payload_fingerprint(call_data)
+                _WEBHOOK_EVENTS.record(txn, call_data["call_id"], fingerprint, record.get("received_at"))
+
+    return [record for record in records if (record.get("call") or {}).get("call_id") in failed_calls]
+
+
+def _enrich_logged_call(call_data: Dict[str, Any]) -> None:
+    try:
+        _enrich_retell_call_metadata(call_data)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning("Failed to generate purpose/title for call %s: %s", call_data.get("call_id"), exc)
+
+
+_WEBHOOK_LOG = WebhookLog(RETELL_WEBHOOK_LOG_DIR, _apply_webhook_log_batch)
+
+
+@app.on_event("startup")
+def _start_webhook_log() -> None:
+    if RETELL_WEBHOOK_LOG_ENABLED:
+        _WEBHOOK_LOG.start()
+
+
+@app.on_event("startup")
+def _backfill_call_analytics() -> None:
+    # One-off O(calls) pass for stores that predate the aggregate tables
+    if not _ANALYTICS.is_built():
+        count = _rebuild_call_analytics()
+        logger.info("Built analytics aggregates from %d analysed calls", count)
+
+
+@app.on_event("startup")
+def _backfill_search_index() -> None:
+    if not _SEARCH_INDEX.is_built():
+        count = _rebuild_search_index()
+        logger.info("Indexed transcripts of %d analysed calls for search", count)
+
+
+@app.on_event("shutdown")
+def _stop_webhook_log() -> None:
+    _WEBHOOK_LOG.stop()
+    _ENRICHMENT_EXECUTOR.shutdown(wait=True)
+
+
+@app.on_event("shutdown")
+def _stop_batch_backfills() -> None:
+    with _ACTIVE_BATCH_RUNNERS_LOCK:
+        runners = list(_ACTIVE_BATCH_RUNNERS)
+    for runner in runners:
+        runner.stop()
+
+
+@app.on_event("shutdown")
+def _close_http_clients() -> None:
+    get_client_registry().close()
+
+
+@app.on_event("shutdown")
+def _flush_traces() -> None:
+    shutdown_tracing()
+
+
+def _ingest_webhook_event(event: str, call_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Record a webhook event unless an identical one was already processed."""
+    call_id = call_data["call_id"]
+    fingerprint = payload_fingerprint(call_data)
+    if _WEBHOOK_EVENTS.seen(call_id, fingerprint):
+        logger.info("Ignoring duplicate call_analyzed webhook for call %s", call_id)
+        return {"duplicate": True}
+
+    # Only remember the event once it is durable, so a failed attempt can be redelivered
+    if RETELL_WEBHOOK_LOG_ENABLED:
+        record: Dict[str, Any] = {
+            "received_at": _current_timestamp_iso(),
+            "event": event,
+            "call": call_data,
+            "fingerprint": fingerprint,
+        }
+        trace_carrier = inject_context()
+        if trace_carrier:
+            record["trace"] = trace_carrier
+        _WEBHOOK_LOG.append(record)
+        # The compactor stores the dedup row with the event; no write transaction here
+        _WEBHOOK_EVENTS.remember_locally(call_id, fingerprint)
+        return {"queued": True}
+
+    result = {"call_metadata": _upsert_retell_call_metadata(call_data, status="pending")}
+    _WEBHOOK_EVENTS.remember(call_id, fingerprint)
+    return result
+
+
 @app.post("/retell/webhook")
 async def retell_webhook(payload: Dict[str, Any]):
     """
@@ -1021,14 +2018,14 @@ async def retell_webhook(payload: Dict[str, Any]):
     Supports two payload formats:
     1. Direct Retell format: { "event": "call_analyzed", "call": {...} }
     2. n8n format: { "body": { "event": "call_analyzed", ...call data... } }
+
+    With the webhook log enabled the event is acknowledged once it is durably
+    appended; the compactor folds it into the call store shortly afterwards.
     """
     event, call_data = _normalize_retell_payload(payload)
 
     if event != "call_analyzed" or not isinstance(call_data, dict):
         logger.info("Ignoring Retell event %s (call_data type: %s)", event, type(call_data).__name__)
-        if event == "call_analyzed" and not isinstance(call_data, dict):
-            logger.warning("call_analyzed event received but call_data is not a dict. Payload keys: %s", list(payload.keys())[:10])
-        logger.info("Ignoring Retell event %s (call_data type: %s)", event, type(call_data).__name__)
         if event == "call_analyzed" and not isinstance(call_data, dict):
             logger.warning("call_analyzed event received but call_data is not a dict. Payload keys: %s", list(payload.keys())[:10])
         return JSONResponse(content={"success": True, "ignored": True})
@@ -1039,17 +2036,18 @@ async def retell_webhook(payload: Dict[str, Any]):
 
     logger.info("Received call_analyzed webhook for call %s", call_id)
     try:
-        metadata = _upsert_retell_call_metadata(call_data, status="pending")
+        ingest_result = await run_in_threadpool(_ingest_webhook_event, event, call_data)
     except Exception as exc:  # pylint: disable=broad-except
         logger.exception("Failed to record Retell call metadata for %s: %s", call_id, exc)
         raise HTTPException(status_code=500, detail="Failed to record call metadata") from exc
 
+    message = "Duplicate event ignored" if ingest_result.get("duplicate") else "Call registered"
     return JSONResponse(
         content={
             "success": True,
-            "message": "Call registered",
+            "message": message,
             "call_id": call_id,
-            "call_metadata": metadata,
+            **ingest_result,
         }
     )
 
@@ -1107,9 +2105,8 @@ async def refresh_retell_calls(call_id: Optional[str] = None, token_data: Dict[s
     refreshed = []
     errors: Dict[str, str] = {}
 
-    with _RETELL_CALLS_LOCK:
-        calls = _load_retell_calls()
-        target_ids = [call_id] if call_id else list(calls.keys())
+    calls = _load_retell_calls()
+    target_ids = [call_id] if call_id else list(calls.keys())
 
     for cid in target_ids:
         try:
@@ -1155,11 +2152,33 @@ def _prepare_retell_call_payload(call_entry: Dict[str, Any]) -> Dict[str, Any]:
     return payload
 
 
-def _process_retell_call_background(call_id: str, call_payload: Dict[str, Any]) -> None:
-    """Background task to process Retell call analysis without blocking the HTTP request."""
+def _process_retell_call_background(
+    call_id: str,
+    call_payload: Dict[str, Any],
+    stages: Optional[Set[str]] = None,
+    trace_carrier: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Background task to process Retell call analysis without blocking the HTTP request.
+
+    ``trace_carrier`` is the trace context of the request that queued it, so
+    the analysis spans join that request's trace.
+    """
+    ANALYSIS_TASKS.dec(state="queued")
+    ANALYSIS_TASKS.inc(state="running")
+    with attached_context(trace_carrier), start_span(
+        "analyze_retell_call background", kind="consumer", attributes={"call.id": call_id},
+    ):
+        _run_background_analysis(call_id, call_payload, stages)
+
+
+def _run_background_analysis(call_id: str, call_payload: Dict[str, Any], stages: Optional[Set[str]]) -> None:
     try:
         logger.info("Starting background analysis for call %s", call_id)
-        analysis_payload = _process_retell_call(call_payload)
+        if stages is None:
+            analysis_payload = _process_retell_call(call_payload)
+        else:
+            analysis_payload = _process_retell_call_stages(call_payload, stages)
         logger.info("Completed background analysis for call %s", call_id)
     except HTTPException as exc:
         logger.error("HTTP error in background analysis for call %s: %s", call_id, exc.detail)
@@ -1197,12 +2216,37 @@ def _process_retell_call_background(call_id: str, call_payload: Dict[str, Any])
             _update_retell_call_entry(call_id, {
                 "error_message": str(exc)
             })
+    finally:
+        ANALYSIS_TASKS.dec(state="running")
+
+
+@app.post("/retell/calls/batch-reanalyze")
+async def batch_reanalyze_retell_calls(
+    call_ids: Optional[List[str]] = Body(None, embed=True),
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    token_data: Dict[str, Any] = Depends(verify_token),
+):
+    """
+    Regenerate summary, overall emotion, title and purpose for analysed calls
+    through the OpenAI Batch API (all completed calls when ``call_ids`` is
+    omitted). Runs in the background; results are written to the stored
+    analyses as each chunk's batches complete.
+    """
+    if get_openai_client() is None:
+        raise HTTPException(status_code=503, detail="OPENAI_API_KEY is not configured")
+    background_tasks.add_task(_batch_reanalyze_calls_background, call_ids, inject_context())
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "message": "Batch re-analysis started",
+        "calls": len(call_ids) if call_ids else None,
+    })
 
 
 @app.post("/retell/calls/{call_id}/analyze")
 async def analyze_retell_call(
     call_id: str, 
     force: bool = Query(False), 
+    stages: Optional[str] = Query(None),
     background_tasks: BackgroundTasks = BackgroundTasks(),
     token_data: Dict[str, Any] = Depends(verify_token)
 ):
@@ -1211,7 +2255,16 @@ async def analyze_retell_call(
     
     Returns immediately and processes in the background to avoid gateway timeouts.
     Use GET /retell/calls/{call_id}/analysis to check status and retrieve results.
+
+    ``stages`` re-analyses incrementally: a comma-separated list of stages
+    to rerun (e.g. ``summary,overall``) or ``auto`` to rerun only the stages
+    whose inputs or code changed since the stored analysis.
     """
+    try:
+        requested_stages = parse_stages(stages)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
     call_entry = _ensure_call_registered(call_id)
     if call_entry.get("analysis_allowed") is False:
         reason = call_entry.get("analysis_block_reason") or "Call cannot be analyzed."
@@ -1221,9 +2274,9 @@ async def analyze_retell_call(
         )
 
     # If analysis already exists and not forcing, return it immediately
-    if not force:
+    if not force and requested_stages is None:
         try:
-            return await get_retell_call_analysis(call_id)
+            return await get_retell_call_analysis(call_id, top_n=None, min_score=None, category_scores=False)
         except HTTPException as exc:
             if exc.status_code != 404:
                 raise
@@ -1238,14 +2291,29 @@ async def analyze_retell_call(
             "status": "processing"
         })
 
-    if force:
+    if requested_stages is not None:
+        logger.info(
+            "Incrementally re-running analysis for Retell call %s (stages: %s)",
+            call_id, ", ".join(sorted(requested_stages)) or "auto",
+        )
+    elif force:
         logger.info("Force re-running analysis for Retell call %s", call_id)
 
-    # Mark as processing and start background task
-    _update_retell_call_entry(call_id, {"analysis_status": "processing", "error_message": None})
+    # Mark as processing and start background task; the claim is atomic across workers
+    claimed_entry = _claim_retell_call_for_analysis(call_id)
+    if claimed_entry is None:
+        return JSONResponse(content={
+            "success": True,
+            "message": "Analysis already in progress",
+            "call_id": call_id,
+            "status": "processing"
+        })
     
     call_payload = _prepare_retell_call_payload(call_entry)
-    background_tasks.add_task(_process_retell_call_background, call_id, call_payload)
+    ANALYSIS_TASKS.inc(state="queued")
+    background_tasks.add_task(
+        _process_retell_call_background, call_id, call_payload, requested_stages, inject_context(),
+    )
 
     # Return immediately - processing happens in background
     return JSONResponse(content={
@@ -1257,12 +2325,64 @@ async def analyze_retell_call(
     })
 
 
+def _render_from_score_matrix(
+    call_id: str,
+    call_entry: Dict[str, Any],
+    analysis_results: List[Dict[str, Any]],
+    top_n: Optional[int],
+    min_score: Optional[float],
+    category_scores: bool,
+) -> List[Dict[str, Any]]:
+    """Re-derive top emotions from the stored score matrix instead of asking Hume again."""
+    scores_filename = call_entry.get("scores_filename")
+    scores_path = os.path.join(RETELL_RESULTS_DIR, scores_filename) if scores_filename else None
+    if not scores_path or not os.path.exists(scores_path):
+        raise HTTPException(
+            status_code=404,
+            detail="Score matrix not stored for this call; re-run the analysis to enable top_n, min_score and category_scores",
+        )
+    if not score_matrix_available():
+        raise HTTPException(status_code=501, detail="numpy is required to derive results from stored scores")
+
+    stored_scores = StoredScores.load(scores_path)
+    channel_results = [
+        result for result in analysis_results
+        if "_combined" not in (result.get("filename") or "").lower()
+    ]
+    rendered = stored_scores.render(channel_results, top_n=top_n or 1, min_score=min_score, category_scores=category_scores)
+    if not rendered:
+        raise HTTPException(
+            status_code=409,
+            detail="Stored score matrix does not match the stored analysis; re-run the analysis to enable top_n, min_score and category_scores",
+        )
+
+    if len(channel_results) == len(analysis_results):
+        return channel_results
+    transcript_segments = None
+    for result in channel_results:
+        segments = (result.get("metadata") or {}).get("retell_transcript_segments")
+        if segments:
+            transcript_segments = segments
+            break
+    combined = _merge_channel_results(call_id, channel_results, transcript_segments)
+    combined["top_n_applied"] = all(result["top_n_applied"] for result in channel_results)
+    return [combined] + channel_results
+
+
 @app.get("/retell/calls/{call_id}/analysis")
-async def get_retell_call_analysis(call_id: str, token_data: Dict[str, Any] = Depends(verify_token)):
+async def get_retell_call_analysis(
+    call_id: str,
+    top_n: Optional[int] = Query(None, ge=1, le=48),
+    min_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    category_scores: bool = Query(False),
+    token_data: Dict[str, Any] = Depends(verify_token),
+):
     """
     Return stored analysis for a Retell call if it has been processed.
     
     Returns status information if analysis is still processing or has errors.
+    ``top_n``, ``min_score`` and ``category_scores`` are derived from the
+    stored score matrix without calling Hume again.
     """
     call_entry = _ensure_call_registered(call_id)
     
@@ -1316,6 +2436,11 @@ async def get_retell_call_analysis(call_id: str, token_data: Dict[str, Any] = De
             payload["analysis"] = analysis_results
             _persist_retell_results(call_id, payload)
 
+    if top_n is not None or min_score is not None or category_scores:
+        analysis_results = await run_in_threadpool(
+            _render_from_score_matrix, call_id, call_entry, analysis_results, top_n, min_score, category_scores,
+        )
+
     first_result: Optional[Dict[str, Any]] = analysis_results[0] if analysis_results else None
 
     return JSONResponse(
@@ -1329,6 +2454,259 @@ async def get_retell_call_analysis(call_id: str, token_data: Dict[str, Any] = De
     )
 
 
+def _load_call_timeline(call_id: str, call_entry: Dict[str, Any]) -> Dict[str, Any]:
+    timeline_path = os.path.join(RETELL_RESULTS_DIR, f"{call_id}.timeline.json")
+    if os.path.exists(timeline_path):
+        try:
+            with open(timeline_path, "r", encoding="utf-8") as file:
+                timeline = json.load(file)
+            if timeline.get("version") == TIMELINE_VERSION:
+                return timeline
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Failed to read timeline for %s: %s", call_id, exc)
+
+    # Calls analysed before rollups existed (or with an older layout) are backfilled once
+    analysis_filename = call_entry.get("analysis_filename")
+    analysis_path = os.path.join(RETELL_RESULTS_DIR, analysis_filename) if analysis_filename else None
+    if not analysis_path or not os.path.exists(analysis_path):
+        raise HTTPException(status_code=404, detail="Analysis not available for this call")
+    with open(analysis_path, "r", encoding="utf-8") as file:
+        payload = json.load(file)
+    return _persist_call_timeline(call_id, payload.get("analysis") or [])
+
+
+@app.get("/retell/calls/{call_id}/timeline")
+async def get_retell_call_timeline(
+    call_id: str,
+    resolution: float = Query(DEFAULT_TIMELINE_RESOLUTION, ge=MIN_TIMELINE_RESOLUTION, le=600),
+    token_data: Dict[str, Any] = Depends(verify_token),
+):
+    """
+    Emotion timeline for an analysed call: bucketed category counts,
+    per-speaker valence and rolling valence, and emotion-shift points.
+    """
+    call_entry = _ensure_call_registered(call_id)
+    if call_entry.get("analysis_status") == "processing":
+        return JSONResponse(content={
+            "success": True,
+            "call_id": call_id,
+            "status": "processing",
+            "message": "Analysis is still in progress. Please check again in a few moments."
+        })
+
+    timeline = await run_in_threadpool(_load_call_timeline, call_id, call_entry)
+    try:
+        view = await run_in_threadpool(timeline_view, timeline, resolution)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return JSONResponse(content={
+        "success": True,
+        "call_id": call_id,
+        "timeline": view,
+    })
+
+
+_ANALYTICS_VIEWS = {
+    "summary": ("all", False),
+    "days": ("all", True),
+    "agents": ("agent", False),
+    "purposes": ("purpose", False),
+    "programs": ("program", False),
+}
+
+
+@app.get("/analytics/{view}")
+async def get_call_analytics(
+    view: str,
+    start: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    end: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    key: Optional[str] = Query(None),
+    by_day: bool = Query(False),
+    token_data: Dict[str, Any] = Depends(verify_token),
+):
+    """
+    Cross-call aggregates between ``start`` and ``end`` (UTC days, inclusive).
+
+    Views: summary, days, agents, purposes, programs. ``key`` narrows to one
+    agent/purpose/program and ``by_day`` splits the rows per day.
+    """
+    if view not in _ANALYTICS_VIEWS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown analytics view '{view}'. Available: {', '.join(_ANALYTICS_VIEWS)}",
+        )
+    dimension, default_by_day = _ANALYTICS_VIEWS[view]
+    rows = await run_in_threadpool(
+        _ANALYTICS.query, dimension, start, end, key, by_day or default_by_day,
+    )
+    for row in rows:
+        if dimension == "all":
+            row.pop("key", None)
+    return JSONResponse(content={
+        "success": True,
+        "view": view,
+        "start": start,
+        "end": end,
+        "rows": rows,
+    })
+
+
+@app.post("/analytics/rebuild")
+async def rebuild_call_analytics(token_data: Dict[str, Any] = Depends(verify_token)):
+    """Recompute every aggregate from the stored analyses."""
+    count = await run_in_threadpool(_rebuild_call_analytics)
+    return JSONResponse(content={"success": True, "calls": count})
+
+
+@app.get("/search")
+async def search_transcripts(
+    q: Optional[str] = Query(None, description="Words to find in the transcript; word* for a prefix"),
+    speaker: Optional[str] = Query(None),
+    emotion: Optional[str] = Query(None, description="Primary emotion aligned with the segment"),
+    category: Optional[str] = Query(None, pattern=r"^(positive|neutral|negative)$"),
+    call_id: Optional[str] = Query(None),
+    min_time: Optional[float] = Query(None, ge=0, description="Earliest segment start, seconds into the call"),
+    max_time: Optional[float] = Query(None, ge=0, description="Latest segment start, seconds into the call"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    token_data: Dict[str, Any] = Depends(verify_token),
+):
+    """
+    Transcript segments across analysed calls, ranked by relevance when ``q``
+    is given and in call order otherwise.
+    """
+    if not any((q, speaker, emotion, category, call_id)):
+        raise HTTPException(status_code=400, detail="Provide q, speaker, emotion, category or call_id")
+    total, hits = await run_in_threadpool(
+        _SEARCH_INDEX.search,
+        q, speaker, emotion, category, call_id, min_time, max_time,
+        page_size, (page - 1) * page_size,
+    )
+    return JSONResponse(content={
+        "success": True,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (total + page_size - 1) // page_size,
+        "hits": hits,
+    })
+
+
+@app.post("/retell/calls/{call_id}/profile")
+async def request_call_profile(
+    call_id: str,
+    enabled: bool = Query(True),
+    token_data: Dict[str, Any] = Depends(verify_token),
+):
+    """Trace the next full analysis of this call with cProfile (one-shot)."""
+    _ensure_call_registered(call_id)
+    _update_retell_call_entry(call_id, {"profile_requested": enabled})
+    return JSONResponse(content={"success": True, "call_id": call_id, "profile_requested": enabled})
+
+
+@app.get("/admin/profiles")
+async def list_analysis_profiles(token_data: Dict[str, Any] = Depends(verify_token)):
+    """Profiles of slow or flagged analysis runs, newest first."""
+    profiles = await run_in_threadpool(list_profiles, RETELL_RESULTS_DIR)
+    return JSONResponse(content={"success": True, "profiles": profiles})
+
+
+@app.get("/admin/profiles/{call_id}")
+async def get_analysis_profile(
+    call_id: str,
+    format: str = Query("json", pattern=r"^(json|folded|pstats)$"),  # pylint: disable=redefined-builtin
+    token_data: Dict[str, Any] = Depends(verify_token),
+):
+    """
+    The stored profile of a call: the JSON report, its collapsed stacks for a
+    flame graph (``folded``, sampled runs) or the raw cProfile dump (``pstats``).
+    """
+    if format == "pstats":
+        path = profile_paths(RETELL_RESULTS_DIR, call_id)["pstats"]
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="No cProfile dump stored for this call")
+        return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
+    profile = await run_in_threadpool(load_profile, RETELL_RESULTS_DIR, call_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No profile stored for this call")
+    if format == "folded":
+        if not profile.get("folded"):
+            raise HTTPException(status_code=404, detail="Profile has no sampled stacks; use format=pstats")
+        return PlainTextResponse("\n".join(profile["folded"]) + "\n")
+    return JSONResponse(content={"success": True, "profile": profile})
+
+
+@app.get("/clients/metrics")
+async def http_client_metrics(token_data: Dict[str, Any] = Depends(verify_token)):
+    """Report request and connection-reuse counts for the shared outbound clients."""
+    return JSONResponse(content={
+        "success": True,
+        "clients": get_client_registry().metrics(),
+        "retell_call_cache": get_retell_call_cache_stats(),
+        "resilience": resilience_metrics(),
+    })
+
+
+def _collect_runtime_metrics() -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], Any]]]]:
+    """Scrape-time families for state kept outside the metrics registry."""
+    cache = get_retell_call_cache_stats()
+    clients = get_client_registry().metrics()
+    guards = resilience_metrics()
+    backlog = _WEBHOOK_LOG.backlog() if _WEBHOOK_LOG.running else {"pending_appends": 0, "sealed_segments": 0}
+    return [
+        ("retell_call_cache_lookups", "counter", "Retell get-call cache lookups by result.", [
+            ({"result": "hit"}, cache["hits"]),
+            ({"result": "miss"}, cache["misses"]),
+            ({"result": "shared"}, cache["shared_fetches"]),
+            ({"result": "revalidated"}, cache["revalidated"]),
+        ]),
+        ("retell_call_cache_hit_ratio", "gauge", "Share of Retell get-call lookups served without a full fetch.", [
+            ({}, cache["hit_ratio"]),
+        ]),
+        ("retell_call_cache_entries", "gauge", "Calls held in the Retell get-call cache.", [({}, cache["entries"])]),
+        ("retell_calls_stored", "gauge", "Calls in the call store.", [({}, _CALL_STORE.count())]),
+        ("webhook_log_backlog", "gauge", "Webhook events waiting for fsync, and sealed segments waiting for compaction.", [
+            ({"kind": kind}, value) for kind, value in backlog.items()
+        ]),
+        ("http_client_requests", "counter", "Outbound requests per shared client.", [
+            ({"client": name}, stats["requests"]) for name, stats in clients.items()
+        ]),
+        ("http_client_connections_opened", "counter", "Connections opened per shared client.", [
+            ({"client": name}, stats["connections_opened"]) for name, stats in clients.items()
+        ]),
+        ("provider_requests", "counter", "Guarded provider requests by outcome.", [
+            ({"provider": name, "outcome": key}, guard[key])
+            for name, guard in guards.items()
+            for key in ("calls", "retries", "throttled", "failures", "rejected")
+        ]),
+        ("provider_circuit_open", "gauge", "1 while a provider's circuit breaker is open or half-open.", [
+            ({"provider": name}, 0 if guard["circuit"]["state"] == "closed" else 1) for name, guard in guards.items()
+        ]),
+        ("provider_rate_limit", "gauge", "Current allowed requests per second for a provider.", [
+            ({"provider": name}, guard["rate_limit"]["rate"]) for name, guard in guards.items()
+        ]),
+    ]
+
+
+REGISTRY.add_collector(_collect_runtime_metrics)
+
+
+def verify_metrics_access(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    """Accept the scrape token when one is configured, otherwise a normal JWT."""
+    if METRICS_SCRAPE_TOKEN and hmac.compare_digest(credentials.credentials, METRICS_SCRAPE_TOKEN):
+        return {"sub": "metrics-scraper"}
+    return verify_token(credentials)
+
+
+@app.get("/metrics")
+async def prometheus_metrics(token_data: Dict[str, Any] = Depends(verify_metrics_access)):
+    """Pipeline, store and client metrics in the Prometheus text format."""
+    # Collectors hit SQLite; keep them off the event loop
+    rendered = await run_in_threadpool(REGISTRY.render)
+    return PlainTextResponse(rendered, media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
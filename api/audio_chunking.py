@@ -0,0 +1,268 @@
+import io
+import logging
+import os
+import wave
+try:
+    import audioop  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - fallback for Python>=3.13
+    from audioop_lts import audioop  # type: ignore
+from typing import Dict, Any, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Recordings longer than this many seconds are sent to Hume in chunks; 0 disables chunking.
+HUME_CHUNK_SECONDS = float(os.getenv("HUME_CHUNK_SECONDS", "0"))
+# Seconds of audio shared by neighbouring chunks, so no utterance is cut off at a boundary.
+HUME_CHUNK_OVERLAP_SECONDS = float(os.getenv("HUME_CHUNK_OVERLAP_SECONDS", "2"))
+# How far before the nominal boundary to look for the quietest point to cut at.
+HUME_CHUNK_SEARCH_SECONDS = float(os.getenv("HUME_CHUNK_SEARCH_SECONDS", "5"))
+# "parallel" submits every chunk as its own job; "single" puts all chunks into one multi-file job.
+HUME_CHUNK_MODE = os.getenv("HUME_CHUNK_MODE", "parallel").lower()
+# Chunk jobs in flight at once for one analysis in parallel mode.
+HUME_CHUNK_PARALLELISM = max(1, int(os.getenv("HUME_CHUNK_PARALLELISM", "4")))
+# Seconds to wait for one chunk job before giving up on it.
+HUME_CHUNK_MAX_WAIT_SECONDS = float(os.getenv("HUME_CHUNK_MAX_WAIT_SECONDS", "300"))
+
+# Length of the RMS windows compared when looking for silence.
+_SILENCE_WINDOW_SECONDS = 0.02
+# Every chunk starts at least this share of a chunk after the previous one.
+_MIN_STEP_SHARE = 0.25
+
+_clamp_warnings_logged = set()
+
+
+class AudioChunk:
+    """One window of a channel recording, with where it sits in the original."""
+
+    def __init__(self, filename: str, source_filename: str, content: bytes, offset: float, duration: float):
+        self.filename = filename
+        self.source_filename = source_filename
+        self.content = content
+        self.offset = offset
+        self.duration = duration
+        # Stretch of the original this chunk's predictions are kept for; set by split_wav_into_chunks
+        self.keep_start = offset
+        self.keep_end = float("inf")
+
+
+def _quietest_frame(frames: bytes, sampwidth: int, nchannels: int, framerate: int, start: int, end: int) -> int:
+    """Frame index in ``[start, end)`` at the centre of the lowest-RMS window, preferring later ones."""
+    window = max(1, int(framerate * _SILENCE_WINDOW_SECONDS))
+    frame_size = sampwidth * nchannels
+    best_frame = end
+    best_rms: Optional[int] = None
+    position = end - window
+    while position >= start:
+        rms = audioop.rms(frames[position * frame_size:(position + window) * frame_size], sampwidth)
+        if best_rms is None or rms < best_rms:
+            best_rms = rms
+            best_frame = position + window // 2
+            if rms == 0:
+                break
+        position -= window
+    return best_frame
+
+
+def _chunk_settings(chunk_seconds: float, overlap_seconds: float, search_seconds: float) -> Tuple[float, float]:
+    """
+    Overlap and search span clamped so chunks always advance by a real step.
+
+    The overlap has to stay under half a chunk, and overlap plus search
+    must leave at least ``_MIN_STEP_SHARE`` of a chunk between consecutive
+    chunk starts; otherwise a long recording would turn into thousands of
+    near-identical jobs.
+    """
+    overlap = max(overlap_seconds, 0.0)
+    if overlap >= chunk_seconds / 2:
+        overlap = chunk_seconds * _MIN_STEP_SHARE
+    search = min(max(search_seconds, 0.0), chunk_seconds * (1 - _MIN_STEP_SHARE) - overlap)
+    if (overlap, search) != (overlap_seconds, search_seconds):
+        key = (chunk_seconds, overlap_seconds, search_seconds)
+        if key not in _clamp_warnings_logged:
+            _clamp_warnings_logged.add(key)
+            logger.warning(
+                "HUME_CHUNK_OVERLAP_SECONDS=%s/HUME_CHUNK_SEARCH_SECONDS=%s do not fit %ss chunks; using %s/%s",
+                overlap_seconds, search_seconds, chunk_seconds, overlap, search,
+            )
+    return overlap, search
+
+
+def _chunk_bounds(
+    frames: bytes,
+    sampwidth: int,
+    nchannels: int,
+    framerate: int,
+    nframes: int,
+    chunk_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float,
+) -> List[Tuple[int, int]]:
+    """Frame ranges of the chunks; expects settings already passed through ``_chunk_settings``."""
+    chunk_frames = int(chunk_seconds * framerate)
+    overlap_frames = int(overlap_seconds * framerate)
+    search_frames = int(search_seconds * framerate)
+    min_step = max(chunk_frames - overlap_frames - search_frames, 1)
+    bounds: List[Tuple[int, int]] = []
+    start = 0
+    while True:
+        if nframes - start <= chunk_frames:
+            bounds.append((start, nframes))
+            return bounds
+        nominal_end = start + chunk_frames
+        end = _quietest_frame(frames, sampwidth, nchannels, framerate, nominal_end - search_frames, nominal_end)
+        bounds.append((start, end))
+        # The cut is at least chunk - search in, so this always moves forward by min_step or more
+        start = max(end - overlap_frames, start + min_step)
+
+
+def _chunk_filename(filename: str, index: int) -> str:
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.chunk{index:03d}{ext or '.wav'}"
+
+
+def split_wav_into_chunks(
+    filename: str,
+    wav_bytes: bytes,
+    chunk_seconds: float = HUME_CHUNK_SECONDS,
+    overlap_seconds: float = HUME_CHUNK_OVERLAP_SECONDS,
+    search_seconds: float = HUME_CHUNK_SEARCH_SECONDS,
+) -> List[AudioChunk]:
+    """
+    Cut a WAV recording into overlapping windows of about ``chunk_seconds``.
+
+    Each window ends at the quietest point within ``search_seconds`` before
+    its nominal end and the next one starts ``overlap_seconds`` earlier.
+    Recordings that fit in one window, and anything that is not a readable
+    WAV file, come back as a single chunk holding the original bytes.
+    """
+    whole = [AudioChunk(filename, filename, wav_bytes, 0.0, 0.0)]
+    if chunk_seconds <= 0 or not filename.lower().endswith(".wav"):
+        return whole
+    try:
+        with wave.open(io.BytesIO(wav_bytes), "rb") as wav_in:
+            nchannels, sampwidth, framerate, nframes = wav_in.getparams()[:4]
+            frames = wav_in.readframes(nframes)
+    except (wave.Error, EOFError):
+        return whole
+    whole[0].duration = nframes / float(framerate or 1)
+    overlap_seconds, search_seconds = _chunk_settings(chunk_seconds, overlap_seconds, search_seconds)
+    if not framerate or nframes <= int((chunk_seconds + overlap_seconds) * framerate):
+        return whole
+
+    frame_size = sampwidth * nchannels
+    bounds = _chunk_bounds(frames, sampwidth, nchannels, framerate, nframes, chunk_seconds, overlap_seconds, search_seconds)
+    chunks = []
+    for index, (start, end) in enumerate(bounds):
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_out:
+            wav_out.setnchannels(nchannels)
+            wav_out.setsampwidth(sampwidth)
+            wav_out.setframerate(framerate)
+            wav_out.writeframes(frames[start * frame_size:end * frame_size])
+        chunks.append(AudioChunk(
+            _chunk_filename(filename, index),
+            filename,
+            buffer.getvalue(),
+            start / float(framerate),
+            (end - start) / float(framerate),
+        ))
+
+    # Neighbours split their overlap down the middle; a segment belongs to the chunk holding its midpoint
+    for previous, current in zip(chunks, chunks[1:]):
+        boundary = (current.offset + previous.offset + previous.duration) / 2
+        previous.keep_end = boundary
+        current.keep_start = boundary
+    chunks[0].keep_start = 0.0
+    return chunks
+
+
+def plan_chunks(file_contents: List[Tuple[str, bytes]], chunk_seconds: float = HUME_CHUNK_SECONDS) -> List[AudioChunk]:
+    """Chunks for every file in an analysis, in file order."""
+    chunks: List[AudioChunk] = []
+    for filename, content in file_contents:
+        chunks.extend(split_wav_into_chunks(filename, content, chunk_seconds))
+    return chunks
+
+
+def _shift_predictions(predictions: List[Dict[str, Any]], chunk: AudioChunk) -> List[Dict[str, Any]]:
+    shifted = []
+    for prediction in predictions:
+        time_info = prediction.get("time")
+        if not isinstance(time_info, dict):
+            # Without a time the segment cannot be placed; keep it once, from the first chunk
+            if chunk.keep_start == 0.0:
+                shifted.append(prediction)
+            continue
+        begin = (time_info.get("begin") or 0.0) + chunk.offset
+        end = (time_info.get("end") or 0.0) + chunk.offset
+        midpoint = (begin + end) / 2
+        if chunk.keep_start <= midpoint < chunk.keep_end:
+            shifted.append({**prediction, "time": {**time_info, "begin": round(begin, 3), "end": round(end, 3)}})
+    return shifted
+
+
+def stitch_chunk_predictions(predictions_data: List[Dict[str, Any]], chunks: List[AudioChunk]) -> List[Dict[str, Any]]:
+    """
+    Reassemble Hume predictions for chunked files into one entry per original file.
+
+    Segment times are moved by their chunk's offset into the original
+    recording, and a segment predicted by two overlapping chunks is only kept
+    from the chunk whose half of the overlap holds its midpoint. Entries for
+    files that were not chunked pass through unchanged.
+    """
+    by_filename = {chunk.filename: chunk for chunk in chunks}
+    stitched: Dict[str, Dict[str, Any]] = {}
+    # Original files in submission order, whichever chunk job finished first
+    order = list(dict.fromkeys(chunk.source_filename for chunk in chunks))
+    passthrough: Dict[str, List[Dict[str, Any]]] = {}
+
+    for item in predictions_data:
+        if not isinstance(item, dict):
+            continue
+        filename = (item.get("source") or {}).get("filename")
+        chunk = by_filename.get(filename)
+        if chunk is None or chunk.filename == chunk.source_filename:
+            passthrough.setdefault(filename, []).append(item)
+            continue
+
+        entry = stitched.get(chunk.source_filename)
+        if entry is None:
+            entry = {
+                **item,
+                "source": {**item["source"], "filename": chunk.source_filename},
+                "results": {"predictions": [{"file": chunk.source_filename, "models": {}}], "errors": []},
+                "_groups": {},
+            }
+            entry["source"].pop("md5sum", None)
+            stitched[chunk.source_filename] = entry
+
+        results = item.get("results") or {}
+        entry["results"]["errors"].extend(results.get("errors") or [])
+        models_out = entry["results"]["predictions"][0]["models"]
+        for prediction in results.get("predictions") or []:
+            for source, model in (prediction.get("models") or {}).items():
+                if not isinstance(model, dict):
+                    continue
+                model_out = models_out.setdefault(source, {**model, "grouped_predictions": []})
+                for group in model.get("grouped_predictions") or []:
+                    key = (source, group.get("id"))
+                    group_out = entry["_groups"].get(key)
+                    if group_out is None:
+                        group_out = {**group, "predictions": []}
+                        entry["_groups"][key] = group_out
+                        model_out["grouped_predictions"].append(group_out)
+                    group_out["predictions"].extend(_shift_predictions(group.get("predictions") or [], chunk))
+
+    for entry in stitched.values():
+        for group in entry.pop("_groups").values():
+            group["predictions"].sort(key=lambda prediction: (prediction.get("time") or {}).get("begin") or 0.0)
+
+    ordered: List[Dict[str, Any]] = []
+    for filename in order:
+        if filename in stitched:
+            ordered.append(stitched[filename])
+        ordered.extend(passthrough.pop(filename, []))
+    for items in passthrough.values():
+        ordered.extend(items)
+    return ordered
@@ -0,0 +1,139 @@
+import io
+import logging
+import os
+import wave
+try:
+    import audioop  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - fallback for Python>=3.13
+    from audioop_lts import audioop  # type: ignore
+from typing import Dict, Any, List, Tuple
+
+try:
+    import soundfile
+except (ImportError, OSError):  # OSError: the package is there but libsndfile is not
+    soundfile = None
+
+
+logger = logging.getLogger(__name__)
+
+# Sample rate channel audio is brought down to before upload; 0 keeps the recorded rate.
+# Hume's prosody model does not need more than 16 kHz of telephone speech.
+HUME_AUDIO_SAMPLE_RATE = int(os.getenv("HUME_AUDIO_SAMPLE_RATE", "0"))
+# "wav" uploads PCM as recorded; "flac" compresses it losslessly (needs the soundfile package).
+HUME_AUDIO_FORMAT = os.getenv("HUME_AUDIO_FORMAT", "wav").lower()
+
+# Anything wider than 16-bit PCM is narrowed; the extra precision is lost on speech anyway
+_MAX_SAMPLE_WIDTH = 2
+
+_flac_warning_logged = False
+
+
+def resample_wav(wav_bytes: bytes, sample_rate: int) -> bytes:
+    """
+    Resample a WAV recording down to ``sample_rate`` and at most 16 bits.
+
+    Recordings already at or below the target rate keep their rate; files
+    that are not readable WAV come back unchanged.
+    """
+    try:
+        with wave.open(io.BytesIO(wav_bytes), "rb") as wav_in:
+            nchannels, sampwidth, framerate, nframes = wav_in.getparams()[:4]
+            frames = wav_in.readframes(nframes)
+    except (wave.Error, EOFError):
+        return wav_bytes
+
+    target_rate = sample_rate if 0 < sample_rate < framerate else framerate
+    target_width = min(sampwidth, _MAX_SAMPLE_WIDTH)
+    if target_rate == framerate and target_width == sampwidth:
+        return wav_bytes
+
+    if target_width != sampwidth:
+        frames = audioop.lin2lin(frames, sampwidth, target_width)
+    if target_rate != framerate:
+        frames, _ = audioop.ratecv(frames, target_width, nchannels, framerate, target_rate, None)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_out:
+        wav_out.setnchannels(nchannels)
+        wav_out.setsampwidth(target_width)
+        wav_out.setframerate(target_rate)
+        wav_out.writeframes(frames)
+    return buffer.getvalue()
+
+
+def encode_flac(wav_bytes: bytes) -> bytes:
+    """Losslessly re-encode WAV bytes as FLAC."""
+    if soundfile is None:
+        raise RuntimeError("FLAC encoding needs the soundfile package")
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wav_in:
+        sampwidth = wav_in.getsampwidth()
+    subtype = {1: "PCM_U8", 2: "PCM_16", 3: "PCM_24"}.get(sampwidth, "PCM_24")
+    data, sample_rate = soundfile.read(io.BytesIO(wav_bytes), dtype="int32" if sampwidth > 2 else "int16")
+    buffer = io.BytesIO()
+    soundfile.write(buffer, data, sample_rate, format="FLAC", subtype=subtype)
+    return buffer.getvalue()
+
+
+def resample_files(file_contents: List[Tuple[str, bytes]], sample_rate: int = HUME_AUDIO_SAMPLE_RATE) -> List[Tuple[str, bytes]]:
+    """Bring every WAV file of an analysis down to ``sample_rate``."""
+    if sample_rate <= 0:
+        return file_contents
+    return [
+        (filename, resample_wav(content, sample_rate) if filename.lower().endswith(".wav") else content)
+        for filename, content in file_contents
+    ]
+
+
+def encode_uploads(
+    file_contents: List[Tuple[str, bytes]],
+    audio_format: str = HUME_AUDIO_FORMAT,
+) -> Tuple[List[Tuple[str, bytes]], Dict[str, str]]:
+    """
+    Encode WAV files in the upload format.
+
+    Returns the files to upload and, for every file that was renamed on the
+    way (``x.wav`` sent as ``x.flac``), its original name keyed by the
+    uploaded one, so predictions can be attributed back.
+    """
+    global _flac_warning_logged
+    if audio_format != "flac":
+        return file_contents, {}
+    if soundfile is None:
+        if not _flac_warning_logged:
+            logger.warning("HUME_AUDIO_FORMAT=flac but soundfile is not installed; uploading WAV")
+            _flac_warning_logged = True
+        return file_contents, {}
+
+    encoded: List[Tuple[str, bytes]] = []
+    original_names: Dict[str, str] = {}
+    for filename, content in file_contents:
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() != ".wav":
+            encoded.append((filename, content))
+            continue
+        try:
+            flac_bytes = encode_flac(content)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning("Could not encode %s as FLAC, uploading WAV: %s", filename, exc)
+            encoded.append((filename, content))
+            continue
+        upload_name = f"{stem}.flac"
+        original_names[upload_name] = filename
+        encoded.append((upload_name, flac_bytes))
+    return encoded, original_names
+
+
+def restore_upload_names(predictions_data: List[Dict[str, Any]], original_names: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Put the original file names back on predictions for renamed uploads, in place."""
+    for item in predictions_data:
+        if not isinstance(item, dict):
+            continue
+        source = item.get("source")
+        if not isinstance(source, dict) or source.get("filename") not in original_names:
+            continue
+        original = original_names[source["filename"]]
+        source["filename"] = original
+        for prediction in (item.get("results") or {}).get("predictions") or []:
+            if isinstance(prediction, dict) and prediction.get("file") in original_names:
+                prediction["file"] = original
+    return predictions_data
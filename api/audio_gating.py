@@ -0,0 +1,185 @@
+import bisect
+import io
+import math
+import os
+import wave
+try:
+    import audioop  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - fallback for Python>=3.13
+    from audioop_lts import audioop  # type: ignore
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# Drop long silences from each channel before it goes to Hume.
+HUME_SILENCE_GATING = os.getenv("HUME_SILENCE_GATING", "false").lower() in {"1", "true", "yes"}
+# Silences shorter than this many seconds are left in place.
+HUME_SILENCE_MIN_SECONDS = float(os.getenv("HUME_SILENCE_MIN_SECONDS", "1.0"))
+# Seconds of silence kept on each side of the speech around a removed gap.
+HUME_SILENCE_PADDING_SECONDS = float(os.getenv("HUME_SILENCE_PADDING_SECONDS", "0.25"))
+# Frames quieter than this are always silence, however quiet the line is.
+HUME_SILENCE_THRESHOLD_DBFS = float(os.getenv("HUME_SILENCE_THRESHOLD_DBFS", "-60"))
+# Frames less than this many dB above the channel's noise floor count as silence.
+HUME_SILENCE_MARGIN_DB = float(os.getenv("HUME_SILENCE_MARGIN_DB", "6"))
+
+_FRAME_SECONDS = 0.03
+# Share of frames assumed to be background noise when estimating the noise floor
+_NOISE_FLOOR_QUANTILE = 0.2
+
+
+class OffsetMap:
+    """
+    Where each stretch of a gated recording came from in the original.
+
+    ``spans`` holds ``(gated_start, original_start, duration)`` in seconds,
+    in order and back to back in gated time.
+    """
+
+    def __init__(self, spans: List[Tuple[float, float, float]], original_seconds: float):
+        self.spans = spans
+        self.original_seconds = original_seconds
+        self._starts = [span[0] for span in spans]
+
+    @property
+    def gated_seconds(self) -> float:
+        if not self.spans:
+            return 0.0
+        gated_start, _, duration = self.spans[-1]
+        return gated_start + duration
+
+    def to_original(self, seconds: float, is_end: bool = False) -> float:
+        """
+        Original time of a point in the gated recording.
+
+        A segment end that falls exactly on a cut belongs to the stretch
+        before it, so a segment never stretches across a gap it did not cover.
+        """
+        if not self.spans:
+            return seconds
+        if is_end:
+            index = bisect.bisect_left(self._starts, seconds) - 1
+        else:
+            index = bisect.bisect_right(self._starts, seconds) - 1
+        gated_start, original_start, duration = self.spans[max(index, 0)]
+        return original_start + min(max(seconds - gated_start, 0.0), duration)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "original_seconds": round(self.original_seconds, 3),
+            "submitted_seconds": round(self.gated_seconds, 3),
+            "kept_spans": len(self.spans),
+        }
+
+
+def _silence_threshold(levels: List[int], sampwidth: int) -> float:
+    full_scale = float(1 << (8 * sampwidth - 1))
+    floor = sorted(levels)[int(len(levels) * _NOISE_FLOOR_QUANTILE)]
+    absolute = full_scale * 10 ** (HUME_SILENCE_THRESHOLD_DBFS / 20)
+    relative = max(floor, 1) * 10 ** (HUME_SILENCE_MARGIN_DB / 20)
+    return max(absolute, min(relative, full_scale))
+
+
+def _voiced_spans(levels: List[int], threshold: float, frame_count: int, total_frames: int) -> List[Tuple[int, int]]:
+    """Frame ranges to keep: everything except silences of at least the minimum length, minus padding."""
+    min_silent = max(1, math.ceil(HUME_SILENCE_MIN_SECONDS / _FRAME_SECONDS))
+    padding = int(HUME_SILENCE_PADDING_SECONDS / _FRAME_SECONDS)
+    gaps: List[Tuple[int, int]] = []
+    run_start: Optional[int] = None
+    for index, level in enumerate(levels + [threshold + 1]):
+        if level < threshold:
+            if run_start is None:
+                run_start = index
+        elif run_start is not None:
+            if index - run_start >= min_silent:
+                # Leading and trailing silence need no padding on the outer side
+                start = run_start + (padding if run_start else 0)
+                end = index - (padding if index < len(levels) else 0)
+                if end > start:
+                    gaps.append((start, end))
+            run_start = None
+
+    spans: List[Tuple[int, int]] = []
+    position = 0
+    for gap_start, gap_end in gaps:
+        if gap_start > position:
+            spans.append((position * frame_count, gap_start * frame_count))
+        position = gap_end
+    if position < len(levels):
+        spans.append((position * frame_count, total_frames))
+    return spans
+
+
+def gate_silence(filename: str, wav_bytes: bytes) -> Tuple[bytes, Optional[OffsetMap]]:
+    """
+    Cut long silences out of a WAV recording.
+
+    Frames are judged by their RMS level against the channel's own noise
+    floor, so a quiet customer line is not mistaken for silence. Returns the
+    gated WAV bytes and the map back to original time, or the original bytes
+    and ``None`` when there is nothing worth removing or the file is not a
+    readable WAV.
+    """
+    if not filename.lower().endswith(".wav"):
+        return wav_bytes, None
+    try:
+        with wave.open(io.BytesIO(wav_bytes), "rb") as wav_in:
+            nchannels, sampwidth, framerate, nframes = wav_in.getparams()[:4]
+            frames = wav_in.readframes(nframes)
+    except (wave.Error, EOFError):
+        return wav_bytes, None
+    frame_count = int(framerate * _FRAME_SECONDS)
+    if not frame_count or nframes < frame_count:
+        return wav_bytes, None
+
+    frame_size = sampwidth * nchannels
+    step = frame_count * frame_size
+    levels = [audioop.rms(frames[offset:offset + step], sampwidth) for offset in range(0, nframes * frame_size, step)]
+    spans = _voiced_spans(levels, _silence_threshold(levels, sampwidth), frame_count, nframes)
+    if not spans or spans == [(0, nframes)]:
+        # All silence is left to Hume as is; an empty file would only fail the job
+        return wav_bytes, None
+
+    offset_spans: List[Tuple[float, float, float]] = []
+    gated_frames = 0
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_out:
+        wav_out.setnchannels(nchannels)
+        wav_out.setsampwidth(sampwidth)
+        wav_out.setframerate(framerate)
+        for start, end in spans:
+            wav_out.writeframes(frames[start * frame_size:end * frame_size])
+            offset_spans.append((gated_frames / framerate, start / framerate, (end - start) / framerate))
+            gated_frames += end - start
+    return buffer.getvalue(), OffsetMap(offset_spans, nframes / float(framerate))
+
+
+def gate_files(file_contents: List[Tuple[str, bytes]]) -> Tuple[List[Tuple[str, bytes]], Dict[str, OffsetMap]]:
+    """Gate every file of an analysis; returns the new contents and the maps of the files that changed."""
+    gated: List[Tuple[str, bytes]] = []
+    offset_maps: Dict[str, OffsetMap] = {}
+    for filename, content in file_contents:
+        content, offset_map = gate_silence(filename, content)
+        if offset_map is not None:
+            offset_maps[filename] = offset_map
+        gated.append((filename, content))
+    return gated, offset_maps
+
+
+def restore_original_times(predictions_data: List[Dict[str, Any]], offset_maps: Dict[str, OffsetMap]) -> List[Dict[str, Any]]:
+    """Move prediction times of gated files back to the original recording, in place."""
+    for item in predictions_data:
+        if not isinstance(item, dict):
+            continue
+        offset_map = offset_maps.get((item.get("source") or {}).get("filename"))
+        if offset_map is None:
+            continue
+        for prediction in (item.get("results") or {}).get("predictions") or []:
+            for model in (prediction.get("models") or {}).values():
+                if not isinstance(model, dict):
+                    continue
+                for group in model.get("grouped_predictions") or []:
+                    for segment in group.get("predictions") or []:
+                        time_info = segment.get("time")
+                        if isinstance(time_info, dict):
+                            time_info["begin"] = round(offset_map.to_original(time_info.get("begin") or 0.0), 3)
+                            time_info["end"] = round(offset_map.to_original(time_info.get("end") or 0.0, is_end=True), 3)
+    return predictions_data
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterator
+
+from metrics import STORE_OPERATION_SECONDS
+from tracing import start_span
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds a writer waits for another process to release the database lock.
+STORE_BUSY_TIMEOUT = float(os.getenv("RETELL_STORE_BUSY_TIMEOUT", "30"))
+
+_SPAN_ATTRIBUTES = {"db.system": "sqlite"}
+
+
+class CallStoreTransaction:
+    """Read/write view of the call store bound to one open SQLite transaction."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self._connection
+
+    def get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection.execute(
+            "SELECT data FROM calls WHERE call_id = ?", (call_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, call_id: str, entry: Dict[str, Any]) -> None:
+        start_timestamp = entry.get("start_timestamp")
+        if not isinstance(start_timestamp, (int, float)):
+            start_timestamp = None
+        self._connection.execute(
+            "INSERT INTO calls (call_id, data, start_timestamp, last_updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(call_id) DO UPDATE SET data = excluded.data, "
+            "start_timestamp = excluded.start_timestamp, last_updated = excluded.last_updated",
+            (call_id, json.dumps(entry), start_timestamp, entry.get("last_updated")),
+        )
+
+    def delete(self, call_id: str) -> bool:
+        cursor = self._connection.execute("DELETE FROM calls WHERE call_id = ?", (call_id,))
+        return cursor.rowcount > 0
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        rows = self._connection.execute(
+            "SELECT call_id, data FROM calls ORDER BY start_timestamp DESC"
+        ).fetchall()
+        return {call_id: json.loads(data) for call_id, data in rows}
+
+    def call_ids(self) -> list:
+        return [row[0] for row in self._connection.execute("SELECT call_id FROM calls")]
+
+    def count(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+
+    def has_webhook_event(self, call_id: str, payload_hash: str) -> bool:
+        row = self._connection.execute(
+            "SELECT 1 FROM webhook_events WHERE call_id = ? AND payload_hash = ?",
+            (call_id, payload_hash),
+        ).fetchone()
+        return row is not None
+
+    def add_webhook_event(self, call_id: str, payload_hash: str, received_at: str, max_events: int) -> bool:
+        """Record a processed event; returns False if it was already recorded."""
+        cursor = self._connection.execute(
+            "INSERT OR IGNORE INTO webhook_events (call_id, payload_hash, received_at) VALUES (?, ?, ?)",
+            (call_id, payload_hash, received_at),
+        )
+        if cursor.rowcount == 0:
+            return False
+        # Keep only the most recent events so the index stays bounded
+        self._connection.execute(
+            "DELETE FROM webhook_events WHERE id <= ?",
+            (cursor.lastrowid - max_events,),
+        )
+        return True
+
+
+class CallStore:
+    """
+    Process-safe Retell call metadata store backed by SQLite.
+
+    Every read-modify-write runs inside a ``BEGIN IMMEDIATE`` transaction, so
+    several uvicorn workers (or replicas sharing the volume) can update the
+    same database without losing each other's writes. On first use an existing
+    ``retell_calls.json`` is imported so deployments keep their history.
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._initialize()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.db_path,
+            timeout=STORE_BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA busy_timeout = %d" % int(STORE_BUSY_TIMEOUT * 1000))
+        connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    def _initialize(self) -> None:
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS calls ("
+                "call_id TEXT PRIMARY KEY, "
+                "data TEXT NOT NULL, "
+                "start_timestamp REAL, "
+                "last_updated TEXT)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_calls_start_timestamp ON calls (start_timestamp)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS webhook_events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "call_id TEXT NOT NULL, "
+                "payload_hash TEXT NOT NULL, "
+                "received_at TEXT, "
+                "UNIQUE (call_id, payload_hash))"
+            )
+        finally:
+            connection.close()
+        self._import_legacy_json()
+
+    def _import_legacy_json(self) -> None:
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+
+        with self.transaction() as txn:
+            marker = txn.connection.execute(
+                "SELECT value FROM store_meta WHERE key = 'legacy_json_imported'"
+            ).fetchone()
+            if marker is not None:
+                return
+
+            try:
+                with open(self.legacy_json_path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.error("Failed to import legacy call store %s: %s", self.legacy_json_path, exc)
+                data = {}
+
+            calls = data.get("calls") if isinstance(data, dict) else None
+            imported = 0
+            if isinstance(calls, dict):
+                for call_id, entry in calls.items():
+                    if isinstance(entry, dict) and txn.get(call_id) is None:
+                        txn.put(call_id, entry)
+                        imported += 1
+
+            txn.connection.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('legacy_json_imported', ?)",
+                (self.legacy_json_path,),
+            )
+            logger.info("Imported %d calls from %s into %s", imported, self.legacy_json_path, self.db_path)
+
+    @contextmanager
+    def transaction(self) -> Iterator[CallStoreTransaction]:
+        """Open a write transaction that holds the database lock until it exits."""
+        connection = self._connect()
+        try:
+            with STORE_OPERATION_SECONDS.time(operation="write"), start_span("call_store write", attributes=_SPAN_ATTRIBUTES):
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    yield CallStoreTransaction(connection)
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    @contextmanager
+    def snapshot(self) -> Iterator[CallStoreTransaction]:
+        """Open a read-only view; readers never block writers in WAL mode."""
+        connection = self._connect()
+        try:
+            with STORE_OPERATION_SECONDS.time(operation="read"), start_span("call_store read", attributes=_SPAN_ATTRIBUTES):
+                connection.execute("BEGIN")
+                try:
+                    yield CallStoreTransaction(connection)
+                finally:
+                    connection.execute("ROLLBACK")
+        finally:
+            connection.close()
+
+    def get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        with self.snapshot() as txn:
+            return txn.get(call_id)
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        with self.snapshot() as txn:
+            return txn.load_all()
+
+    def count(self) -> int:
+        with self.snapshot() as txn:
+            return txn.count()
@@ -1,50 +1,122 @@
-EMOTION_CATEGORIES = {
-    "admiration": "positive",
-    "adoration": "positive",
-    "aesthetic appreciation": "positive",
-    "amusement": "positive",
-    "anger": "negative",
-    "anxiety": "negative",
-    "awe": "positive",
-    "awkwardness": "neutral",
-    "boredom": "negative",
-    "calmness": "neutral",
-    "concentration": "neutral",
-    "confusion": "neutral",
-    "contemplation": "neutral",
-    "contentment": "positive",
-    "craving": "neutral",
-    "desire": "positive",
-    "determination": "positive",
-    "disappointment": "negative",
-    "disgust": "negative",
-    "distress": "negative",
-    "doubt": "negative",
-    "embarrassment": "negative",
-    "empathic pain": "negative",
-    "entrancement": "positive",
-    "envy": "negative",
-    "excitement": "positive",
-    "fear": "negative",
-    "guilt": "negative",
-    "horror": "negative",
-    "interest": "positive",
-    "joy": "positive",
-    "love": "positive",
-    "nostalgia": "neutral",
-    "pain": "negative",
-    "pride": "positive",
-    "realization": "neutral",
-    "relief": "positive",
-    "romance": "positive",
-    "sadness": "negative",
-    "satisfaction": "positive",
-    "shame": "negative",
-    "surprise (negative)": "negative",
-    "surprise (positive)": "positive",
-    "sympathy": "positive",
-    "tiredness": "neutral",
-    "triumph": "positive",
+import sys
+from enum import IntEnum
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+
+class EmotionCategory(IntEnum):
+    """Sentiment grouping of an emotion; the integer value is its valence."""
+
+    NEGATIVE = -1
+    NEUTRAL = 0
+    POSITIVE = 1
+
+    @property
+    def label(self) -> str:
+        return _CATEGORY_LABELS[self]
+
+
+_CATEGORY_LABELS = {
+    EmotionCategory.NEGATIVE: "negative",
+    EmotionCategory.NEUTRAL: "neutral",
+    EmotionCategory.POSITIVE: "positive",
+}
+
+CATEGORY_BY_LABEL: Dict[str, EmotionCategory] = {label: category for category, label in _CATEGORY_LABELS.items()}
+
+DEFAULT_CATEGORY = EmotionCategory.NEUTRAL
+DEFAULT_EMOTION_CATEGORY = DEFAULT_CATEGORY.label
+
+# Hume emotion taxonomy. The position of a name is its emotion ID, so IDs stay
+# stable as long as new emotions are only ever appended.
+_TAXONOMY: Tuple[Tuple[str, EmotionCategory], ...] = (
+    ("Admiration", EmotionCategory.POSITIVE),
+    ("Adoration", EmotionCategory.POSITIVE),
+    ("Aesthetic Appreciation", EmotionCategory.POSITIVE),
+    ("Amusement", EmotionCategory.POSITIVE),
+    ("Anger", EmotionCategory.NEGATIVE),
+    ("Anxiety", EmotionCategory.NEGATIVE),
+    ("Awe", EmotionCategory.POSITIVE),
+    ("Awkwardness", EmotionCategory.NEUTRAL),
+    ("Boredom", EmotionCategory.NEGATIVE),
+    ("Calmness", EmotionCategory.NEUTRAL),
+    ("Concentration", EmotionCategory.NEUTRAL),
+    ("Confusion", EmotionCategory.NEUTRAL),
+    ("Contemplation", EmotionCategory.NEUTRAL),
+    ("Contempt", EmotionCategory.NEUTRAL),
+    ("Contentment", EmotionCategory.POSITIVE),
+    ("Craving", EmotionCategory.NEUTRAL),
+    ("Desire", EmotionCategory.POSITIVE),
+    ("Determination", EmotionCategory.POSITIVE),
+    ("Disappointment", EmotionCategory.NEGATIVE),
+    ("Disgust", EmotionCategory.NEGATIVE),
+    ("Distress", EmotionCategory.NEGATIVE),
+    ("Doubt", EmotionCategory.NEGATIVE),
+    ("Ecstasy", EmotionCategory.NEUTRAL),
+    ("Embarrassment", EmotionCategory.NEGATIVE),
+    ("Empathic Pain", EmotionCategory.NEGATIVE),
+    ("Entrancement", EmotionCategory.POSITIVE),
+    ("Envy", EmotionCategory.NEGATIVE),
+    ("Excitement", EmotionCategory.POSITIVE),
+    ("Fear", EmotionCategory.NEGATIVE),
+    ("Guilt", EmotionCategory.NEGATIVE),
+    ("Horror", EmotionCategory.NEGATIVE),
+    ("Interest", EmotionCategory.POSITIVE),
+    ("Joy", EmotionCategory.POSITIVE),
+    ("Love", EmotionCategory.POSITIVE),
+    ("Nostalgia", EmotionCategory.NEUTRAL),
+    ("Pain", EmotionCategory.NEGATIVE),
+    ("Pride", EmotionCategory.POSITIVE),
+    ("Realization", EmotionCategory.NEUTRAL),
+    ("Relief", EmotionCategory.POSITIVE),
+    ("Romance", EmotionCategory.POSITIVE),
+    ("Sadness", EmotionCategory.NEGATIVE),
+    ("Satisfaction", EmotionCategory.POSITIVE),
+    ("Shame", EmotionCategory.NEGATIVE),
+    ("Surprise (negative)", EmotionCategory.NEGATIVE),
+    ("Surprise (positive)", EmotionCategory.POSITIVE),
+    ("Sympathy", EmotionCategory.POSITIVE),
+    ("Tiredness", EmotionCategory.NEUTRAL),
+    ("Triumph", EmotionCategory.POSITIVE),
+)
+
+UNKNOWN_EMOTION_ID = -1
+
+EMOTION_NAMES: Tuple[str, ...] = tuple(sys.intern(name) for name, _ in _TAXONOMY)
+EMOTION_IDS: Dict[str, int] = {name.lower(): emotion_id for emotion_id, name in enumerate(EMOTION_NAMES)}
+EMOTION_CATEGORY_BY_ID: Tuple[EmotionCategory, ...] = tuple(category for _, category in _TAXONOMY)
+
+# Lower-cased name -> category label; Contempt and Ecstasy have always fallen back to neutral.
+EMOTION_CATEGORIES: Dict[str, str] = {
+    name.lower(): category.label
+    for name, category in _TAXONOMY
+    if name not in ("Contempt", "Ecstasy")
 }
 
-DEFAULT_EMOTION_CATEGORY = "neutral"
\ No newline at end of file
+
+@lru_cache(maxsize=256)
+def emotion_id(name: Optional[str]) -> int:
+    """Stable integer ID of an emotion name (case-insensitive), or ``UNKNOWN_EMOTION_ID``."""
+    if not name:
+        return UNKNOWN_EMOTION_ID
+    return EMOTION_IDS.get(name.lower(), UNKNOWN_EMOTION_ID)
+
+
+def emotion_category(name: Optional[str]) -> EmotionCategory:
+    """Category of an emotion name; names outside the taxonomy are neutral."""
+    identifier = emotion_id(name)
+    if identifier == UNKNOWN_EMOTION_ID:
+        return DEFAULT_CATEGORY
+    return EMOTION_CATEGORY_BY_ID[identifier]
+
+
+def intern_emotion_name(name: str) -> str:
+    """One shared string object per distinct emotion name, whatever casing Hume sent."""
+    return sys.intern(name)
+
+
+def parse_category(value: Optional[str]) -> EmotionCategory:
+    """Category from a stored or model-produced label; anything unrecognised is neutral."""
+    if not value:
+        return DEFAULT_CATEGORY
+    return CATEGORY_BY_LABEL.get(str(value).strip().lower(), DEFAULT_CATEGORY)
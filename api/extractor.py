@@ -9,6 +9,9 @@ try:
 except ModuleNotFoundError:  # pragma: no cover - fallback for Python>=3.13
     from audioop_lts import audioop  # type: ignore
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from typing import List, Dict, Any, Tuple, Optional, TYPE_CHECKING
 
 import requests
@@ -25,7 +28,29 @@ except ImportError:
 if BatchClientWithUtils is not None:
     # Ensure the global used by HumeClient.batch is defined
     _hume_expression_measurement.client.BatchClientWithUtils = BatchClientWithUtils
-from emotion_categories import EMOTION_CATEGORIES, DEFAULT_EMOTION_CATEGORY
+from audio_chunking import (
+    HUME_CHUNK_MAX_WAIT_SECONDS,
+    HUME_CHUNK_MODE,
+    HUME_CHUNK_PARALLELISM,
+    plan_chunks,
+    stitch_chunk_predictions,
+)
+from audio_encoding import encode_uploads, resample_files, restore_upload_names
+from audio_gating import HUME_SILENCE_GATING, gate_files, restore_original_times
+from emotion_categories import DEFAULT_EMOTION_CATEGORY, emotion_category, parse_category
+from metrics import HUME_JOBS_IN_FLIGHT, stage_span
+from prediction_engine import collect_predictions, extract_top_emotions_batched, materialize_results, rank_layouts
+from prompt_compaction import SUMMARY_PROMPT_TOKEN_BUDGET, compact_json, compact_summary_data, count_tokens
+from resilience import get_guard, guarded_transport
+from response_cache import RevalidatingCache
+from score_store import save_score_matrix
+from timeline import collect_timeline_segments
+from http_clients import (
+    HUME_HTTP_TIMEOUT,
+    OPENAI_HTTP_TIMEOUT,
+    connection_limits,
+    get_client_registry,
+)
 
 if TYPE_CHECKING:
     from openai import OpenAI
@@ -35,6 +60,11 @@ else:
     except ImportError:
         OpenAI = None  # type: ignore
 
+try:
+    from openai import DefaultHttpxClient
+except ImportError:
+    DefaultHttpxClient = None  # type: ignore
+
 load_dotenv()
 
 HUME_API_KEY = os.getenv("HUME_API_KEY")
@@ -46,22 +76,64 @@ RETELL_API_BASE_URL = os.getenv(
     "https://api.retellai.com"
 )
 
+# Alternative Hume endpoint (e.g. the benchmark stand-in); the SDK default when unset.
+HUME_API_BASE_URL = os.getenv("HUME_API_BASE_URL") or None
+
+# Seconds between Hume job status checks.
+HUME_POLL_INTERVAL = float(os.getenv("HUME_POLL_INTERVAL", "2"))
+
+# Ask OpenAI for summary, overall emotion, title and purpose in one request instead of four.
+OPENAI_COMBINED_ANALYSIS = os.getenv("OPENAI_COMBINED_ANALYSIS", "false").lower() in {"1", "true", "yes"}
+
+# Seconds a fetched Retell call payload is served from cache before revalidation.
+RETELL_CALL_CACHE_TTL = float(os.getenv("RETELL_CALL_CACHE_TTL", "300"))
+RETELL_CALL_CACHE_SIZE = int(os.getenv("RETELL_CALL_CACHE_SIZE", "512"))
+
+_RETELL_CALL_CACHE = RevalidatingCache(RETELL_CALL_CACHE_TTL, max_entries=RETELL_CALL_CACHE_SIZE)
+
 
 def get_hume_client() -> HumeClient:
-    """Initialize and return Hume client"""
+    """Return the shared, connection-pooled Hume client"""
     if not HUME_API_KEY:
         raise ValueError("HUME_API_KEY environment variable is not set")
-    return HumeClient(api_key=HUME_API_KEY)
+
+    registry = get_client_registry()
+    return registry.get_or_create(
+        "hume",
+        lambda: HumeClient(
+            api_key=HUME_API_KEY,
+            base_url=HUME_API_BASE_URL,
+            timeout=HUME_HTTP_TIMEOUT,
+            httpx_client=registry.httpx_client("hume", HUME_HTTP_TIMEOUT),
+        ),
+    )
 
 
 def get_openai_client() -> Optional[OpenAI]:
-    """Initialize and return OpenAI client if API key is available"""
+    """Return the shared OpenAI client if an API key is available"""
     if OpenAI is None:
         return None
     
     if not OPENAI_API_KEY:
         return None
-    return OpenAI(api_key=OPENAI_API_KEY)
+
+    registry = get_client_registry()
+
+    def _build_openai_client() -> OpenAI:
+        if DefaultHttpxClient is None:
+            return OpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_HTTP_TIMEOUT)
+        stats = registry.stats_for("openai")
+        # The SDK may ship its own httpx fork; the transport must come from the same package
+        httpx_module = sys.modules[DefaultHttpxClient.__mro__[1].__module__.split(".")[0]]
+        http_client = DefaultHttpxClient(
+            timeout=OPENAI_HTTP_TIMEOUT,
+            transport=guarded_transport("openai", httpx_module, retry_posts=True, limits=connection_limits()),
+            event_hooks={"response": [stats.record_httpx_response]},
+        )
+        # Retries, backoff and 429 handling happen in the guarded transport
+        return OpenAI(api_key=OPENAI_API_KEY, http_client=http_client, max_retries=0)
+
+    return registry.get_or_create("openai", _build_openai_client)
 
 
 def prepare_audio_files(file_contents: List[Tuple[str, bytes]]) -> List[Tuple[str, bytes, str]]:
@@ -91,9 +163,7 @@ def prepare_audio_files(file_contents: List[Tuple[str, bytes]]) -> List[Tuple[st
 
 
 def categorize_emotion(emotion_name: Optional[str]) -> str:
-    if not emotion_name:
-        return DEFAULT_EMOTION_CATEGORY
-    return EMOTION_CATEGORIES.get(emotion_name.lower(), DEFAULT_EMOTION_CATEGORY)
+    return emotion_category(emotion_name).label
 
 
 def submit_hume_job(file_objects: List[Tuple[str, bytes, str]], client: Optional[HumeClient] = None) -> str:
@@ -149,7 +219,7 @@ def submit_hume_job(file_objects: List[Tuple[str, bytes, str]], client: Optional
     raise ValueError(f"Could not extract valid job_id from response: {type(job_id)} - {job_id}")
 
 
-def wait_for_job_completion(job_id: str, client: Optional[HumeClient] = None, max_wait_time: int = 300, poll_interval: int = 2) -> Dict[str, Any]:
+def wait_for_job_completion(job_id: str, client: Optional[HumeClient] = None, max_wait_time: float = 300, poll_interval: float = HUME_POLL_INTERVAL) -> Dict[str, Any]:
     """
     Wait for Hume job to complete.
     
@@ -231,144 +301,30 @@ def extract_top_emotions(predictions_data: List[Dict[str, Any]], top_n: int = 1)
     Args:
         predictions_data: List of prediction dictionaries from get_predictions
         top_n: Number of top emotions to return per segment (default: 1)
-    
-    Args:
-        file_contents: List of tuples (filename, file_bytes)
-        client: Optional HumeClient instance
-        include_summary: Whether to populate a generated LLM summary
-        retell_call_id: Optional Retell call identifier to auto-fetch transcript metadata
-        retell_transcript: Optional pre-fetched Retell transcript segments
 
     Returns:
-        List of file results with top emotions and optional speaker enrichment
+        List of file results with top emotions per prosody and burst segment
     """
-    results = []
-    
-    for item in predictions_data:
-        if not isinstance(item, dict) or "results" not in item:
-            continue
-        
-        preds = item.get("results", {}).get("predictions", [])
-        if not preds:
-            continue
-        
-        file_result = {
-            "filename": item.get("source", {}).get("filename", "unknown"),
-            "prosody": [],
-            "burst": [],
-            "metadata": {},
-        }
-        category_counts = {"positive": 0, "neutral": 0, "negative": 0}
-        
-        # Process each prediction
-        for pred in preds:
-            if not isinstance(pred, dict) or "models" not in pred:
-                continue
-            
-            models = pred["models"]
-            
-            # Extract prosody emotions
-            if "prosody" in models and models["prosody"] is not None:
-                prosody_data = models["prosody"]
-                grouped_preds = prosody_data.get("grouped_predictions", [])
-                for group in grouped_preds:
-                    for pred_item in group.get("predictions", []):
-                        time_info = pred_item.get("time", {})
-                        time_start = time_info.get("begin", 0) if isinstance(time_info, dict) else 0
-                        time_end = time_info.get("end", 0) if isinstance(time_info, dict) else 0
-                        text = pred_item.get("text", "")
-                        emotions = pred_item.get("emotions", [])
-                        
-                        if emotions:
-                            top_emotions = sorted(
-                                emotions,
-                                key=lambda x: x.get("score", 0),
-                                reverse=True
-                            )[:top_n]
-
-                            enriched_top_emotions = []
-                            for emo in top_emotions:
-                                name = emo.get("name", "Unknown")
-                                category = categorize_emotion(name)
-                                enriched_top_emotions.append({
-                                    "name": name,
-                                    "score": round(emo.get("score", 0), 4),
-                                    "percentage": round(emo.get("score", 0) * 100, 1),
-                                    "category": category,
-                                })
-
-                            primary_category = enriched_top_emotions[0]["category"] if enriched_top_emotions else DEFAULT_EMOTION_CATEGORY
-                            category_counts[primary_category] += 1
-                            
-                            file_result["prosody"].append({
-                                "time_start": round(time_start, 2),
-                                "time_end": round(time_end, 2),
-                                "text": text,
-                                "primary_category": primary_category,
-                                "top_emotions": enriched_top_emotions,
-                                "source": "prosody",
-                            })
-            
-            # Extract burst emotions
-            if "burst" in models and models["burst"] is not None:
-                burst_data = models["burst"]
-                grouped_preds = burst_data.get("grouped_predictions", [])
-                for group in grouped_preds:
-                    for pred_item in group.get("predictions", []):
-                        time_info = pred_item.get("time", {})
-                        time_start = time_info.get("begin", 0) if isinstance(time_info, dict) else 0
-                        time_end = time_info.get("end", 0) if isinstance(time_info, dict) else 0
-                        emotions = pred_item.get("emotions", [])
-                        
-                        if emotions:
-                            top_emotions = sorted(
-                                emotions,
-                                key=lambda x: x.get("score", 0),
-                                reverse=True
-                            )[:top_n]
-
-                            enriched_top_emotions = []
-                            for emo in top_emotions:
-                                name = emo.get("name", "Unknown")
-                                category = categorize_emotion(name)
-                                enriched_top_emotions.append({
-                                    "name": name,
-                                    "score": round(emo.get("score", 0), 4),
-                                    "percentage": round(emo.get("score", 0) * 100, 1),
-                                    "category": category,
-                                })
-
-                            primary_category = enriched_top_emotions[0]["category"] if enriched_top_emotions else DEFAULT_EMOTION_CATEGORY
-                            category_counts[primary_category] += 1
-                            
-                            file_result["burst"].append({
-                                "time_start": round(time_start, 2),
-                                "time_end": round(time_end, 2),
-                                "primary_category": primary_category,
-                                "top_emotions": enriched_top_emotions,
-                                "source": "burst",
-                            })
-
-        file_result["metadata"]["category_counts"] = category_counts
-        
-        results.append(file_result)
-    
-    return results
+    return extract_top_emotions_batched(predictions_data, top_n=top_n)
 
 
-def get_retell_call_details(call_id: str) -> Dict[str, Any]:
-    """Fetch call details (including transcript and recording URLs) from Retell."""
-    if not RETELL_API_KEY:
-        raise ValueError("RETELL_API_KEY environment variable is not set")
-
+def _fetch_retell_call_details(call_id: str, validators: Dict[str, str]) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+    """Fetch call details from Retell, revalidating a cached copy when validators are given."""
     url = f"{RETELL_API_BASE_URL.rstrip('/')}/v2/get-call/{call_id}"
     headers = {
         "Authorization": f"Bearer {RETELL_API_KEY}",
         "Accept": "application/json"
     }
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
 
+    session = get_client_registry().requests_session()
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = get_guard("retell").send(lambda: session.get(url, headers=headers, timeout=30), url=url)
+        if response.status_code == 304 and validators:
+            return None, validators
         response.raise_for_status()
     except requests.HTTPError as http_err:
         raise RuntimeError(
@@ -380,7 +336,35 @@ def get_retell_call_details(call_id: str) -> Dict[str, Any]:
     data = response.json()
     if not isinstance(data, dict):
         raise ValueError("Unexpected response format from Retell API")
-    return data
+
+    new_validators = {}
+    if response.headers.get("ETag"):
+        new_validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        new_validators["last_modified"] = response.headers["Last-Modified"]
+    return data, new_validators
+
+
+def get_retell_call_details(call_id: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Fetch call details (including transcript and recording URLs) from Retell.
+
+    Responses are cached per call_id for RETELL_CALL_CACHE_TTL seconds and
+    concurrent requests for the same call share one fetch. Pass ``max_age=0``
+    to force a (conditional) revalidation against Retell.
+    """
+    if not RETELL_API_KEY:
+        raise ValueError("RETELL_API_KEY environment variable is not set")
+
+    return _RETELL_CALL_CACHE.get(
+        call_id,
+        lambda validators: _fetch_retell_call_details(call_id, validators),
+        max_age=max_age,
+    )
+
+
+def get_retell_call_cache_stats() -> Dict[str, Any]:
+    return _RETELL_CALL_CACHE.stats()
 
 
 def extract_retell_transcript_segments(call_data: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -435,6 +419,46 @@ def extract_retell_transcript_segments(call_data: Dict[str, Any]) -> List[Dict[s
     return cleaned_segments
 
 
+def retell_talk_time(call_data: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """
+    Seconds each speaker talked according to the Retell transcript timings.
+
+    Word timings are summed where Retell provides them, so pauses inside
+    an utterance do not count; otherwise the utterance span is used.
+    Returns ``None`` when the payload has no timed transcript to go by.
+    """
+    transcript = call_data.get("transcript_object")
+    if not isinstance(transcript, list):
+        return None
+
+    talk_time = {"Customer": 0.0, "Agent": 0.0}
+    timed = False
+    for segment in transcript:
+        if not isinstance(segment, dict):
+            continue
+        role = str(segment.get("role") or segment.get("speaker") or "").lower()
+        if role in {"user", "customer"}:
+            speaker = "Customer"
+        elif role in {"agent", "assistant"}:
+            speaker = "Agent"
+        else:
+            continue
+
+        words = segment.get("words")
+        if isinstance(words, list) and words:
+            spans = [(word.get("start"), word.get("end")) for word in words if isinstance(word, dict)]
+        else:
+            spans = [(segment.get("start"), segment.get("end"))]
+        for start, end in spans:
+            if isinstance(start, (int, float)) and isinstance(end, (int, float)):
+                timed = True
+                talk_time[speaker] += max(0.0, float(end) - float(start))
+
+    if not timed:
+        return None
+    return {speaker: round(seconds, 3) for speaker, seconds in talk_time.items()}
+
+
 def download_retell_recording(
     recording_url: str,
     filename: Optional[str] = None,
@@ -445,7 +469,7 @@ def download_retell_recording(
         raise ValueError("Recording URL is required to download audio")
 
     try:
-        response = requests.get(recording_url, timeout=timeout)
+        response = get_client_registry().requests_session().get(recording_url, timeout=timeout)
         response.raise_for_status()
     except requests.HTTPError as http_err:
         raise RuntimeError(
@@ -553,6 +577,151 @@ def enrich_results_with_transcript(
     return results
 
 
+def _build_summary_data(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-file segments, transcript, emotion highlights and context for the LLM prompts."""
+    # Format the predictions data for the prompt with time-based information
+    summary_data = []
+    for result in results:
+        filename = result.get("filename", "unknown")
+        prosody_segments = result.get("prosody", [])
+        burst_segments = result.get("burst", [])
+        metadata = result.get("metadata", {}) or {}
+        transcript_segments = metadata.get("retell_transcript_segments", [])
+        customer_profile = metadata.get("customer") or {}
+        agent_profile = metadata.get("agent") or {}
+        call_context = {
+            "call_id": metadata.get("retell_call_id"),
+            "start_timestamp": metadata.get("start_timestamp"),
+            "end_timestamp": metadata.get("end_timestamp"),
+            "duration_ms": metadata.get("duration_ms"),
+            "lead_status": customer_profile.get("lead_status"),
+            "program": customer_profile.get("program") or metadata.get("program"),
+        }
+        
+        # Create time-ordered list of emotional segments
+        all_segments = []
+        emotion_highlights = []
+        speaker_last_emotion: Dict[str, Optional[str]] = {}
+        speaker_emotion_counts: Dict[str, Dict[str, int]] = {}
+        
+        for segment in prosody_segments:
+            time_start = segment.get("time_start", 0)
+            time_end = segment.get("time_end", 0)
+            text = (segment.get("text") or segment.get("transcript_text") or "").strip()
+            top_emotions = segment.get("top_emotions", [])
+            speaker = segment.get("speaker") or "Unknown"
+            if top_emotions:
+                primary_emotion = top_emotions[0].get("name")
+                primary_category = top_emotions[0].get("category", DEFAULT_EMOTION_CATEGORY)
+                if primary_emotion and text:
+                    last_emotion = speaker_last_emotion.get(speaker)
+                    if primary_emotion != last_emotion:
+                        emotion_highlights.append({
+                            "speaker": speaker,
+                            "time_start": time_start,
+                            "time_end": time_end,
+                            "text": text,
+                            "primary_emotion": primary_emotion,
+                            "score": top_emotions[0].get("score"),
+                            "category": primary_category,
+                        })
+                        speaker_last_emotion[speaker] = primary_emotion
+                    speaker_emotion_counts.setdefault(speaker, {})
+                    speaker_emotion_counts[speaker][primary_emotion] = \
+                        speaker_emotion_counts[speaker].get(primary_emotion, 0) + 1
+
+                all_segments.append({
+                    "time_start": time_start,
+                    "time_end": time_end,
+                    "time_range": f"{time_start:.1f}s-{time_end:.1f}s",
+                    "text": text,
+                    "speaker": speaker,
+                    "top_emotions": [
+                        {
+                            "name": e.get("name"),
+                            "score": e.get("score"),
+                            "percentage": e.get("percentage"),
+                            "category": e.get("category", DEFAULT_EMOTION_CATEGORY),
+                        }
+                        for e in top_emotions
+                    ]
+                })
+        
+        for segment in burst_segments:
+            time_start = segment.get("time_start", 0)
+            time_end = segment.get("time_end", 0)
+            top_emotions = segment.get("top_emotions", [])
+            speaker = segment.get("speaker") or "Unknown"
+            if top_emotions:
+                primary_emotion = top_emotions[0].get("name")
+                primary_category = top_emotions[0].get("category", DEFAULT_EMOTION_CATEGORY)
+                text = (segment.get("transcript_text") or "").strip()
+                if primary_emotion and text:
+                    last_emotion = speaker_last_emotion.get(speaker)
+                    if primary_emotion != last_emotion:
+                        emotion_highlights.append({
+                            "speaker": speaker,
+                            "time_start": time_start,
+                            "time_end": time_end,
+                            "text": text,
+                            "primary_emotion": primary_emotion,
+                            "score": top_emotions[0].get("score"),
+                            "type": "vocal_burst",
+                            "category": primary_category,
+                        })
+                        speaker_last_emotion[speaker] = primary_emotion
+                    speaker_emotion_counts.setdefault(speaker, {})
+                    speaker_emotion_counts[speaker][primary_emotion] = \
+                        speaker_emotion_counts[speaker].get(primary_emotion, 0) + 1
+
+                all_segments.append({
+                    "time_start": time_start,
+                    "time_end": time_end,
+                    "time_range": f"{time_start:.1f}s-{time_end:.1f}s",
+                    "type": "vocal_burst",
+                    "speaker": speaker,
+                    "top_emotions": [
+                        {
+                            "name": e.get("name"),
+                            "score": e.get("score"),
+                            "percentage": e.get("percentage"),
+                            "category": e.get("category", DEFAULT_EMOTION_CATEGORY),
+                        }
+                        for e in top_emotions
+                    ]
+                })
+        
+        # Sort by time
+        all_segments.sort(key=lambda x: x["time_start"])
+        
+        file_summary = {
+            "filename": filename,
+            "segments": all_segments,
+            "transcript": [
+                {
+                    "time_start": seg.get("start"),
+                    "time_end": seg.get("end"),
+                    "speaker": seg.get("speaker"),
+                    "text": seg.get("text")
+                }
+                for seg in transcript_segments
+            ],
+            "emotion_highlights": emotion_highlights,
+            "speaker_primary_emotions": {
+                speaker: sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
+                for speaker, counts in speaker_emotion_counts.items()
+            },
+            "context": {
+                "customer": customer_profile,
+                "agent": agent_profile,
+                "call": call_context,
+            },
+            "category_counts": metadata.get("category_counts"),
+        }
+        summary_data.append(file_summary)
+    return summary_data
+
+
 def summarize_predictions(results: List[Dict[str, Any]], openai_client: Optional[OpenAI] = None) -> Optional[str]:
     """
     Summarize emotion predictions using OpenAI LLM.
@@ -564,163 +733,38 @@ def summarize_predictions(results: List[Dict[str, Any]], openai_client: Optional
     Returns:
         Summary string or None if OpenAI is not available
     """
+    summary, _ = summarize_predictions_with_usage(results, openai_client)
+    return summary
+
+
+def summarize_predictions_with_usage(
+    results: List[Dict[str, Any]],
+    openai_client: Optional[OpenAI] = None,
+    token_budget: int = SUMMARY_PROMPT_TOKEN_BUDGET,
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Like ``summarize_predictions``, also returning the prompt's token usage.
+
+    The prompt payload is compacted to ``token_budget`` tokens (see
+    ``compact_summary_data``); usage holds the counted prompt size, what the
+    uncompacted prompt would have been, what the API billed and the latency.
+    """
     if openai_client is None:
         openai_client = get_openai_client()
     
     if openai_client is None:
-        return None
+        return None, None
     
     try:
-        # Format the predictions data for the prompt with time-based information
-        summary_data = []
-        for result in results:
-            filename = result.get("filename", "unknown")
-            prosody_segments = result.get("prosody", [])
-            burst_segments = result.get("burst", [])
-            metadata = result.get("metadata", {}) or {}
-            transcript_segments = metadata.get("retell_transcript_segments", [])
-            customer_profile = metadata.get("customer") or {}
-            agent_profile = metadata.get("agent") or {}
-            call_context = {
-                "call_id": metadata.get("retell_call_id"),
-                "start_timestamp": metadata.get("start_timestamp"),
-                "end_timestamp": metadata.get("end_timestamp"),
-                "duration_ms": metadata.get("duration_ms"),
-                "lead_status": customer_profile.get("lead_status"),
-                "program": customer_profile.get("program") or metadata.get("program"),
-            }
-            
-            # Create time-ordered list of emotional segments
-            all_segments = []
-            emotion_highlights = []
-            speaker_last_emotion: Dict[str, Optional[str]] = {}
-            speaker_emotion_counts: Dict[str, Dict[str, int]] = {}
-            
-            for segment in prosody_segments:
-                time_start = segment.get("time_start", 0)
-                time_end = segment.get("time_end", 0)
-                text = (segment.get("text") or segment.get("transcript_text") or "").strip()
-                top_emotions = segment.get("top_emotions", [])
-                speaker = segment.get("speaker") or "Unknown"
-                if top_emotions:
-                    primary_emotion = top_emotions[0].get("name")
-                    primary_category = top_emotions[0].get("category", DEFAULT_EMOTION_CATEGORY)
-                    if primary_emotion and text:
-                        last_emotion = speaker_last_emotion.get(speaker)
-                        if primary_emotion != last_emotion:
-                            emotion_highlights.append({
-                                "speaker": speaker,
-                                "time_start": time_start,
-                                "time_end": time_end,
-                                "text": text,
-                                "primary_emotion": primary_emotion,
-                                "score": top_emotions[0].get("score"),
-                                "category": primary_category,
-                            })
-                            speaker_last_emotion[speaker] = primary_emotion
-                        speaker_emotion_counts.setdefault(speaker, {})
-                        speaker_emotion_counts[speaker][primary_emotion] = \
-                            speaker_emotion_counts[speaker].get(primary_emotion, 0) + 1
-
-                    all_segments.append({
-                        "time_start": time_start,
-                        "time_end": time_end,
-                        "time_range": f"{time_start:.1f}s-{time_end:.1f}s",
-                        "text": text,
-                        "speaker": speaker,
-                        "top_emotions": [
-                            {
-                                "name": e.get("name"),
-                                "score": e.get("score"),
-                                "percentage": e.get("percentage"),
-                                "category": e.get("category", DEFAULT_EMOTION_CATEGORY),
-                            }
-                            for e in top_emotions
-                        ]
-                    })
-            
-            for segment in burst_segments:
-                time_start = segment.get("time_start", 0)
-                time_end = segment.get("time_end", 0)
-                top_emotions = segment.get("top_emotions", [])
-                speaker = segment.get("speaker") or "Unknown"
-                if top_emotions:
-                    primary_emotion = top_emotions[0].get("name")
-                    primary_category = top_emotions[0].get("category", DEFAULT_EMOTION_CATEGORY)
-                    text = (segment.get("transcript_text") or "").strip()
-                    if primary_emotion and text:
-                        last_emotion = speaker_last_emotion.get(speaker)
-                        if primary_emotion != last_emotion:
-                            emotion_highlights.append({
-                                "speaker": speaker,
-                                "time_start": time_start,
-                                "time_end": time_end,
-                                "text": text,
-                                "primary_emotion": primary_emotion,
-                                "score": top_emotions[0].get("score"),
-                                "type": "vocal_burst",
-                                "category": primary_category,
-                            })
-                            speaker_last_emotion[speaker] = primary_emotion
-                        speaker_emotion_counts.setdefault(speaker, {})
-                        speaker_emotion_counts[speaker][primary_emotion] = \
-                            speaker_emotion_counts[speaker].get(primary_emotion, 0) + 1
-
-                    all_segments.append({
-                        "time_start": time_start,
-                        "time_end": time_end,
-                        "time_range": f"{time_start:.1f}s-{time_end:.1f}s",
-                        "type": "vocal_burst",
-                        "speaker": speaker,
-                        "top_emotions": [
-                            {
-                                "name": e.get("name"),
-                                "score": e.get("score"),
-                                "percentage": e.get("percentage"),
-                                "category": e.get("category", DEFAULT_EMOTION_CATEGORY),
-                            }
-                            for e in top_emotions
-                        ]
-                    })
-            
-            # Sort by time
-            all_segments.sort(key=lambda x: x["time_start"])
-            
-            file_summary = {
-                "filename": filename,
-                "segments": all_segments,
-                "transcript": [
-                    {
-                        "time_start": seg.get("start"),
-                        "time_end": seg.get("end"),
-                        "speaker": seg.get("speaker"),
-                        "text": seg.get("text")
-                    }
-                    for seg in transcript_segments
-                ],
-                "emotion_highlights": emotion_highlights,
-                "speaker_primary_emotions": {
-                    speaker: sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
-                    for speaker, counts in speaker_emotion_counts.items()
-                },
-                "context": {
-                    "customer": customer_profile,
-                    "agent": agent_profile,
-                    "call": call_context,
-                },
-                "category_counts": metadata.get("category_counts"),
-            }
-            summary_data.append(file_summary)
-        
-        # Create prompt for OpenAI
-        prompt = f"""Analyze the following time-stamped emotion detection results from an audio file and provide a BRIEF, CONCISE summary.
+        summary_data = _build_summary_data(results)
+
+        system_message = "You are an expert contact-center analyst. Produce concise (under 100 words) summaries that report the call outcome, describe the narrative context, and highlight key emotion shifts—always emphasize the customer's emotional journey first, then the agent's only when it impacts the result. Note any customer commitments even when their emotion is muted or negative, and avoid repeating the same emotion unless it changes."
+        prompt_template = """Analyze the following time-stamped emotion detection results from an audio file and provide a BRIEF, CONCISE summary.
 
-Emotion Data (time-ordered segments with speakers):
-{json.dumps(summary_data, indent=2)}
+Emotion Data (compact JSON):
+{emotion_data}
 
-Use these data sections: "segments" (all emotional segments), "transcript" (complete diarized transcript), "emotion_highlights" (meaningful emotion shifts), and "speaker_primary_emotions" (dominant emotions for each speaker). Emotion highlights are ordered by time, but prioritize the customer's experience when summarizing.
-You also have a "context" block with customer and agent profile details (names, programs, lead status). Prefer these names over any misheard words in transcripts.
-Category counts show how many segments fell into positive, neutral, and negative groupings.
+The data has a shared "context" block with customer and agent profile details (names, programs, lead status) and call timing; prefer these names over any misheard words in transcripts. "transcript" is the complete diarized transcript. Each entry in "files" is one audio channel with "emotion_highlights" (meaningful emotion shifts, with the quote that carried them), "segments" (emotion runs: consecutive segments of one speaker with the same emotions are merged, "n" is how many), "speaker_primary_emotions" (dominant emotions for each speaker, with segment counts) and "category_counts" (how many segments fell into positive, neutral, and negative groupings). Times are seconds from the start of the call. Emotion highlights are ordered by time, but prioritize the customer's experience when summarizing. If an "omitted" block is present, those items were left out for length.
 
 Provide a SHORT summary (1-2 sentences maximum) that:
 1. States the practical outcome/result of the recording.
@@ -736,80 +780,67 @@ Example formats:
 
 Keep it under 100 words."""
 
+        # Whatever the template and system message take is not available to the data
+        overhead = count_tokens(system_message) + count_tokens(prompt_template.format(emotion_data=""))
+        payload_budget = max(token_budget - overhead, 1) if token_budget > 0 else 0
+        compacted, usage = compact_summary_data(summary_data, payload_budget)
+        prompt = prompt_template.format(emotion_data=compact_json(compacted))
+        usage["prompt_tokens"] = overhead + usage.pop("payload_tokens")
+        usage["token_budget"] = token_budget
+        usage["uncompacted_prompt_tokens"] = overhead + count_tokens(json.dumps(summary_data, indent=2))
+
+        request_started = time.perf_counter()
         response = openai_client.chat.completions.create(
             model="gpt-4o",
             messages=[
-                {"role": "system", "content": "You are an expert contact-center analyst. Produce concise (under 100 words) summaries that report the call outcome, describe the narrative context, and highlight key emotion shifts—always emphasize the customer's emotional journey first, then the agent's only when it impacts the result. Note any customer commitments even when their emotion is muted or negative, and avoid repeating the same emotion unless it changes."},
+                {"role": "system", "content": system_message},
                 {"role": "user", "content": prompt}
             ],
             temperature=0,
             max_tokens=150
         )
+        usage["latency_ms"] = round((time.perf_counter() - request_started) * 1000, 1)
+        api_usage = getattr(response, "usage", None)
+        if api_usage is not None:
+            usage["api_prompt_tokens"] = getattr(api_usage, "prompt_tokens", None)
+            usage["api_completion_tokens"] = getattr(api_usage, "completion_tokens", None)
+        logging.getLogger(__name__).info(
+            "Summary prompt: %s tokens (uncompacted %s, budget %s, omitted %s), %.0f ms",
+            usage["prompt_tokens"],
+            usage["uncompacted_prompt_tokens"],
+            token_budget or "none",
+            usage["omitted"] or "nothing",
+            usage["latency_ms"],
+        )
         
         summary = response.choices[0].message.content.strip()
-        return summary
+        return summary, usage
     
     except Exception as e:
         # If OpenAI fails, return None (non-blocking)
         print(f"Warning: Could not generate summary: {e}")
-        return None
+        return None, None
 
 
 def _normalize_sentiment_category(value: Optional[str]) -> str:
-    if not value:
-        return DEFAULT_EMOTION_CATEGORY
-    normalized = str(value).strip().lower()
-    if normalized in {"positive", "neutral", "negative"}:
-        return normalized
-    return DEFAULT_EMOTION_CATEGORY
+    return parse_category(value).label
 
 
-def determine_overall_call_emotion(
+def _call_outcome_inputs(
     results: List[Dict[str, Any]],
-    summary: Optional[str] = None,
-    openai_client: Optional[OpenAI] = None,
-) -> Optional[Dict[str, Any]]:
+) -> Optional[Tuple[Dict[str, int], List[Dict[str, Any]], Dict[str, Any]]]:
+    """Category counts, the last dozen timeline segments and the customer's final segment."""
     if not results:
         return None
 
-    timeline_segments: List[Dict[str, Any]] = []
-    aggregated_counts = {"positive": 0, "neutral": 0, "negative": 0}
-
-    for result in results:
-        prosody_segments = result.get("prosody", []) or []
-        metadata = result.get("metadata", {}) or {}
-        for segment in prosody_segments:
-            time_start = segment.get("time_start")
-            time_end = segment.get("time_end", time_start)
-            if time_start is None or time_end is None:
-                continue
-            try:
-                start_val = float(time_start)
-                end_val = float(time_end)
-            except (TypeError, ValueError):
-                continue
-
-            speaker = segment.get("speaker") or metadata.get("speaker") or "Unknown"
-            top_emotions = segment.get("top_emotions") or []
-            primary_category = segment.get("primary_category")
-            if not primary_category and top_emotions:
-                primary_category = top_emotions[0].get("category")
-            normalized_category = _normalize_sentiment_category(primary_category)
-            aggregated_counts[normalized_category] += 1
-
-            timeline_segments.append({
-                "start": round(start_val, 2),
-                "end": round(end_val, 2),
-                "speaker": speaker,
-                "category": normalized_category,
-                "emotion": (top_emotions[0].get("name") if top_emotions else None),
-                "text": (segment.get("text") or segment.get("transcript_text") or "").strip(),
-            })
-
+    timeline_segments = collect_timeline_segments(results)
     if not timeline_segments:
         return None
 
-    timeline_segments.sort(key=lambda item: item.get("start", 0.0))
+    aggregated_counts = {"positive": 0, "neutral": 0, "negative": 0}
+    for segment in timeline_segments:
+        aggregated_counts[segment["category"]] += 1
+
     tail_segments = timeline_segments[-12:]
     final_customer_segment = next(
         (segment for segment in reversed(timeline_segments)
@@ -823,6 +854,18 @@ def determine_overall_call_emotion(
         "emotion": final_customer_segment.get("emotion"),
         "text": final_customer_segment.get("text"),
     }
+    return aggregated_counts, tail_segments, final_customer_info
+
+
+def determine_overall_call_emotion(
+    results: List[Dict[str, Any]],
+    summary: Optional[str] = None,
+    openai_client: Optional[OpenAI] = None,
+) -> Optional[Dict[str, Any]]:
+    outcome_inputs = _call_outcome_inputs(results)
+    if outcome_inputs is None:
+        return None
+    aggregated_counts, tail_segments, final_customer_info = outcome_inputs
 
     if openai_client is None:
         openai_client = get_openai_client()
@@ -945,13 +988,205 @@ def determine_overall_call_emotion(
     return fallback_result
 
 
+def parse_combined_analysis(content: str) -> Dict[str, Any]:
+    """
+    Validate a combined-analysis reply against its schema.
+
+    The reply must be a JSON object with a non-empty ``summary``; anything
+    else raises ValueError. Every other field that is missing or invalid is
+    returned as None so the caller can fill it in the old way.
+    """
+    try:
+        parsed = json.loads(content)
+    except (TypeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Combined analysis is not valid JSON: {exc}") from exc
+    if not isinstance(parsed, dict):
+        raise ValueError("Combined analysis is not a JSON object")
+    summary = parsed.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        raise ValueError("Combined analysis has no summary")
+
+    overall_emotion = str(parsed.get("overall_emotion") or "").strip().lower()
+    call_outcome = str(parsed.get("call_outcome") or "").strip().lower()
+    confidence = parsed.get("confidence")
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+        confidence = None
+    reasoning = parsed.get("reasoning")
+    if isinstance(reasoning, list):
+        reasoning = " ".join(str(part) for part in reasoning)
+    title = parsed.get("title")
+    purpose = parsed.get("purpose")
+
+    return {
+        "summary": summary.strip(),
+        "overall_emotion": overall_emotion if overall_emotion in {"positive", "neutral", "negative"} else None,
+        "call_outcome": call_outcome if call_outcome in {"success", "pending", "unsuccessful"} else None,
+        "confidence": float(confidence) if confidence is not None else None,
+        "reasoning": reasoning.strip() if isinstance(reasoning, str) else None,
+        "title": _normalize_title_text(title) or None if isinstance(title, str) else None,
+        "purpose": _normalize_title_text(purpose, max_words=2) or None if isinstance(purpose, str) else None,
+    }
+
+
+def analyze_call_with_llm(
+    results: List[Dict[str, Any]],
+    openai_client: Optional[OpenAI] = None,
+    token_budget: int = SUMMARY_PROMPT_TOKEN_BUDGET,
+) -> Optional[Dict[str, Any]]:
+    """
+    Summary, overall emotion, title and purpose from a single OpenAI request.
+
+    Returns a dict with ``summary``, ``overall_emotion`` (shaped like
+    ``determine_overall_call_emotion``'s result), ``title``, ``purpose`` and
+    ``usage``; fields the reply got wrong are None. Returns None when OpenAI
+    is unavailable, the request fails or the reply does not validate, in
+    which case the per-field functions should be used instead.
+    """
+    if openai_client is None:
+        openai_client = get_openai_client()
+
+    if openai_client is None:
+        return None
+
+    try:
+        summary_data = _build_summary_data(results)
+        outcome_inputs = _call_outcome_inputs(results)
+        outcome_data: Dict[str, Any] = {}
+        if outcome_inputs is not None:
+            outcome_data = {"category_counts": outcome_inputs[0], "final_customer": outcome_inputs[2]}
+
+        system_message = (
+            "You are an expert contact-center analyst and QA reviewer. You summarise calls, label their final "
+            "sentiment/outcome and title them. Respond with a single JSON object and nothing else."
+        )
+        prompt_template = """Analyse this contact-center call and return STRICT JSON with exactly these keys:
+- "summary": 1-2 sentences, under 100 words. State the practical outcome, the key narrative (why the call happened, decisions, next steps) and the CUSTOMER'S emotional journey first (dominant emotion or shifts with timestamps, tied to the quote that triggered them); mention the Agent's emotion only if it influences the outcome. Acknowledge any customer commitment to a next step, even a reluctant one. No filler.
+- "overall_emotion": positive|neutral|negative and "call_outcome": success|unsuccessful|pending. Judge the customer's willingness to proceed with the agent's ask, not emotions alone: acceptance, even reluctant ("fine", "okay", "send it"), is success/positive; an explicit refusal or disqualification (requirements not met, ineligible) is unsuccessful/negative; a deferral or callback request without acceptance, or no agreement at all, is pending/neutral unless the tone is unmistakably negative. Saying "no" to extra questions after agreeing does not cancel the acceptance. When ambiguous, prefer pending/neutral.
+- "confidence": number between 0 and 1 for the outcome label.
+- "reasoning": at most 2 sentences referencing the final customer behaviour.
+- "title": 1-3 word Title Case call title without punctuation (e.g. "Callback Requested").
+- "purpose": 1-2 word Title Case label of the customer's main intent or the call outcome (e.g. "Appointment Booking").
+
+Call data (compact JSON): "context" has customer and agent profiles (prefer these names over misheard transcript words), "transcript" the diarized transcript, each of "files" one audio channel with "emotion_highlights" (emotion shifts with their quotes), "segments" (runs of the same emotion, "n" merged segments), "speaker_primary_emotions" and "category_counts"; "outcome" has whole-call category counts and the customer's final segment. Times are seconds into the call. If "omitted" is present, those items were left out for length.
+{call_data}"""
+
+        overhead = count_tokens(system_message) + count_tokens(
+            prompt_template.format(call_data=compact_json({"outcome": outcome_data}))
+        )
+        payload_budget = max(token_budget - overhead, 1) if token_budget > 0 else 0
+        compacted, usage = compact_summary_data(summary_data, payload_budget)
+        compacted["outcome"] = outcome_data
+        prompt = prompt_template.format(call_data=compact_json(compacted))
+        usage["mode"] = "combined"
+        usage["prompt_tokens"] = overhead + usage.pop("payload_tokens")
+        usage["token_budget"] = token_budget
+
+        request_started = time.perf_counter()
+        response = openai_client.chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0,
+            max_tokens=400,
+            response_format={"type": "json_object"},
+        )
+        usage["latency_ms"] = round((time.perf_counter() - request_started) * 1000, 1)
+        api_usage = getattr(response, "usage", None)
+        if api_usage is not None:
+            usage["api_prompt_tokens"] = getattr(api_usage, "prompt_tokens", None)
+            usage["api_completion_tokens"] = getattr(api_usage, "completion_tokens", None)
+
+        parsed = parse_combined_analysis(response.choices[0].message.content)
+    except Exception as exc:  # pylint: disable=broad-except
+        print(f"Warning: Combined call analysis via OpenAI failed: {exc}")
+        return None
+
+    overall_emotion = None
+    if parsed["overall_emotion"]:
+        overall_emotion = {
+            "label": parsed["overall_emotion"],
+            "call_outcome": parsed["call_outcome"] or {
+                "positive": "success",
+                "negative": "unsuccessful",
+            }.get(parsed["overall_emotion"], "pending"),
+            "confidence": parsed["confidence"] if parsed["confidence"] is not None else 0.75,
+            "reasoning": parsed["reasoning"] or "",
+            "source": "openai_combined",
+        }
+    invalid = [
+        field for field in ("overall_emotion", "call_outcome", "confidence", "reasoning", "title", "purpose")
+        if parsed[field] is None
+    ]
+    if invalid:
+        usage["invalid_fields"] = invalid
+    logging.getLogger(__name__).info(
+        "Combined call analysis: %s prompt tokens, %.0f ms, invalid fields: %s",
+        usage["prompt_tokens"],
+        usage["latency_ms"],
+        ", ".join(invalid) or "none",
+    )
+    return {
+        "summary": parsed["summary"],
+        "overall_emotion": overall_emotion,
+        # Keep the heuristic labels the per-field title generator would pick
+        "title": _heuristic_title_from_summary(parsed["summary"]) or parsed["title"],
+        "purpose": parsed["purpose"],
+        "usage": usage,
+    }
+
+
+def _run_hume_job(
+    file_objects: List[Tuple[str, bytes, str]],
+    client: HumeClient,
+    max_wait_time: float = 300,
+) -> List[Dict[str, Any]]:
+    """Submit one Hume job, wait for it and return its predictions."""
+    with HUME_JOBS_IN_FLIGHT.track():
+        # Submit job
+        with stage_span("hume_submit"):
+            job_id = submit_hume_job(file_objects, client)
+
+        # Wait for completion
+        with stage_span("hume_queue"):
+            wait_for_job_completion(job_id, client, max_wait_time=max_wait_time)
+
+        # Get predictions
+        with stage_span("hume_predictions"):
+            return get_predictions(job_id, client)
+
+
+def _run_chunked_hume_jobs(file_objects: List[Tuple[str, bytes, str]], client: HumeClient) -> List[Dict[str, Any]]:
+    """
+    Analyse the chunks of long recordings; the caller stitches the predictions.
+
+    In ``parallel`` mode every chunk is its own job, up to
+    ``HUME_CHUNK_PARALLELISM`` at a time; in ``single`` mode all chunks go
+    into one multi-file job. Each job gets ``HUME_CHUNK_MAX_WAIT_SECONDS``,
+    so the wait no longer grows with the length of the call.
+    """
+    if HUME_CHUNK_MODE == "single" or len(file_objects) == 1:
+        predictions_data = _run_hume_job(file_objects, client, HUME_CHUNK_MAX_WAIT_SECONDS)
+    else:
+        # Each worker runs in a copy of this context so its spans land in the current run's timings
+        with ThreadPoolExecutor(max_workers=min(HUME_CHUNK_PARALLELISM, len(file_objects)), thread_name_prefix="hume-chunk") as pool:
+            futures = [
+                pool.submit(copy_context().run, _run_hume_job, [file_object], client, HUME_CHUNK_MAX_WAIT_SECONDS)
+                for file_object in file_objects
+            ]
+            predictions_data = [item for future in futures for item in future.result()]
+    return predictions_data
+
+
 def analyze_audio_files(
     file_contents: List[Tuple[str, bytes]],
     client: Optional[HumeClient] = None,
     include_summary: bool = True,
     retell_call_id: Optional[str] = None,
     retell_transcript: Optional[List[Dict[str, Any]]] = None,
-    retell_metadata: Optional[Dict[str, Any]] = None
+    retell_metadata: Optional[Dict[str, Any]] = None,
+    scores_path: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """
     Complete workflow: submit job, wait for completion, and extract top emotions.
@@ -959,6 +1194,7 @@ def analyze_audio_files(
     Args:
         file_contents: List of tuples (filename, file_bytes)
         client: Optional HumeClient instance
+        scores_path: Where to keep the full per-segment score matrix, if anywhere
     
     Returns:
         List of file results with top emotions
@@ -971,7 +1207,8 @@ def analyze_audio_files(
 
     if transcript_segments is None and retell_call_id:
         try:
-            call_data = get_retell_call_details(retell_call_id)
+            with stage_span("retell_details"):
+                call_data = get_retell_call_details(retell_call_id)
             transcript_segments = extract_retell_transcript_segments(call_data)
             recording_url = call_data.get("recording_multi_channel_url")
             combined_retell_metadata.setdefault("retell_call_id", retell_call_id)
@@ -992,24 +1229,50 @@ def analyze_audio_files(
         except Exception as exc:
             print(f"Warning: Could not fetch Retell call data for {retell_call_id}: {exc}")
     
-    # Prepare files
-    file_objects = prepare_audio_files(file_contents)
-    
-    # Submit job
-    job_id = submit_hume_job(file_objects, client)
-    
-    # Wait for completion
-    wait_for_job_completion(job_id, client)
-    
-    # Get predictions
-    predictions_data = get_predictions(job_id, client)
+    # Prepare files: resample, drop long silences, cut long recordings into chunks
+    # and encode for upload, as configured
+    with stage_span("prepare_audio"):
+        file_contents = resample_files(file_contents)
+        offset_maps = {}
+        if HUME_SILENCE_GATING:
+            file_contents, offset_maps = gate_files(file_contents)
+        chunks = plan_chunks(file_contents)
+        uploads, upload_names = encode_uploads([(chunk.filename, chunk.content) for chunk in chunks])
+        file_objects = prepare_audio_files(uploads)
+
+    chunked = len(chunks) > len(file_contents)
+    if chunked:
+        predictions_data = _run_chunked_hume_jobs(file_objects, client)
+    else:
+        predictions_data = _run_hume_job(file_objects, client)
+    if upload_names:
+        restore_upload_names(predictions_data, upload_names)
+    if chunked:
+        with stage_span("stitch_chunks"):
+            predictions_data = stitch_chunk_predictions(predictions_data, chunks)
+    if offset_maps:
+        # Hume saw the gated audio; its times must line up with the call and transcript again
+        restore_original_times(predictions_data, offset_maps)
     
-    # Extract top emotions
-    results = extract_top_emotions(predictions_data)
+    # Extract top emotions, keeping the full distributions when asked to
+    with stage_span("extract_emotions"):
+        batch = collect_predictions(predictions_data)
+        results = materialize_results(batch, rank_layouts(batch, top_n=1))
+    for result in results:
+        offset_map = offset_maps.get(result.get("filename"))
+        if offset_map is not None:
+            result.setdefault("metadata", {})["silence_gating"] = offset_map.summary()
+    if scores_path:
+        try:
+            with stage_span("save_scores"):
+                save_score_matrix(scores_path, batch)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Warning: Could not store score matrix at {scores_path}: {exc}")
 
     # Attach transcript and metadata when available
     if transcript_segments:
-        results = enrich_results_with_transcript(results, transcript_segments)
+        with stage_span("transcript_alignment"):
+            results = enrich_results_with_transcript(results, transcript_segments)
 
     if combined_retell_metadata:
         for result in results:
@@ -1017,14 +1280,30 @@ def analyze_audio_files(
     
     # Generate summary using OpenAI if available
     summary: Optional[str] = None
-    if include_summary:
-        summary = summarize_predictions(results)
+    overall_emotion: Optional[Dict[str, Any]] = None
+    if include_summary and OPENAI_COMBINED_ANALYSIS:
+        with stage_span("summary"):
+            combined = analyze_call_with_llm(results)
+        if combined:
+            summary = combined["summary"]
+            overall_emotion = combined["overall_emotion"]
+            for result in results:
+                result["summary"] = summary
+                metadata = result.setdefault("metadata", {})
+                metadata["summary_usage"] = combined["usage"]
+                metadata["combined_analysis"] = {"title": combined["title"], "purpose": combined["purpose"]}
+    if include_summary and summary is None:
+        with stage_span("summary"):
+            summary, summary_usage = summarize_predictions_with_usage(results)
         if summary:
             # Add summary to each result
             for result in results:
                 result["summary"] = summary
+                result.setdefault("metadata", {})["summary_usage"] = summary_usage
     
-    overall_emotion = determine_overall_call_emotion(results, summary)
+    if overall_emotion is None:
+        with stage_span("overall"):
+            overall_emotion = determine_overall_call_emotion(results, summary)
     if overall_emotion:
         for result in results:
             result.setdefault("metadata", {})["overall_call_emotion"] = overall_emotion
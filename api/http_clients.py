@@ -0,0 +1,189 @@
+import logging
+import os
+import threading
+import weakref
+from typing import Dict, Any, Callable, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from resilience import guarded_transport
+
+
+logger = logging.getLogger(__name__)
+
+# Connection pool sizing shared by every outbound client.
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Per-provider request timeouts in seconds.
+HUME_HTTP_TIMEOUT = float(os.getenv("HUME_HTTP_TIMEOUT", "60"))
+OPENAI_HTTP_TIMEOUT = float(os.getenv("OPENAI_HTTP_TIMEOUT", "60"))
+
+
+class ConnectionStats:
+    """Counts requests and newly opened connections for one client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams: "weakref.WeakSet[Any]" = weakref.WeakSet()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def record_httpx_response(self, response: Any) -> None:
+        # httpx exposes the underlying socket stream; a stream we have not seen is a new connection
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.requests += 1
+            if stream is None:
+                return
+            try:
+                if stream not in self._streams:
+                    self._streams.add(stream)
+                    self.connections_opened += 1
+            except TypeError:
+                self.connections_opened += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return _format_stats(self.requests, self.connections_opened)
+
+
+def _format_stats(request_count: int, connections_opened: int) -> Dict[str, Any]:
+    reused = max(request_count - connections_opened, 0)
+    return {
+        "requests": request_count,
+        "connections_opened": connections_opened,
+        "connections_reused": reused,
+        "reuse_ratio": round(reused / request_count, 4) if request_count else None,
+    }
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of long-lived HTTP clients.
+
+    Retell and recording downloads share one pooled ``requests.Session``; the
+    Hume and OpenAI SDK clients are created once per process on top of pooled
+    httpx clients. Everything is closed on FastAPI shutdown and lazily
+    recreated after a fork.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._session: Optional[requests.Session] = None
+        self._httpx_clients: Dict[str, httpx.Client] = {}
+        self._clients: Dict[str, Any] = {}
+        self._stats: Dict[str, ConnectionStats] = {}
+
+    def _check_pid(self) -> None:
+        # Pooled sockets must never be shared with a forked child
+        if os.getpid() != self._pid:
+            self._session = None
+            self._httpx_clients = {}
+            self._clients = {}
+            self._stats = {}
+            self._pid = os.getpid()
+
+    def requests_session(self) -> requests.Session:
+        with self._lock:
+            self._check_pid()
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def httpx_client(self, name: str, timeout: float) -> httpx.Client:
+        with self._lock:
+            self._check_pid()
+            client = self._httpx_clients.get(name)
+            if client is None:
+                stats = self._stats.setdefault(name, ConnectionStats())
+                client = httpx.Client(
+                    timeout=timeout,
+                    transport=guarded_transport(name, limits=connection_limits()),
+                    event_hooks={"response": [stats.record_httpx_response]},
+                )
+                self._httpx_clients[name] = client
+            return client
+
+    def stats_for(self, name: str) -> ConnectionStats:
+        with self._lock:
+            self._check_pid()
+            return self._stats.setdefault(name, ConnectionStats())
+
+    def get_or_create(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return the shared client registered under ``name``, building it on first use."""
+        with self._lock:
+            self._check_pid()
+            client = self._clients.get(name)
+            if client is None:
+                client = factory()
+                self._clients[name] = client
+                logger.info("Created shared %s client", name)
+            return client
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._check_pid()
+            metrics: Dict[str, Any] = {
+                name: stats.snapshot() for name, stats in self._stats.items()
+            }
+            if self._session is not None:
+                request_count = 0
+                connections_opened = 0
+                # The same adapter is mounted for http:// and https://
+                adapters = {id(adapter): adapter for adapter in self._session.adapters.values()}
+                for adapter in adapters.values():
+                    pools = getattr(adapter.poolmanager, "pools", None)
+                    if pools is None:
+                        continue
+                    for key in list(pools.keys()):
+                        pool = pools.get(key)
+                        if pool is None:
+                            continue
+                        request_count += getattr(pool, "num_requests", 0)
+                        connections_opened += getattr(pool, "num_connections", 0)
+                metrics["requests_session"] = _format_stats(request_count, connections_opened)
+            return metrics
+
+    def close(self) -> None:
+        with self._lock:
+            for name, client in list(self._clients.items()):
+                close = getattr(client, "close", None)
+                if callable(close):
+                    try:
+                        close()
+                    except Exception as exc:  # pylint: disable=broad-except
+                        logger.warning("Failed to close %s client: %s", name, exc)
+            for client in self._httpx_clients.values():
+                client.close()
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._httpx_clients = {}
+            self._clients = {}
+
+
+def connection_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAXSIZE,
+        max_keepalive_connections=HTTP_POOL_MAXSIZE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+_REGISTRY = ClientRegistry()
+
+
+def get_client_registry() -> ClientRegistry:
+    return _REGISTRY
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    from openai.types.chat import ChatCompletion
+except ImportError:  # pragma: no cover - optional dependency
+    ChatCompletion = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between batch status polls and the longest a backfill waits for one batch.
+OPENAI_BATCH_POLL_INTERVAL = float(os.getenv("OPENAI_BATCH_POLL_INTERVAL", "30"))
+OPENAI_BATCH_MAX_WAIT = float(os.getenv("OPENAI_BATCH_MAX_WAIT", str(24 * 3600)))
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class PendingBatchRequest(RuntimeError):
+    """Raised in place of a chat response that has not come back from a batch yet."""
+
+
+def request_key(body: Dict[str, Any]) -> str:
+    """Stable key for a chat request, so a later pass finds the reply to the same prompt."""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:24]
+
+
+class _Completions:
+    def __init__(self, owner: "BatchCollectingClient"):
+        self._owner = owner
+
+    def create(self, **body: Any) -> Any:
+        return self._owner.complete(body)
+
+
+class _Chat:
+    def __init__(self, owner: "BatchCollectingClient"):
+        self.completions = _Completions(owner)
+
+
+class BatchCollectingClient:
+    """
+    Drop-in for the OpenAI client's ``chat.completions.create`` in batch mode.
+
+    Requests whose reply is already known (from an earlier batch) are
+    answered from it. With ``collect`` any other request is queued for the
+    next batch and ``PendingBatchRequest`` is raised, which the LLM helpers
+    treat like any other OpenAI failure; without it, and for requests that
+    already failed in a batch, a plain error is raised so the helpers fall
+    back. Running the same helpers again once the batch is back replays
+    every answer, so prompts and parsing stay in one place.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        replies: Dict[str, Dict[str, Any]],
+        failed: Dict[str, Any],
+        collect: bool = True,
+    ):
+        self.scope = scope
+        self.replies = replies
+        self.failed = failed
+        self.collect = collect
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.chat = _Chat(self)
+
+    def custom_id(self, body: Dict[str, Any]) -> str:
+        return f"{self.scope}:{request_key(body)}"
+
+    def complete(self, body: Dict[str, Any]) -> Any:
+        custom_id = self.custom_id(body)
+        reply = self.replies.get(custom_id)
+        if reply is None:
+            if custom_id in self.failed:
+                # Already tried in a batch; let the helper fall back instead of resubmitting forever
+                raise RuntimeError(f"Batch request {custom_id} failed: {self.failed[custom_id]}")
+            if not self.collect:
+                raise RuntimeError(f"No batch reply for {custom_id}")
+            self.pending[custom_id] = body
+            raise PendingBatchRequest(custom_id)
+        if ChatCompletion is not None:
+            return ChatCompletion.model_validate(reply)
+        return reply
+
+
+class OpenAIBatchRunner:
+    """Submits chat requests as one Batch API job and waits for the replies."""
+
+    def __init__(
+        self,
+        client: Any,
+        poll_interval: float = OPENAI_BATCH_POLL_INTERVAL,
+        max_wait: float = OPENAI_BATCH_MAX_WAIT,
+    ):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stop waiting: a running ``run`` cancels its batch and returns, later ones submit nothing."""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    @staticmethod
+    def build_input(requests: Dict[str, Dict[str, Any]]) -> bytes:
+        lines = [
+            json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body},
+                       ensure_ascii=False, separators=(",", ":"))
+            for custom_id, body in requests.items()
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    @staticmethod
+    def parse_output(content: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """Successful response bodies by custom_id, and the errors of the rest."""
+        replies: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, Any] = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            custom_id = record.get("custom_id")
+            response = record.get("response") or {}
+            if response.get("status_code") == 200 and isinstance(response.get("body"), dict):
+                replies[custom_id] = response["body"]
+            else:
+                errors[custom_id] = record.get("error") or response.get("body") or response.get("status_code")
+        return replies, errors
+
+    def _file_text(self, file_id: Optional[str]) -> str:
+        if not file_id:
+            return ""
+        return self.client.files.content(file_id).text
+
+    def run(self, requests: Dict[str, Dict[str, Any]], description: str = "") -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """
+        Submit ``requests`` (custom_id -> chat request body) and poll until the
+        batch finishes. Returns the reply bodies and per-request errors; a
+        batch that fails, expires or times out reports every request as an error.
+        """
+        if not requests:
+            return {}, {}
+        if self.stopped:
+            return {}, {custom_id: "batch runner stopped" for custom_id in requests}
+        input_file = self.client.files.create(
+            file=("requests.jsonl", self.build_input(requests)),
+            purpose="batch",
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"description": description[:512]} if description else None,
+        )
+        logger.info("Submitted OpenAI batch %s with %d requests", batch.id, len(requests))
+
+        deadline = time.monotonic() + self.max_wait
+        while batch.status not in _TERMINAL_STATUSES:
+            if time.monotonic() >= deadline or self._stop.wait(self.poll_interval):
+                logger.warning("Gave up waiting for OpenAI batch %s (status %s)", batch.id, batch.status)
+                try:
+                    self.client.batches.cancel(batch.id)
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.warning("Could not cancel OpenAI batch %s: %s", batch.id, exc)
+                return {}, {custom_id: f"batch {batch.status}" for custom_id in requests}
+            batch = self.client.batches.retrieve(batch.id)
+
+        replies, errors = self.parse_output(self._file_text(getattr(batch, "output_file_id", None)))
+        _, failed = self.parse_output(self._file_text(getattr(batch, "error_file_id", None)))
+        errors.update(failed)
+        for custom_id in requests:
+            if custom_id not in replies and custom_id not in errors:
+                errors[custom_id] = f"batch {batch.status}"
+        logger.info(
+            "OpenAI batch %s %s: %d replies, %d errors", batch.id, batch.status, len(replies), len(errors)
+        )
+        return replies, errors
+
+
+def collect_pending(clients: List[BatchCollectingClient]) -> Dict[str, Dict[str, Any]]:
+    pending: Dict[str, Dict[str, Any]] = {}
+    for client in clients:
+        pending.update(client.pending)
+    return pending
@@ -0,0 +1,322 @@
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from tracing import start_span
+
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds: pipeline stages run from milliseconds (merging)
+# to minutes (Hume queue), store operations from sub-millisecond reads up.
+STAGE_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+STORE_BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# A collector returns families as (name, type, help, [(labels, value), ...]),
+# computed when /metrics is scraped.
+Sample = Tuple[Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+Collector = Callable[[], List[Family]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            # An unlabelled series is reported as 0 before its first update
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(f"{self.name}_total", self._labels(key), value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            # An unlabelled series is reported as 0 before its first update
+            self._values[()] = 0.0
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: Any) -> Iterator[None]:
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = STAGE_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts with a trailing +Inf slot, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = STAGE_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def add_collector(self, collector: Collector) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Metrics collector %s failed: %s", getattr(collector, "__name__", collector), exc)
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                sample_name = f"{name}_total" if kind == "counter" else name
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PIPELINE_RUN_SECONDS = REGISTRY.histogram(
+    "pipeline_run_duration_seconds", "Wall time of a whole analysis run.", ("pipeline", "outcome"),
+)
+PIPELINE_STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Wall time of one pipeline stage.", ("stage", "outcome"),
+)
+ANALYSIS_TASKS = REGISTRY.gauge(
+    "analysis_tasks", "Background call analyses by state (queued or running).", ("state",),
+)
+HUME_JOBS_IN_FLIGHT = REGISTRY.gauge(
+    "hume_jobs_in_flight", "Hume batch jobs submitted and not yet collected.",
+)
+STORE_OPERATION_SECONDS = REGISTRY.histogram(
+    "store_operation_duration_seconds",
+    "Time a call store read snapshot or write transaction was held open, lock wait included.",
+    ("operation",),
+    buckets=STORE_BUCKETS,
+)
+
+
+class StageTimings:
+    """Ordered timing spans of one pipeline run, as stored with its result."""
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started_at = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, stage: str, start: float, duration: float, outcome: str) -> None:
+        with self._lock:
+            self.spans.append({
+                "stage": stage,
+                "offset_ms": round((start - self._start) * 1000, 1),
+                "duration_ms": round(duration * 1000, 1),
+                "outcome": outcome,
+            })
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["offset_ms"])
+        return {
+            "pipeline": self.pipeline,
+            "started_at": self.started_at,
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 1),
+            "spans": spans,
+        }
+
+
+_CURRENT_TIMINGS: ContextVar[Optional[StageTimings]] = ContextVar("current_stage_timings", default=None)
+
+
+def current_timings() -> Optional[StageTimings]:
+    return _CURRENT_TIMINGS.get()
+
+
+@contextmanager
+def record_timings(pipeline: str) -> Iterator[StageTimings]:
+    """
+    Collect the spans of every ``stage_span`` inside the block.
+
+    Nested runs (``analyze_audio_files`` inside a Retell call) join the
+    outer run's timings rather than starting their own.
+    """
+    outer = _CURRENT_TIMINGS.get()
+    if outer is not None:
+        yield outer
+        return
+    timings = StageTimings(pipeline)
+    token = _CURRENT_TIMINGS.set(timings)
+    outcome = "error"
+    try:
+        with start_span(f"pipeline {pipeline}"):
+            yield timings
+        outcome = "ok"
+    finally:
+        _CURRENT_TIMINGS.reset(token)
+        PIPELINE_RUN_SECONDS.observe(time.perf_counter() - timings._start, pipeline=pipeline, outcome=outcome)
+
+
+@contextmanager
+def stage_span(stage: str) -> Iterator[None]:
+    """Time one stage into the stage histogram, the current run's timings and a trace span."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with start_span(f"stage {stage}"):
+            yield
+        outcome = "ok"
+    finally:
+        duration = time.perf_counter() - start
+        PIPELINE_STAGE_SECONDS.observe(duration, stage=stage, outcome=outcome)
+        timings = _CURRENT_TIMINGS.get()
+        if timings is not None:
+            timings.add(stage, start, duration, outcome)
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import types
+from datetime import datetime
+from typing import Dict, Any, Iterable, Optional, Set, Tuple, Callable
+
+
+# Retell analysis stages in the order they run. Each stage's output is stored
+# with a fingerprint of its inputs and of the code that produced it.
+STAGE_ORDER: Tuple[str, ...] = ("emotions", "summary", "overall", "merge", "timeline", "title", "purpose")
+
+# Bump a stage's version to invalidate stored outputs when its behaviour
+# changes in a way its code fingerprint does not capture.
+STAGE_VERSIONS: Dict[str, int] = {stage: 1 for stage in STAGE_ORDER}
+
+AUTO_STAGES = "auto"
+
+
+def _collect_constants(code: types.CodeType, into: list) -> None:
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            _collect_constants(constant, into)
+        elif isinstance(constant, (str, int, float, bool)) or constant is None:
+            into.append(repr(constant))
+    into.extend(code.co_names)
+
+
+def code_fingerprint(*functions: Callable[..., Any]) -> str:
+    """
+    Hash of the literals and referenced names in the given functions.
+
+    Prompt text lives in string constants, so editing a prompt changes the
+    fingerprint; bytecode itself is ignored so interpreter upgrades do not.
+    """
+    parts: list = []
+    for function in functions:
+        code = getattr(function, "__code__", None)
+        if code is None:
+            continue
+        parts.append(function.__qualname__)
+        _collect_constants(code, parts)
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def module_fingerprint(*modules: types.ModuleType, functions: Iterable[Callable[..., Any]] = ()) -> str:
+    """
+    ``code_fingerprint`` of every function and method defined in the given
+    modules and of ``functions``, plus the modules' private constants
+    (``_FRAME_SECONDS`` and the like).
+
+    Public constants are left out: those are settings read from the
+    environment, which callers fold into a stage's inputs when they matter.
+    """
+    collected: list = []
+    constants: list = []
+    for module in modules:
+        for name, value in sorted(vars(module).items()):
+            if isinstance(value, (types.FunctionType, type)):
+                if getattr(value, "__module__", None) != module.__name__:
+                    continue
+                if isinstance(value, type):
+                    for member in vars(value).values():
+                        member = member.fget if isinstance(member, property) else member
+                        if isinstance(member, types.FunctionType):
+                            collected.append(member)
+                else:
+                    collected.append(value)
+            elif name.startswith("_") and name.lstrip("_").isupper() and isinstance(value, (str, int, float, tuple)):
+                constants.append(f"{module.__name__}.{name}={value!r}")
+    digest = hashlib.sha256(code_fingerprint(*collected, *functions).encode("utf-8"))
+    digest.update("\x00".join(constants).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def stage_fingerprint(stage: str, inputs: Any, code_version: str) -> str:
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256()
+    digest.update(f"{stage}:{STAGE_VERSIONS[stage]}:{code_version}:".encode("utf-8"))
+    digest.update(canonical.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def stage_record(fingerprint: str) -> Dict[str, Any]:
+    return {
+        "fingerprint": fingerprint,
+        "completed_at": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+    }
+
+
+def parse_stages(value: Optional[str]) -> Optional[Set[str]]:
+    """
+    Parse a ``stages`` query value.
+
+    Returns None when no value was given, an empty set for ``auto`` (rerun
+    whatever is stale) and otherwise the named stages. Raises ValueError on
+    unknown names.
+    """
+    if value is None:
+        return None
+    names = {part.strip().lower() for part in value.split(",") if part.strip()}
+    if not names or names == {AUTO_STAGES}:
+        return set()
+    unknown = names - set(STAGE_ORDER)
+    if unknown:
+        raise ValueError(
+            f"Unknown stage(s): {', '.join(sorted(unknown))}. "
+            f"Valid stages: {', '.join(STAGE_ORDER)} or {AUTO_STAGES}"
+        )
+    return names
+
+
+def is_stale(
+    stage: str,
+    fingerprint: str,
+    stored: Dict[str, Any],
+    requested: Iterable[str] = (),
+) -> bool:
+    """A stage reruns when requested or when its stored fingerprint differs (or is missing)."""
+    if stage in requested:
+        return True
+    record = stored.get(stage) or {}
+    return record.get("fingerprint") != fingerprint
@@ -0,0 +1,262 @@
+import heapq
+from itertools import chain
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Dict, Any, Tuple, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional, fall back to pure Python
+    np = None  # type: ignore
+
+from emotion_categories import (
+    EMOTION_CATEGORY_BY_ID,
+    DEFAULT_EMOTION_CATEGORY,
+    UNKNOWN_EMOTION_ID,
+    emotion_id,
+    intern_emotion_name,
+)
+
+
+PREDICTION_SOURCES = ("prosody", "burst")
+
+_get_name = itemgetter("name")
+_get_score = itemgetter("score")
+
+
+@lru_cache(maxsize=64)
+def _compile_layout(names: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Tuple[int, ...], Tuple[str, ...]]:
+    """Interned names, emotion IDs and category labels for one column layout; Hume reuses a few layouts."""
+    interned = tuple(intern_emotion_name(name) if isinstance(name, str) else name for name in names)
+    ids = tuple(emotion_id(name) for name in interned)
+    categories = tuple(
+        EMOTION_CATEGORY_BY_ID[identifier].label if identifier != UNKNOWN_EMOTION_ID else DEFAULT_EMOTION_CATEGORY
+        for identifier in ids
+    )
+    return interned, ids, categories
+
+
+class _Layout:
+    """Rows of segments that report the same emotion names in the same order."""
+
+    __slots__ = ("names", "emotion_ids", "categories", "rows")
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names, self.emotion_ids, self.categories = _compile_layout(names)
+        self.rows: List[List[float]] = []
+
+    def matrix(self) -> "np.ndarray":
+        """Scores as a dense rows x emotions float64 array (requires numpy)."""
+        n_rows, n_cols = len(self.rows), len(self.names)
+        # fromiter over the flattened rows skips the nested-list shape inference of asarray
+        return np.fromiter(
+            chain.from_iterable(self.rows), dtype=np.float64, count=n_rows * n_cols
+        ).reshape(n_rows, n_cols)
+
+
+class PredictionBatch:
+    """
+    Every scored segment from a Hume predictions payload.
+
+    Scores are grouped by emotion layout (normally one per model) so each
+    layout can be handled as a dense segments x emotions matrix.
+    """
+
+    def __init__(self):
+        self.files: List[str] = []
+        # (file index, source, time_start, time_end, text, layout index, row within layout)
+        self.segments: List[Tuple[int, str, float, float, Optional[str], int, int]] = []
+        self.layouts: List[_Layout] = []
+        self._layout_index: Dict[Tuple[str, ...], int] = {}
+
+    def add_segments(
+        self,
+        file_index: int,
+        source: str,
+        pred_items: List[Dict[str, Any]],
+    ) -> None:
+        # Hot loop: everything it touches is bound to a local once per group
+        layouts = self.layouts
+        layout_index_for = self._layout_index.get
+        append_segment = self.segments.append
+        is_prosody = source == "prosody"
+        last_names: Optional[Tuple[str, ...]] = None
+        last_index = -1
+        last_rows: List[List[float]] = []
+
+        for pred_item in pred_items:
+            emotions = pred_item.get("emotions", [])
+            if not emotions:
+                continue
+
+            time_info = pred_item.get("time", {})
+            if isinstance(time_info, dict):
+                time_start = time_info.get("begin", 0)
+                time_end = time_info.get("end", 0)
+            else:
+                time_start = time_end = 0
+            text = pred_item.get("text", "") if is_prosody else None
+
+            try:
+                # Hume always sends both keys; map/itemgetter keeps this in C
+                names = tuple(map(_get_name, emotions))
+                scores = list(map(_get_score, emotions))
+            except KeyError:
+                names = tuple(emotion.get("name", "Unknown") for emotion in emotions)
+                scores = [emotion.get("score", 0) for emotion in emotions]
+
+            if names != last_names:
+                index = layout_index_for(names)
+                if index is None:
+                    index = len(layouts)
+                    layouts.append(_Layout(names))
+                    self._layout_index[names] = index
+                last_names = names
+                last_index = index
+                last_rows = layouts[index].rows
+
+            last_rows.append(scores)
+            append_segment((file_index, source, time_start, time_end, text, last_index, len(last_rows) - 1))
+
+
+def collect_predictions(predictions_data: List[Dict[str, Any]]) -> PredictionBatch:
+    """Walk the Hume predictions payload once and gather every scored segment."""
+    batch = PredictionBatch()
+
+    for item in predictions_data:
+        if not isinstance(item, dict) or "results" not in item:
+            continue
+
+        preds = item.get("results", {}).get("predictions", [])
+        if not preds:
+            continue
+
+        file_index = len(batch.files)
+        batch.files.append(item.get("source", {}).get("filename", "unknown"))
+
+        for pred in preds:
+            if not isinstance(pred, dict) or "models" not in pred:
+                continue
+            models = pred["models"]
+            for source in PREDICTION_SOURCES:
+                model_data = models.get(source)
+                if model_data is None:
+                    continue
+                for group in model_data.get("grouped_predictions", []):
+                    batch.add_segments(file_index, source, group.get("predictions", []))
+
+    return batch
+
+
+def top_k_indices(matrix: "np.ndarray", top_n: int) -> "np.ndarray":
+    """
+    Column indices of the ``top_n`` highest scores per row, best first.
+
+    Ties are broken by column order, matching a stable descending sort.
+    """
+    n_rows, n_cols = matrix.shape
+    k = min(top_n, n_cols)
+    if k == 1:
+        # argmax returns the first maximum, which is what a stable sort keeps
+        return np.argmax(matrix, axis=1)[:, None]
+    if k == n_cols:
+        return np.argsort(-matrix, axis=1, kind="stable")
+
+    negated = -matrix
+    selected = np.argpartition(negated, k - 1, axis=1)[:, :k]
+    selected.sort(axis=1)
+    selected_scores = np.take_along_axis(negated, selected, axis=1)
+    order = np.argsort(selected_scores, axis=1, kind="stable")
+    top = np.take_along_axis(selected, order, axis=1)
+
+    # argpartition may pick an arbitrary member of a tie at the cut-off; redo those rows exactly
+    threshold = np.take_along_axis(matrix, top[:, -1:], axis=1)
+    tied_rows = np.nonzero((matrix >= threshold).sum(axis=1) > k)[0]
+    if tied_rows.size:
+        top[tied_rows] = np.argsort(negated[tied_rows], axis=1, kind="stable")[:, :k]
+    return top
+
+
+def _top_k_python(rows: List[List[float]], top_n: int) -> List[List[int]]:
+    if top_n == 1:
+        # max() keeps the first maximum, like a stable descending sort
+        return [[max(range(len(scores)), key=scores.__getitem__)] for scores in rows]
+    # nlargest is documented as equivalent to sorted(..., reverse=True)[:n], ties included
+    return [heapq.nlargest(top_n, range(len(scores)), key=scores.__getitem__) for scores in rows]
+
+
+def rank_layouts(batch: PredictionBatch, top_n: int, use_numpy: bool = True) -> List[Any]:
+    """Top-k column indices for every row of every layout."""
+    ranked = []
+    for layout in batch.layouts:
+        if use_numpy and np is not None:
+            ranked.append(top_k_indices(layout.matrix(), top_n).tolist())
+        else:
+            ranked.append(_top_k_python(layout.rows, top_n))
+    return ranked
+
+
+def materialize_results(batch: PredictionBatch, ranked: List[Any]) -> List[Dict[str, Any]]:
+    """Render the ranked batch into the per-file result dictionaries the API returns."""
+    results = []
+    category_counts = []
+    for filename in batch.files:
+        counts = {"positive": 0, "neutral": 0, "negative": 0}
+        category_counts.append(counts)
+        results.append({
+            "filename": filename,
+            "prosody": [],
+            "burst": [],
+            "metadata": {"category_counts": counts},
+        })
+
+    layouts = batch.layouts
+    for file_index, source, time_start, time_end, text, layout_index, row in batch.segments:
+        layout = layouts[layout_index]
+        scores = layout.rows[row]
+        names = layout.names
+        categories = layout.categories
+        enriched_top_emotions = [
+            {
+                "name": names[column],
+                "score": round(scores[column], 4),
+                "percentage": round(scores[column] * 100, 1),
+                "category": categories[column],
+            }
+            for column in ranked[layout_index][row]
+        ]
+
+        primary_category = enriched_top_emotions[0]["category"]
+        category_counts[file_index][primary_category] += 1
+
+        if source == "prosody":
+            segment = {
+                "time_start": round(time_start, 2),
+                "time_end": round(time_end, 2),
+                "text": text,
+                "primary_category": primary_category,
+                "top_emotions": enriched_top_emotions,
+                "source": source,
+            }
+        else:
+            segment = {
+                "time_start": round(time_start, 2),
+                "time_end": round(time_end, 2),
+                "primary_category": primary_category,
+                "top_emotions": enriched_top_emotions,
+                "source": source,
+            }
+        results[file_index][source].append(segment)
+
+    return results
+
+
+def extract_top_emotions_batched(
+    predictions_data: List[Dict[str, Any]],
+    top_n: int = 1,
+    use_numpy: bool = True,
+) -> List[Dict[str, Any]]:
+    """Batched equivalent of ``extractor.extract_top_emotions``."""
+    batch = collect_predictions(predictions_data)
+    ranked = rank_layouts(batch, top_n, use_numpy=use_numpy)
+    return materialize_results(batch, ranked)
@@ -0,0 +1,276 @@
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from metrics import current_timings
+
+
+logger = logging.getLogger(__name__)
+
+# Analyses that run longer than this are sampled and their profile kept; 0 disables.
+PROFILE_SLOW_ANALYSIS_SECONDS = float(os.getenv("PROFILE_SLOW_ANALYSIS_SECONDS", "0"))
+# Milliseconds between stack samples of a running analysis.
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+PROFILE_TOP_FUNCTIONS = 50
+_MAX_STACK_DEPTH = 128
+
+_API_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (filename, first line, function name) of one frame
+FrameKey = Tuple[str, int, str]
+
+_PROFILING: ContextVar[bool] = ContextVar("profiling_active", default=False)
+
+
+def _frame_label(key: FrameKey) -> str:
+    filename, line, name = key
+    if filename.startswith(_API_DIR + os.sep):
+        filename = os.path.relpath(filename, _API_DIR)
+    elif "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    return f"{filename}:{line}({name})"
+
+
+def _stack(frame: Any) -> Tuple[FrameKey, ...]:
+    keys: List[FrameKey] = []
+    while frame is not None and len(keys) < _MAX_STACK_DEPTH:
+        code = frame.f_code
+        keys.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    keys.reverse()
+    return tuple(keys)
+
+
+class _StackSampler:
+    """
+    One daemon thread that periodically records the stack of every thread
+    registered with it. The analysis itself is not instrumented, so the
+    overhead stays low enough to leave on for every run.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._targets: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, thread_id: int) -> Counter:
+        samples: Counter = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="analysis-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return samples
+
+    def unregister(self, thread_id: int) -> None:
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                idle = not self._targets
+                if idle:
+                    self._wake.clear()
+                else:
+                    # Sampled under the lock so a run's counts are final once it unregisters
+                    frames = sys._current_frames()  # pylint: disable=protected-access
+                    for thread_id, samples in self._targets.items():
+                        frame = frames.get(thread_id)
+                        if frame is not None:
+                            samples[_stack(frame)] += 1
+                    del frames
+            if idle:
+                self._wake.wait()
+            else:
+                time.sleep(self.interval)
+
+
+_SAMPLER = _StackSampler(PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+
+def _sampled_functions(samples: Counter) -> List[Dict[str, Any]]:
+    total = sum(samples.values()) or 1
+    own: Counter = Counter()
+    cumulative: Counter = Counter()
+    for stack, count in samples.items():
+        if not stack:
+            continue
+        own[stack[-1]] += count
+        for key in set(stack):
+            cumulative[key] += count
+    return [
+        {
+            "function": _frame_label(key),
+            "self_samples": own[key],
+            "total_samples": count,
+            "self_pct": round(own[key] / total * 100, 1),
+            "total_pct": round(count / total * 100, 1),
+        }
+        for key, count in cumulative.most_common(PROFILE_TOP_FUNCTIONS)
+    ]
+
+
+def _folded_stacks(samples: Counter) -> List[str]:
+    """Collapsed stacks (``root;...;leaf count``) as read by flamegraph.pl and speedscope."""
+    return [
+        f"{';'.join(_frame_label(key) for key in stack)} {count}"
+        for stack, count in samples.most_common()
+        if stack
+    ]
+
+
+def _traced_functions(profile: cProfile.Profile) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profile).stats  # type: ignore[attr-defined]
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "function": _frame_label(key),
+            "calls": calls,
+            "self_seconds": round(own, 6),
+            "total_seconds": round(cumulative, 6),
+        }
+        for key, (_, calls, own, cumulative, _) in ranked[:PROFILE_TOP_FUNCTIONS]
+    ]
+
+
+def profile_paths(output_dir: str, call_id: str) -> Dict[str, str]:
+    return {
+        "json": os.path.join(output_dir, f"{call_id}.profile.json"),
+        "pstats": os.path.join(output_dir, f"{call_id}.profile.pstats"),
+    }
+
+
+def _write_profile(output_dir: str, call_id: str, report: Dict[str, Any], profile: Optional[cProfile.Profile]) -> str:
+    paths = profile_paths(output_dir, call_id)
+    if profile is not None:
+        profile.dump_stats(paths["pstats"])
+    elif os.path.exists(paths["pstats"]):
+        # A stale cProfile dump would not belong to this report
+        os.remove(paths["pstats"])
+    temp_path = f"{paths['json']}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(report, file)
+    os.replace(temp_path, paths["json"])
+    return paths["json"]
+
+
+@contextmanager
+def profile_run(call_id: str, output_dir: str, pipeline: str, requested: bool = False) -> Iterator[None]:
+    """
+    Profile one analysis run and store the profile next to its results.
+
+    A run flagged by an admin (``requested``) is traced with cProfile and
+    always saved, with a ``.pstats`` dump for snakeviz or ``pstats``. Any
+    other run is stack-sampled when ``PROFILE_SLOW_ANALYSIS_SECONDS`` is set,
+    and the samples are only saved if the run took at least that long.
+    Nested runs (a stage rerun falling back to a full analysis) belong to
+    the outer profile.
+    """
+    if _PROFILING.get() or not call_id or not (requested or PROFILE_SLOW_ANALYSIS_SECONDS > 0):
+        yield
+        return
+
+    token = _PROFILING.set(True)
+    started_at = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    start = time.perf_counter()
+    thread_id = threading.get_ident()
+    profile: Optional[cProfile.Profile] = None
+    samples: Optional[Counter] = None
+    if requested:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as exc:
+            # Another profiler owns this thread; fall back to sampling
+            logger.warning("Could not trace call %s with cProfile: %s", call_id, exc)
+            profile = None
+    if profile is None:
+        samples = _SAMPLER.register(thread_id)
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        if profile is not None:
+            profile.disable()
+        else:
+            _SAMPLER.unregister(thread_id)
+        _PROFILING.reset(token)
+        duration = time.perf_counter() - start
+        if requested or duration >= PROFILE_SLOW_ANALYSIS_SECONDS:
+            timings = current_timings()
+            report: Dict[str, Any] = {
+                "call_id": call_id,
+                "pipeline": pipeline,
+                "mode": "cprofile" if profile is not None else "sampling",
+                "reason": "requested" if requested else "slow",
+                "started_at": started_at,
+                "duration_seconds": round(duration, 3),
+                "outcome": outcome,
+                "timings": timings.as_dict() if timings is not None else None,
+            }
+            if profile is not None:
+                report["functions"] = _traced_functions(profile)
+            else:
+                report["threshold_seconds"] = PROFILE_SLOW_ANALYSIS_SECONDS
+                report["interval_ms"] = PROFILE_SAMPLE_INTERVAL_MS
+                report["samples"] = sum(samples.values())
+                report["functions"] = _sampled_functions(samples)
+                report["folded"] = _folded_stacks(samples)
+            try:
+                path = _write_profile(output_dir, call_id, report, profile)
+                logger.info("Saved %s profile of %.1f s %s run for call %s to %s", report["mode"], duration, pipeline, call_id, path)
+            except OSError as exc:
+                logger.warning("Could not save profile for call %s: %s", call_id, exc)
+
+
+def load_profile(output_dir: str, call_id: str) -> Optional[Dict[str, Any]]:
+    path = profile_paths(output_dir, call_id)["json"]
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def list_profiles(output_dir: str) -> List[Dict[str, Any]]:
+    """Summaries of the stored profiles, newest first."""
+    summaries = []
+    for name in os.listdir(output_dir):
+        if not name.endswith(".profile.json"):
+            continue
+        try:
+            with open(os.path.join(output_dir, name), "r", encoding="utf-8") as file:
+                report = json.load(file)
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("Skipping unreadable profile %s: %s", name, exc)
+            continue
+        functions = report.get("functions") or []
+        hottest = max(functions, key=lambda entry: entry.get("self_samples") or entry.get("self_seconds") or 0, default=None)
+        summaries.append({
+            "call_id": report.get("call_id"),
+            "pipeline": report.get("pipeline"),
+            "mode": report.get("mode"),
+            "reason": report.get("reason"),
+            "started_at": report.get("started_at"),
+            "duration_seconds": report.get("duration_seconds"),
+            "outcome": report.get("outcome"),
+            "samples": report.get("samples"),
+            "pstats_available": os.path.exists(profile_paths(output_dir, report.get("call_id") or "")["pstats"]),
+            "hottest_function": hottest["function"] if hottest else None,
+        })
+    summaries.sort(key=lambda summary: summary.get("started_at") or "", reverse=True)
+    return summaries
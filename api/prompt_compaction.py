@@ -0,0 +1,238 @@
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import tiktoken  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None  # type: ignore
+
+
+# Upper bound for a whole summary prompt (system + user message); 0 disables trimming.
+SUMMARY_PROMPT_TOKEN_BUDGET = int(os.getenv("SUMMARY_PROMPT_TOKEN_BUDGET", "6000"))
+
+# Encoding used by gpt-4o; counts are estimated from length when tiktoken is missing.
+PROMPT_TOKEN_ENCODING = "o200k_base"
+
+_CUSTOMER_SPEAKERS = {"customer", "user", "caller"}
+_HIGHLIGHT_TEXT_LIMIT = 200
+_TOP_SPEAKER_EMOTIONS = 5
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(PROMPT_TOKEN_ENCODING)
+    except Exception:  # pylint: disable=broad-except
+        # The BPE file is fetched on first use and may be unavailable offline
+        return None
+
+
+def tokenizer_name() -> str:
+    return PROMPT_TOKEN_ENCODING if _encoding() is not None else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    """Token count of ``text`` for gpt-4o, or a ~4 characters per token estimate."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(math.ceil(len(text) / 4))
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _time_range(start: Any, end: Any) -> str:
+    try:
+        return f"{float(start):.1f}-{float(end):.1f}s"
+    except (TypeError, ValueError):
+        return ""
+
+
+def _is_customer(speaker: Any) -> bool:
+    return str(speaker or "").lower() in _CUSTOMER_SPEAKERS
+
+
+def _without_empty(value: Any) -> Any:
+    if isinstance(value, dict):
+        cleaned = {key: _without_empty(item) for key, item in value.items()}
+        return {key: item for key, item in cleaned.items() if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_without_empty(item) for item in value]
+    return value
+
+
+def _emotion_label(emotion: Dict[str, Any], percentage: Optional[float] = None) -> str:
+    if percentage is None:
+        percentage = emotion.get("percentage")
+    label = str(emotion.get("name"))
+    if percentage is not None:
+        label += f" {float(percentage):.0f}%"
+    category = emotion.get("category")
+    return f"{label} ({category})" if category else label
+
+
+def collapse_segment_runs(segments: List[Dict[str, Any]], keep_text: bool) -> List[Dict[str, Any]]:
+    """
+    Merge consecutive segments of one speaker whose emotions are the same.
+
+    A run keeps its first start and last end, the mean percentage of each
+    emotion and ``n``, the number of segments merged. Segment text is only
+    kept when there is no transcript to read it from.
+    """
+    runs: List[Dict[str, Any]] = []
+    previous_key = None
+    for segment in segments:
+        emotions = segment.get("top_emotions") or []
+        key = (segment.get("speaker"), segment.get("type"), tuple(e.get("name") for e in emotions))
+        if key == previous_key:
+            run = runs[-1]
+            run["end"] = segment.get("time_end")
+            run["n"] += 1
+            for totals, emotion in zip(run["percentages"], emotions):
+                totals.append(emotion.get("percentage") or 0.0)
+            if keep_text and segment.get("text"):
+                run["texts"].append(segment["text"])
+        else:
+            runs.append({
+                "start": segment.get("time_start"),
+                "end": segment.get("time_end"),
+                "speaker": segment.get("speaker"),
+                "type": segment.get("type"),
+                "emotions": emotions,
+                "percentages": [[emotion.get("percentage") or 0.0] for emotion in emotions],
+                "texts": [segment["text"]] if keep_text and segment.get("text") else [],
+                "n": 1,
+            })
+            previous_key = key
+
+    compacted = []
+    for run in runs:
+        item: Dict[str, Any] = {
+            "time": _time_range(run["start"], run["end"]),
+            "speaker": run["speaker"],
+            "emotions": [
+                _emotion_label(emotion, sum(values) / len(values))
+                for emotion, values in zip(run["emotions"], run["percentages"])
+            ],
+        }
+        if run["type"]:
+            item["type"] = run["type"]
+        if run["n"] > 1:
+            item["n"] = run["n"]
+        if run["texts"]:
+            item["text"] = " ".join(run["texts"])
+        compacted.append(item)
+    return compacted
+
+
+def _compact_highlight(highlight: Dict[str, Any]) -> Dict[str, Any]:
+    text = highlight.get("text") or ""
+    if len(text) > _HIGHLIGHT_TEXT_LIMIT:
+        text = text[:_HIGHLIGHT_TEXT_LIMIT].rstrip() + "…"
+    item = {
+        "time": _time_range(highlight.get("time_start"), highlight.get("time_end")),
+        "speaker": highlight.get("speaker"),
+        "emotion": _emotion_label({
+            "name": highlight.get("primary_emotion"),
+            "category": highlight.get("category"),
+            "percentage": round(highlight["score"] * 100, 1) if highlight.get("score") is not None else None,
+        }),
+        "text": text,
+    }
+    if highlight.get("type"):
+        item["type"] = highlight["type"]
+    return item
+
+
+def compact_summary_data(
+    summary_data: List[Dict[str, Any]],
+    token_budget: int = SUMMARY_PROMPT_TOKEN_BUDGET,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Shrink the per-file data ``summarize_predictions`` builds to fit a token budget.
+
+    The transcript and call context, identical for every channel, are sent
+    once; segment text is dropped in favour of the transcript; runs of the
+    same emotion are collapsed; and JSON is emitted without indentation.
+    When the result is still over ``token_budget`` (0 = unlimited), items are
+    kept in priority order - customer emotion shifts, other shifts, customer
+    transcript lines, other transcript lines, customer segments, other
+    segments - and what was left out is counted under ``omitted``.
+
+    Returns the compacted payload and its statistics.
+    """
+    transcript: List[Dict[str, Any]] = []
+    for file_summary in summary_data:
+        if file_summary.get("transcript"):
+            transcript = [
+                {
+                    "time": _time_range(line.get("time_start"), line.get("time_end")),
+                    "speaker": line.get("speaker"),
+                    "text": (line.get("text") or "").strip(),
+                }
+                for line in file_summary["transcript"]
+                if (line.get("text") or "").strip()
+            ]
+            break
+    context = _without_empty(summary_data[0].get("context") or {}) if summary_data else {}
+
+    files: List[Dict[str, Any]] = []
+    # (priority, file index, section, position, item)
+    candidates: List[Tuple[int, int, str, int, Dict[str, Any]]] = []
+    for index, file_summary in enumerate(summary_data):
+        files.append(_without_empty({
+            "filename": file_summary.get("filename"),
+            "category_counts": file_summary.get("category_counts"),
+            "speaker_primary_emotions": {
+                speaker: dict(counts[:_TOP_SPEAKER_EMOTIONS])
+                for speaker, counts in (file_summary.get("speaker_primary_emotions") or {}).items()
+            },
+        }))
+        for position, highlight in enumerate(file_summary.get("emotion_highlights") or []):
+            priority = 0 if _is_customer(highlight.get("speaker")) else 1
+            candidates.append((priority, index, "emotion_highlights", position, _compact_highlight(highlight)))
+        runs = collapse_segment_runs(file_summary.get("segments") or [], keep_text=not transcript)
+        for position, run in enumerate(runs):
+            priority = 4 if _is_customer(run.get("speaker")) else 5
+            candidates.append((priority, index, "segments", position, run))
+    for position, line in enumerate(transcript):
+        priority = 2 if _is_customer(line.get("speaker")) else 3
+        candidates.append((priority, -1, "transcript", position, line))
+
+    payload: Dict[str, Any] = {"context": context, "transcript": [], "files": files}
+    used = count_tokens(compact_json(payload))
+    kept: List[Tuple[int, str, int, Dict[str, Any]]] = []
+    omitted: Dict[str, int] = {}
+    opened = {(-1, "transcript")}
+    for priority, index, section, position, item in sorted(candidates, key=lambda c: c[:4]):
+        cost = count_tokens(compact_json(item)) + 1
+        if (index, section) not in opened:
+            cost += count_tokens(f'"{section}":[],')
+        if token_budget > 0 and used + cost > token_budget:
+            omitted[section] = omitted.get(section, 0) + 1
+            continue
+        used += cost
+        opened.add((index, section))
+        kept.append((index, section, position, item))
+
+    kept.sort(key=lambda k: (k[0], k[1], k[2]))
+    for index, section, _, item in kept:
+        target = payload if index < 0 else files[index]
+        target.setdefault(section, []).append(item)
+    if omitted:
+        payload["omitted"] = omitted
+
+    stats = {
+        "token_budget": token_budget,
+        "payload_tokens": count_tokens(compact_json(payload)),
+        "omitted": omitted,
+        "tokenizer": tokenizer_name(),
+    }
+    return payload, stats
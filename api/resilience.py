@@ -0,0 +1,419 @@
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Tuple, Type
+
+import httpx
+import requests
+
+from tracing import mark_span_error, set_span_attributes, start_span
+
+try:
+    import httpx2  # type: ignore
+except ImportError:  # pragma: no cover - only present with newer openai SDKs
+    httpx2 = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that open a provider's circuit, and seconds before a probe is let through.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Full-jitter exponential backoff between retries, in seconds.
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+
+# Longest a request waits for a rate-limit token before failing.
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "120"))
+
+# Requests per second, burst size and retries per provider; override with
+# e.g. OPENAI_RATE_LIMIT, OPENAI_RATE_BURST, OPENAI_MAX_RETRIES. A rate of 0
+# disables limiting for that provider.
+PROVIDER_DEFAULTS: Dict[str, Dict[str, float]] = {
+    "hume": {"rate": 2.0, "burst": 5, "retries": 3},
+    "retell": {"rate": 10.0, "burst": 20, "retries": 3},
+    "openai": {"rate": 5.0, "burst": 10, "retries": 4},
+}
+
+_RETRY_ALWAYS_STATUSES = {429, 503}
+_RETRY_IDEMPOTENT_STATUSES = {500, 502, 504}
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def _exception_types(*names: str) -> Tuple[Type[BaseException], ...]:
+    found = []
+    for module in (httpx, httpx2):
+        if module is None:
+            continue
+        for name in names:
+            exc_type = getattr(module, name, None)
+            if isinstance(exc_type, type):
+                found.append(exc_type)
+    return tuple(found)
+
+
+# The request never reached the provider, so even a POST can be resent
+_NOT_SENT_ERRORS = _exception_types("ConnectError", "ConnectTimeout", "PoolTimeout") + (
+    ConnectionRefusedError,
+    requests.ConnectionError,
+)
+# The request may have been processed; only idempotent requests are resent
+_TRANSIENT_ERRORS = _exception_types("TimeoutException", "NetworkError", "RemoteProtocolError") + (
+    requests.Timeout,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} circuit is open after repeated failures; retry in {retry_in:.0f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when no rate-limit token became available in time."""
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """Seconds from a Retry-After (or retry-after-ms) header, if there is one."""
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        parsed = email.utils.parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(email.utils.mktime_tz(parsed) - time.time(), 0.0)
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket whose refill rate backs off on 429s and creeps back up.
+
+    A 429 halves the rate (down to ``min_rate``) and, with a Retry-After,
+    holds every caller until it has passed; each success adds back 5% of
+    the configured rate until it is reached again.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, max_wait: float = RATE_LIMIT_MAX_WAIT) -> float:
+        """Take one token, sleeping as needed; returns the seconds waited."""
+        if self.max_rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            if waited + delay > max_wait:
+                raise RateLimitTimeout(f"No rate-limit token within {max_wait:.0f}s")
+            time.sleep(delay)
+            waited += delay
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        if self.max_rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def recover(self) -> None:
+        if self.max_rate <= 0 or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "tokens": round(self.tokens, 2),
+                "blocked_for": round(max(self.blocked_until - time.monotonic(), 0.0), 2),
+            }
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures; after
+    ``reset_timeout`` one probe is let through (half-open) and its outcome
+    closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                retry_in = self.opened_at + self.reset_timeout - now
+                if retry_in > 0:
+                    raise CircuitOpenError(self.name, retry_in)
+                self.state = self.HALF_OPEN
+                self.probing = False
+            if self.probing:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self.probing = True
+            logger.info("Probing %s after its circuit was open", self.name)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("%s circuit closed", self.name)
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        "%s circuit opened after %d consecutive failures", self.name, self.failures
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def release(self) -> None:
+        """End a half-open probe whose outcome says nothing about the provider's health."""
+        with self._lock:
+            self.probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+            }
+
+
+class ProviderGuard:
+    """Rate limit, retries with jittered backoff and a circuit breaker for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        max_retries: int,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+    ):
+        self.name = name
+        self.bucket = AdaptiveTokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0, "rejected": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def send(self, fn: Callable[[], Any], idempotent: bool = True, method: str = "GET", url: str = "") -> Any:
+        """
+        Call ``fn`` (one HTTP request) under the guard.
+
+        ``fn`` either returns a response with ``status_code``/``headers`` or
+        raises. 429 and 503 responses and connection failures are retried for
+        any request; other 5xx responses and timeouts only when
+        ``idempotent``. The last response is returned (or the last exception
+        raised) once retries run out, so callers see the usual errors.
+        Each attempt is traced as a client span; ``method`` and ``url`` label it.
+        """
+        span_attributes = {
+            "http.request.method": method,
+            "url.full": url.split("?", 1)[0] or None,
+            "peer.service": self.name,
+        }
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("rejected")
+                raise
+            try:
+                self.bucket.acquire()
+            except RateLimitTimeout:
+                self.breaker.release()
+                raise
+            self._count("calls")
+
+            try:
+                with start_span(f"{method} {self.name}", kind="client", attributes=span_attributes) as span:
+                    if attempt:
+                        set_span_attributes(span, {"http.request.resend_count": attempt})
+                    response = fn()
+                    status_code = getattr(response, "status_code", 200)
+                    set_span_attributes(span, {"http.response.status_code": status_code})
+                    if status_code >= 400:
+                        mark_span_error(span, str(status_code))
+            except Exception as exc:
+                not_sent = isinstance(exc, _NOT_SENT_ERRORS)
+                if not not_sent and not isinstance(exc, _TRANSIENT_ERRORS):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                self._count("failures")
+                if attempt >= self.max_retries or not (not_sent or idempotent):
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning("%s request failed (%s); retry %d in %.2fs", self.name, exc, attempt + 1, delay)
+            else:
+                retry_after = parse_retry_after(getattr(response, "headers", None))
+                if status_code == 429:
+                    self._count("throttled")
+                    self.bucket.throttle(retry_after)
+                    self.breaker.release()
+                elif status_code >= 500:
+                    self.breaker.record_failure()
+                    self._count("failures")
+                else:
+                    self.breaker.record_success()
+                    self.bucket.recover()
+                    return response
+                retryable = status_code in _RETRY_ALWAYS_STATUSES or (
+                    idempotent and status_code in _RETRY_IDEMPOTENT_STATUSES
+                )
+                if attempt >= self.max_retries or not retryable:
+                    return response
+                delay = self.backoff(attempt, retry_after)
+                logger.warning("%s returned %d; retry %d in %.2fs", self.name, status_code, attempt + 1, delay)
+                close = getattr(response, "close", None)
+                if callable(close):
+                    close()
+
+            self._count("retries")
+            time.sleep(delay)
+            attempt += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {"circuit": self.breaker.snapshot(), "rate_limit": self.bucket.snapshot(), **counters}
+
+
+_GUARDS: Dict[str, ProviderGuard] = {}
+_GUARDS_LOCK = threading.Lock()
+
+
+def get_guard(provider: str) -> ProviderGuard:
+    """The process-wide guard for ``provider`` (hume, retell or openai)."""
+    with _GUARDS_LOCK:
+        guard = _GUARDS.get(provider)
+        if guard is None:
+            defaults = PROVIDER_DEFAULTS.get(provider, {"rate": 0, "burst": 1, "retries": 2})
+            prefix = provider.upper()
+            guard = ProviderGuard(
+                provider,
+                rate=float(os.getenv(f"{prefix}_RATE_LIMIT", defaults["rate"])),
+                burst=float(os.getenv(f"{prefix}_RATE_BURST", defaults["burst"])),
+                max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", defaults["retries"])),
+            )
+            _GUARDS[provider] = guard
+        return guard
+
+
+def resilience_metrics() -> Dict[str, Any]:
+    with _GUARDS_LOCK:
+        guards = dict(_GUARDS)
+    return {name: guard.snapshot() for name, guard in guards.items()}
+
+
+def guarded_transport(provider: str, module: Any = httpx, retry_posts: bool = False, **transport_options: Any) -> Any:
+    """
+    An httpx (or httpx2, for the OpenAI SDK) transport that sends every
+    request through ``provider``'s guard. ``retry_posts`` treats POSTs as
+    safe to resend, for APIs where a duplicate only costs a request.
+    """
+
+    class GuardedTransport(module.BaseTransport):
+        def __init__(self):
+            self._inner = module.HTTPTransport(**transport_options)
+            self._guard = get_guard(provider)
+
+        def handle_request(self, request):
+            return self._guard.send(
+                lambda: self._inner.handle_request(request),
+                idempotent=retry_posts or request.method.upper() in _IDEMPOTENT_METHODS,
+                method=request.method.upper(),
+                url=str(request.url),
+            )
+
+        def close(self) -> None:
+            self._inner.close()
+
+    return GuardedTransport()
@@ -0,0 +1,120 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+
+
+# fetch(previous_validators) -> (value, validators); value is None when the
+# origin confirmed the cached copy is still current (HTTP 304).
+FetchFunction = Callable[[Dict[str, str]], Tuple[Optional[Any], Dict[str, str]]]
+
+
+class _CacheEntry:
+    __slots__ = ("value", "validators", "fetched_at")
+
+    def __init__(self, value: Any, validators: Dict[str, str], fetched_at: float):
+        self.value = value
+        self.validators = validators
+        self.fetched_at = fetched_at
+
+
+class _InFlight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class RevalidatingCache:
+    """
+    Bounded TTL cache with single-flight fetches and conditional revalidation.
+
+    Concurrent misses for the same key share one fetch. Once an entry is older
+    than its max age the fetch function receives the stored validators (ETag /
+    Last-Modified) so the origin can answer "not modified" instead of sending
+    the payload again. Values are deep-copied on the way out so callers can
+    mutate what they receive.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 512):
+        self.ttl = ttl
+        self.max_entries = max(max_entries, 1)
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.shared_fetches = 0
+
+    def get(self, key: str, fetch: FetchFunction, max_age: Optional[float] = None) -> Any:
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.fetched_at <= max_age:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry.value)
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                self.shared_fetches += 1
+                leader = False
+            else:
+                in_flight = _InFlight()
+                self._in_flight[key] = in_flight
+                leader = True
+                self.misses += 1
+            validators = dict(entry.validators) if entry is not None else {}
+            # Kept so a "not modified" answer still has its value if the entry is evicted meanwhile
+            stale = entry
+
+        if not leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return copy.deepcopy(in_flight.value)
+
+        try:
+            value, new_validators = fetch(validators)
+            with self._lock:
+                if value is None:
+                    cached = self._entries.get(key) or stale
+                    if cached is None:
+                        raise RuntimeError(f"Origin reported {key} unchanged but it is not cached")
+                    value = cached.value
+                    self._store(key, value, new_validators or cached.validators)
+                    self.revalidated += 1
+                else:
+                    self._store(key, value, new_validators)
+            in_flight.value = value
+            return copy.deepcopy(value)
+        except BaseException as exc:
+            in_flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.done.set()
+
+    def _store(self, key: str, value: Any, validators: Dict[str, str]) -> None:
+        # Caller holds the lock
+        self._entries[key] = _CacheEntry(value, validators, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.shared_fetches
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "shared_fetches": self.shared_fetches,
+                "hit_ratio": round((self.hits + self.shared_fetches) / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,164 @@
+import logging
+import os
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional, score matrices are skipped without it
+    np = None  # type: ignore
+
+from emotion_categories import emotion_category
+from prediction_engine import PREDICTION_SOURCES, PredictionBatch, top_k_indices
+
+
+logger = logging.getLogger(__name__)
+
+# Precision of stored scores: float32 is accurate to the 4 decimals the API reports, float16 halves the size.
+SCORE_STORE_DTYPE = os.getenv("SCORE_STORE_DTYPE", "float32")
+
+_CATEGORY_LABELS = ("positive", "neutral", "negative")
+
+
+def score_matrix_available() -> bool:
+    return np is not None
+
+
+def save_score_matrix(path: str, batch: PredictionBatch, dtype: str = SCORE_STORE_DTYPE) -> Optional[str]:
+    """
+    Persist every segment's full emotion distribution next to the analysis.
+
+    The archive holds one scores matrix and one name array per emotion
+    layout, plus a ``segments`` index of (file, source, layout, row) in the
+    order the segments appear in the rendered results.
+    """
+    if np is None:
+        logger.info("numpy is not installed; not storing score matrix %s", path)
+        return None
+
+    arrays: Dict[str, Any] = {
+        "files": np.array(batch.files, dtype=str),
+        "segments": np.array(
+            [
+                (file_index, PREDICTION_SOURCES.index(source), layout_index, row)
+                for file_index, source, _, _, _, layout_index, row in batch.segments
+            ],
+            dtype=np.int32,
+        ).reshape(-1, 4),
+    }
+    for layout_index, layout in enumerate(batch.layouts):
+        arrays[f"layout{layout_index}_names"] = np.array(layout.names, dtype=str)
+        arrays[f"layout{layout_index}_scores"] = layout.matrix().astype(dtype)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(temp_path, path)
+    return path
+
+
+class StoredScores:
+    """Score matrices loaded back from :func:`save_score_matrix`."""
+
+    def __init__(
+        self,
+        files: List[str],
+        segments: "np.ndarray",
+        layouts: List[Tuple[Tuple[str, ...], "np.ndarray"]],
+    ):
+        self.files = files
+        self.segments = segments
+        self.layouts = layouts
+        # Ranking and sums run in float64 whatever precision was stored
+        self._wide = [scores.astype(np.float64) for _, scores in layouts]
+
+    @classmethod
+    def load(cls, path: str) -> "StoredScores":
+        if np is None:
+            raise RuntimeError("numpy is required to read stored score matrices")
+        with np.load(path, allow_pickle=False) as archive:
+            layouts = []
+            layout_index = 0
+            while f"layout{layout_index}_scores" in archive.files:
+                names = tuple(str(name) for name in archive[f"layout{layout_index}_names"])
+                layouts.append((names, archive[f"layout{layout_index}_scores"]))
+                layout_index += 1
+            return cls(
+                files=[str(name) for name in archive["files"]],
+                segments=archive["segments"],
+                layouts=layouts,
+            )
+
+    def _segment_rows(self, file_index: int, source: str) -> "np.ndarray":
+        mask = (self.segments[:, 0] == file_index) & (self.segments[:, 1] == PREDICTION_SOURCES.index(source))
+        return self.segments[mask][:, 2:]
+
+    def render(
+        self,
+        results: List[Dict[str, Any]],
+        top_n: int = 1,
+        min_score: Optional[float] = None,
+        category_scores: bool = False,
+    ) -> int:
+        """
+        Rewrite ``top_emotions`` of the stored per-file results in place.
+
+        ``results`` are the per-file results in the order Hume returned
+        them. Files whose segments no longer line up with the stored rows
+        are left untouched. Every result gets ``top_n_applied`` saying which
+        of the two happened. Returns the number of files re-rendered.
+        """
+        ranked = [top_k_indices(scores, top_n).tolist() for scores in self._wide]
+        categories = [tuple(emotion_category(name).label for name in names) for names, _ in self.layouts]
+        category_masks = [
+            {label: np.array([category == label for category in layout_categories]) for label in _CATEGORY_LABELS}
+            for layout_categories in categories
+        ]
+
+        for result in results:
+            result["top_n_applied"] = False
+        rendered = 0
+        for file_index, filename in enumerate(self.files):
+            if file_index >= len(results) or results[file_index].get("filename") != filename:
+                logger.warning("Stored scores for %s do not match the stored results; skipping", filename)
+                continue
+            result = results[file_index]
+            # Check every source first so a file is either fully re-rendered or left as stored
+            source_rows = {source: self._segment_rows(file_index, source) for source in PREDICTION_SOURCES}
+            mismatched = [
+                source for source, rows in source_rows.items()
+                if len(rows) != len(result.get(source) or [])
+            ]
+            if mismatched:
+                logger.warning("Stored %s rows for %s do not match its segments; skipping", "/".join(mismatched), filename)
+                continue
+            for source in PREDICTION_SOURCES:
+                segments = result.get(source) or []
+                rows = source_rows[source]
+                for segment, (layout_index, row) in zip(segments, rows.tolist()):
+                    names, stored = self.layouts[layout_index]
+                    stored_row = stored[row]
+                    row_scores = self._wide[layout_index][row]
+                    layout_categories = categories[layout_index]
+                    columns = ranked[layout_index][row]
+                    top_emotions = []
+                    for column in columns:
+                        # The shortest repr of the stored value, so 0.2015 stays 0.2015 rather than 0.20149999
+                        score = float(str(stored_row[column]))
+                        if min_score is not None and score < min_score:
+                            break
+                        top_emotions.append({
+                            "name": names[column],
+                            "score": round(score, 4),
+                            "percentage": round(score * 100, 1),
+                            "category": layout_categories[column],
+                        })
+                    segment["top_emotions"] = top_emotions
+                    segment["primary_category"] = layout_categories[columns[0]]
+                    if category_scores:
+                        segment["category_scores"] = {
+                            label: round(float(row_scores[mask].sum()), 4)
+                            for label, mask in category_masks[layout_index].items()
+                        }
+            result["top_n_applied"] = True
+            rendered += 1
+        return rendered
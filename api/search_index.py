@@ -0,0 +1,243 @@
+import logging
+import re
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from call_store import CallStore, CallStoreTransaction
+from timeline import call_timeline_segments
+
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[\w']+\*?", re.UNICODE)
+
+
+def _transcript_segments(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for result in results:
+        segments = (result.get("metadata") or {}).get("retell_transcript_segments")
+        if segments:
+            return segments
+    return []
+
+
+def align_transcript_emotions(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Transcript segments of an analysed call with the primary emotion of the
+    prosody segment that overlaps them most (same speaker preferred).
+    """
+    emotion_segments = call_timeline_segments(results)
+    aligned = []
+    for sequence, segment in enumerate(_transcript_segments(results)):
+        text = (segment.get("text") or "").strip()
+        if not text:
+            continue
+        try:
+            start = float(segment.get("start"))
+            end = float(segment.get("end"))
+        except (TypeError, ValueError):
+            continue
+        speaker = segment.get("speaker") or "Unknown"
+
+        best = None
+        best_key = (False, 0.0)
+        for candidate in emotion_segments:
+            if candidate["start"] >= end:
+                break
+            overlap = min(end, candidate["end"]) - max(start, candidate["start"])
+            if overlap <= 0:
+                continue
+            key = (candidate["speaker"] == speaker, overlap)
+            if key > best_key:
+                best_key = key
+                best = candidate
+
+        aligned.append({
+            "sequence": sequence,
+            "speaker": speaker,
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "text": text,
+            "emotion": best.get("emotion") if best else None,
+            "category": best.get("category") if best else None,
+        })
+    return aligned
+
+
+def build_match_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query: every word must match, ``word*`` is a
+    prefix search. Anything that is not a word is dropped, so user input can
+    never produce an FTS syntax error.
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text or ""):
+        prefix = token.endswith("*")
+        word = token.rstrip("*").replace('"', "")
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    Full-text index over call transcripts in the call store database.
+
+    Transcript text, speaker and aligned emotion are FTS5 columns; time
+    offsets and category are stored alongside for filtering. Each call's rows
+    are replaced as a unit whenever its analysis completes.
+    """
+
+    def __init__(self, store: CallStore):
+        self.store = store
+        self._initialize()
+
+    def _initialize(self) -> None:
+        with self.store.transaction() as txn:
+            txn.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search USING fts5("
+                "text, speaker, emotion, "
+                "category UNINDEXED, call_id UNINDEXED, sequence UNINDEXED, "
+                "start UNINDEXED, end UNINDEXED, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            txn.connection.execute(
+                "CREATE TABLE IF NOT EXISTS transcript_search_rows ("
+                "call_id TEXT NOT NULL, row_id INTEGER NOT NULL, PRIMARY KEY (call_id, row_id))"
+            )
+
+    @staticmethod
+    def _replace(txn: CallStoreTransaction, call_id: str, segments: List[Dict[str, Any]]) -> None:
+        connection = txn.connection
+        connection.execute(
+            "DELETE FROM transcript_search WHERE rowid IN "
+            "(SELECT row_id FROM transcript_search_rows WHERE call_id = ?)",
+            (call_id,),
+        )
+        connection.execute("DELETE FROM transcript_search_rows WHERE call_id = ?", (call_id,))
+        for segment in segments:
+            cursor = connection.execute(
+                "INSERT INTO transcript_search "
+                "(text, speaker, emotion, category, call_id, sequence, start, end) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    segment["text"],
+                    segment["speaker"],
+                    segment.get("emotion") or "",
+                    segment.get("category") or "",
+                    call_id,
+                    segment["sequence"],
+                    segment["start"],
+                    segment["end"],
+                ),
+            )
+            connection.execute(
+                "INSERT INTO transcript_search_rows (call_id, row_id) VALUES (?, ?)",
+                (call_id, cursor.lastrowid),
+            )
+
+    def index_call(self, call_id: str, results: List[Dict[str, Any]]) -> int:
+        segments = align_transcript_emotions(results)
+        with self.store.transaction() as txn:
+            self._replace(txn, call_id, segments)
+        return len(segments)
+
+    def rebuild(self, calls: Iterable[Tuple[str, List[Dict[str, Any]]]]) -> int:
+        count = 0
+        with self.store.transaction() as txn:
+            txn.connection.execute("DELETE FROM transcript_search")
+            txn.connection.execute("DELETE FROM transcript_search_rows")
+            for call_id, results in calls:
+                self._replace(txn, call_id, align_transcript_emotions(results))
+                count += 1
+            txn.connection.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('search_index_built', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (datetime.utcnow().replace(microsecond=0).isoformat() + "Z",),
+            )
+        return count
+
+    def is_built(self) -> bool:
+        with self.store.snapshot() as txn:
+            row = txn.connection.execute(
+                "SELECT 1 FROM store_meta WHERE key = 'search_index_built'"
+            ).fetchone()
+        return row is not None
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        speaker: Optional[str] = None,
+        emotion: Optional[str] = None,
+        category: Optional[str] = None,
+        call_id: Optional[str] = None,
+        min_time: Optional[float] = None,
+        max_time: Optional[float] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Matching transcript segments, best match first; returns (total, page)."""
+        match_terms = []
+        text_query = build_match_query(text) if text else ""
+        if text_query:
+            match_terms.append(f"text : ({text_query})")
+        if speaker:
+            speaker_query = build_match_query(speaker)
+            if speaker_query:
+                match_terms.append(f"speaker : ({speaker_query})")
+        if emotion:
+            words = [token.rstrip("*") for token in _TOKEN_PATTERN.findall(emotion)]
+            if words:
+                # Anchored phrase: "surprise" matches both Surprise variants, "joy" does not match "Enjoyment"
+                match_terms.append('emotion : ^"{}"'.format(" ".join(words).replace('"', "")))
+
+        conditions: List[str] = []
+        params: List[Any] = []
+        if match_terms:
+            conditions.append("transcript_search MATCH ?")
+            params.append(" AND ".join(match_terms))
+        if category:
+            conditions.append("category = ?")
+            params.append(category.strip().lower())
+        if call_id:
+            conditions.append("call_id = ?")
+            params.append(call_id)
+        if min_time is not None:
+            conditions.append("start >= ?")
+            params.append(min_time)
+        if max_time is not None:
+            conditions.append("start <= ?")
+            params.append(max_time)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        if text_query:
+            order = "ORDER BY bm25(transcript_search)"
+            snippet = "snippet(transcript_search, 0, '[', ']', '…', 12)"
+        else:
+            order = "ORDER BY call_id, sequence"
+            snippet = "text"
+
+        with self.store.snapshot() as txn:
+            total = txn.connection.execute(
+                f"SELECT COUNT(*) FROM transcript_search {where}", params
+            ).fetchone()[0]
+            rows = txn.connection.execute(
+                f"SELECT call_id, sequence, speaker, start, end, text, emotion, category, {snippet} "
+                f"FROM transcript_search {where} {order} LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+
+        hits = [
+            {
+                "call_id": row[0],
+                "sequence": row[1],
+                "speaker": row[2],
+                "start": row[3],
+                "end": row[4],
+                "text": row[5],
+                "emotion": row[6] or None,
+                "category": row[7] or None,
+                "snippet": row[8],
+            }
+            for row in rows
+        ]
+        return total, hits
@@ -0,0 +1,208 @@
+import itertools
+import math
+from typing import List, Dict, Any, Optional
+
+from emotion_categories import CATEGORY_BY_LABEL, parse_category
+
+
+# Bump when the stored rollup layout changes so old files are rebuilt.
+TIMELINE_VERSION = 1
+
+# Bucket widths in seconds that are precomputed at analysis time.
+TIMELINE_RESOLUTIONS = (5, 10, 30, 60)
+DEFAULT_TIMELINE_RESOLUTION = 10
+# Narrowest bucket and most buckets an on-the-fly rollup may ask for.
+MIN_TIMELINE_RESOLUTION = 0.5
+MAX_TIMELINE_BUCKETS = 20000
+
+# Trailing window in seconds for the per-speaker rolling valence.
+ROLLING_VALENCE_WINDOW = 30.0
+
+_CATEGORY_LABELS = ("positive", "neutral", "negative")
+
+
+def collect_timeline_segments(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Time-ordered prosody segments with speaker, primary category and emotion."""
+    timeline_segments: List[Dict[str, Any]] = []
+
+    for result in results:
+        prosody_segments = result.get("prosody", []) or []
+        metadata = result.get("metadata", {}) or {}
+        for segment in prosody_segments:
+            time_start = segment.get("time_start")
+            time_end = segment.get("time_end", time_start)
+            if time_start is None or time_end is None:
+                continue
+            try:
+                start_val = float(time_start)
+                end_val = float(time_end)
+            except (TypeError, ValueError):
+                continue
+
+            speaker = segment.get("speaker") or metadata.get("speaker") or "Unknown"
+            top_emotions = segment.get("top_emotions") or []
+            primary_category = segment.get("primary_category")
+            if not primary_category and top_emotions:
+                primary_category = top_emotions[0].get("category")
+
+            timeline_segments.append({
+                "start": round(start_val, 2),
+                "end": round(end_val, 2),
+                "speaker": speaker,
+                "category": parse_category(primary_category).label,
+                "emotion": (top_emotions[0].get("name") if top_emotions else None),
+                "text": (segment.get("text") or segment.get("transcript_text") or "").strip(),
+            })
+
+    timeline_segments.sort(key=lambda item: item.get("start", 0.0))
+    return timeline_segments
+
+
+def find_emotion_shifts(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Points where a speaker's primary emotion changes from their previous segment."""
+    shifts = []
+    previous: Dict[str, Dict[str, Any]] = {}
+    for segment in segments:
+        emotion = segment.get("emotion")
+        if not emotion:
+            continue
+        speaker = segment["speaker"]
+        last = previous.get(speaker)
+        if last is not None and last["emotion"] != emotion:
+            shifts.append({
+                "time": segment["start"],
+                "speaker": speaker,
+                "from_emotion": last["emotion"],
+                "to_emotion": emotion,
+                "from_category": last["category"],
+                "to_category": segment["category"],
+                "text": segment.get("text") or "",
+            })
+        previous[speaker] = segment
+    return shifts
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {label: 0 for label in _CATEGORY_LABELS}
+
+
+def bucket_rollup(
+    segments: List[Dict[str, Any]],
+    resolution: float,
+    duration: Optional[float] = None,
+    rolling_window: float = ROLLING_VALENCE_WINDOW,
+) -> List[Dict[str, Any]]:
+    """
+    Fixed-width buckets of category counts and per-speaker valence.
+
+    A segment is counted in the bucket its start falls in. Valence (+1
+    positive, 0 neutral, -1 negative) is averaged over the time each
+    segment overlaps the bucket; ``rolling_valence`` averages the same
+    quantity over the trailing ``rolling_window`` seconds.
+    """
+    if resolution <= 0:
+        raise ValueError("resolution must be positive")
+    if duration is None:
+        duration = max((segment["end"] for segment in segments), default=0.0)
+    bucket_count = max(int(math.ceil(duration / resolution)), 1) if segments else 0
+    if bucket_count > MAX_TIMELINE_BUCKETS:
+        raise ValueError(f"resolution {resolution}s gives {bucket_count} buckets; at most {MAX_TIMELINE_BUCKETS} are allowed")
+    window_buckets = max(int(math.ceil(rolling_window / resolution)), 1)
+
+    speakers = sorted({segment["speaker"] for segment in segments})
+    counts = [_empty_counts() for _ in range(bucket_count)]
+    speaker_counts = {speaker: [_empty_counts() for _ in range(bucket_count)] for speaker in speakers}
+    # Per speaker and bucket: sum of valence * overlap seconds, and total overlap seconds
+    weighted = {speaker: [0.0] * bucket_count for speaker in speakers}
+    covered = {speaker: [0.0] * bucket_count for speaker in speakers}
+
+    for segment in segments:
+        start, end = segment["start"], max(segment["end"], segment["start"])
+        category = segment["category"]
+        speaker = segment["speaker"]
+        index = min(int(start // resolution), bucket_count - 1)
+        counts[index][category] += 1
+        speaker_counts[speaker][index][category] += 1
+
+        valence = int(CATEGORY_BY_LABEL[category])
+        first = min(int(start // resolution), bucket_count - 1)
+        last = min(int(end // resolution), bucket_count - 1)
+        for bucket in range(first, last + 1):
+            overlap = min(end, (bucket + 1) * resolution) - max(start, bucket * resolution)
+            if overlap > 0:
+                weighted[speaker][bucket] += valence * overlap
+                covered[speaker][bucket] += overlap
+
+    # Prefix sums, so each trailing window is two lookups instead of a re-sum
+    weighted_prefix = {speaker: [0.0, *itertools.accumulate(weighted[speaker])] for speaker in speakers}
+    covered_prefix = {speaker: [0.0, *itertools.accumulate(covered[speaker])] for speaker in speakers}
+
+    buckets = []
+    for index in range(bucket_count):
+        speaker_rollups = {}
+        window_start = max(index - window_buckets + 1, 0)
+        for speaker in speakers:
+            seconds = covered[speaker][index]
+            window_seconds = covered_prefix[speaker][index + 1] - covered_prefix[speaker][window_start]
+            window_weighted = weighted_prefix[speaker][index + 1] - weighted_prefix[speaker][window_start]
+            speaker_rollups[speaker] = {
+                "counts": speaker_counts[speaker][index],
+                "valence": round(weighted[speaker][index] / seconds, 4) if seconds else None,
+                "rolling_valence": (
+                    round(window_weighted / window_seconds, 4)
+                    if window_seconds > 1e-9 else None
+                ),
+            }
+        buckets.append({
+            "start": round(index * resolution, 2),
+            "end": round(min((index + 1) * resolution, max(duration, resolution)), 2),
+            "counts": counts[index],
+            "speakers": speaker_rollups,
+        })
+    return buckets
+
+
+def _timeline_source(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # The merged result already carries per-channel speakers; fall back to every file otherwise
+    combined = [result for result in results if "_combined" in (result.get("filename") or "").lower()]
+    return combined[:1] or results
+
+
+def call_timeline_segments(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Timeline segments for a whole call, taken from the merged result when there is one."""
+    return collect_timeline_segments(_timeline_source(results))
+
+
+def build_timeline(call_id: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """All timeline rollups for one analysed call, ready to be stored."""
+    segments = call_timeline_segments(results)
+    duration = max((segment["end"] for segment in segments), default=0.0)
+    return {
+        "version": TIMELINE_VERSION,
+        "call_id": call_id,
+        "duration": duration,
+        "speakers": sorted({segment["speaker"] for segment in segments}),
+        "segments": segments,
+        "shifts": find_emotion_shifts(segments),
+        "rollups": {
+            str(resolution): bucket_rollup(segments, resolution, duration)
+            for resolution in TIMELINE_RESOLUTIONS
+        },
+    }
+
+
+def timeline_view(timeline: Dict[str, Any], resolution: float) -> Dict[str, Any]:
+    """The stored timeline at one resolution, computing non-precomputed widths on the fly."""
+    key = str(int(resolution)) if float(resolution).is_integer() else str(resolution)
+    buckets = timeline.get("rollups", {}).get(key)
+    if buckets is None:
+        buckets = bucket_rollup(timeline.get("segments") or [], resolution, timeline.get("duration"))
+    return {
+        "call_id": timeline.get("call_id"),
+        "duration": timeline.get("duration"),
+        "speakers": timeline.get("speakers") or [],
+        "resolution": resolution,
+        "precomputed": key in timeline.get("rollups", {}),
+        "buckets": buckets,
+        "shifts": timeline.get("shifts") or [],
+    }
@@ -0,0 +1,184 @@
+import importlib.util
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+try:
+    from opentelemetry import context as otel_context, propagate, trace
+    from opentelemetry.trace import Link, SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover - optional dependency
+    trace = None  # type: ignore
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+except ImportError:  # pragma: no cover - optional dependency
+    TracerProvider = None  # type: ignore
+
+try:
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter  # type: ignore
+    except ImportError:
+        OTLPSpanExporter = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# "otlp" sends spans to OTEL_EXPORTER_OTLP_ENDPOINT (a local collector by
+# default), "file" appends them as JSON lines to TRACING_FILE; unset disables tracing.
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "").strip().lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "hume-emotion-api")
+
+_KINDS = {
+    "internal": "INTERNAL",
+    "server": "SERVER",
+    "client": "CLIENT",
+    "consumer": "CONSUMER",
+}
+
+_ENABLED = False
+_CONFIGURE_LOCK = threading.Lock()
+
+
+def configure_tracing() -> bool:
+    """
+    Install the tracer provider and exporter chosen by ``TRACING_EXPORTER``.
+
+    Needs ``opentelemetry-sdk`` (and an OTLP exporter package for ``otlp``);
+    without them, or with no exporter configured, every helper here is a no-op.
+    """
+    global _ENABLED
+    with _CONFIGURE_LOCK:
+        if _ENABLED or not TRACING_EXPORTER:
+            return _ENABLED
+        if trace is None or TracerProvider is None:
+            logger.warning("TRACING_EXPORTER=%s but opentelemetry-sdk is not installed; tracing disabled", TRACING_EXPORTER)
+            return False
+        if TRACING_EXPORTER == "otlp":
+            if OTLPSpanExporter is None:
+                logger.warning("TRACING_EXPORTER=otlp needs opentelemetry-exporter-otlp; tracing disabled")
+                return False
+            exporter = OTLPSpanExporter()
+        elif TRACING_EXPORTER == "file":
+            trace_file = open(TRACING_FILE, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+            exporter = ConsoleSpanExporter(
+                out=trace_file,
+                formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n",
+            )
+        else:
+            logger.warning("Unknown TRACING_EXPORTER %r; tracing disabled", TRACING_EXPORTER)
+            return False
+
+        provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _ENABLED = True
+        logger.info("Tracing enabled with the %s exporter", TRACING_EXPORTER)
+        return True
+
+
+def tracing_enabled() -> bool:
+    return _ENABLED
+
+
+def framework_traces_requests() -> bool:
+    """Newer FastAPI releases open their own server span per request when OpenTelemetry is present."""
+    return importlib.util.find_spec("fastapi.telemetry") is not None
+
+
+def shutdown_tracing() -> None:
+    """Flush buffered spans; called on server shutdown."""
+    if not _ENABLED:
+        return
+    shutdown = getattr(trace.get_tracer_provider(), "shutdown", None)
+    if callable(shutdown):
+        shutdown()
+
+
+def _span_context(carrier: Optional[Dict[str, str]]) -> Any:
+    if not carrier:
+        return None
+    return trace.get_current_span(propagate.extract(carrier)).get_span_context()
+
+
+@contextmanager
+def start_span(
+    name: str,
+    kind: str = "internal",
+    attributes: Optional[Dict[str, Any]] = None,
+    carrier: Optional[Dict[str, str]] = None,
+    links: Optional[List[Dict[str, str]]] = None,
+) -> Iterator[Any]:
+    """
+    Run the block in a new span (yields None when tracing is off).
+
+    ``carrier`` makes the span a child of a propagated context (W3C
+    ``traceparent`` headers or ``inject_context()`` output); ``links``
+    relates it to several such contexts, e.g. a batch of webhook events.
+    Exceptions are recorded on the span and re-raised.
+    """
+    if not _ENABLED:
+        yield None
+        return
+    parent = None
+    if carrier:
+        parent = propagate.extract(carrier)
+        if not trace.get_current_span(parent).get_span_context().is_valid:
+            # Nothing propagated; stay under whatever span is current
+            parent = None
+    span_links = []
+    for link_carrier in links or []:
+        span_context = _span_context(link_carrier)
+        if span_context is not None and span_context.is_valid:
+            span_links.append(Link(span_context))
+    tracer = trace.get_tracer("hume_emotion_api")
+    with tracer.start_as_current_span(
+        name,
+        context=parent,
+        kind=getattr(SpanKind, _KINDS.get(kind, "INTERNAL")),
+        attributes={key: value for key, value in (attributes or {}).items() if value is not None},
+        links=span_links,
+    ) as span:
+        yield span
+
+
+def set_span_attributes(span: Any, attributes: Dict[str, Any]) -> None:
+    if span is None:
+        return
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def mark_span_error(span: Any, description: str) -> None:
+    if span is not None:
+        span.set_status(Status(StatusCode.ERROR, description))
+
+
+def inject_context() -> Dict[str, str]:
+    """The current trace context as a carrier dict, to hand across a thread or queue boundary."""
+    if not _ENABLED:
+        return {}
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+@contextmanager
+def attached_context(carrier: Optional[Dict[str, str]]) -> Iterator[None]:
+    """Make a propagated context current for the block."""
+    if not _ENABLED or not carrier:
+        yield
+        return
+    token = otel_context.attach(propagate.extract(carrier))
+    try:
+        yield
+    finally:
+        otel_context.detach(token)
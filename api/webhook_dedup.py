@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from call_store import CallStore, CallStoreTransaction
+
+
+# Number of (call_id, payload hash) pairs remembered for duplicate detection.
+WEBHOOK_DEDUP_CAPACITY = int(os.getenv("RETELL_WEBHOOK_DEDUP_CAPACITY", "10000"))
+
+
+def payload_fingerprint(call_data: Dict[str, Any]) -> str:
+    """Stable content hash of a normalized webhook payload."""
+    canonical = json.dumps(call_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RecentEventIndex:
+    """
+    Bounded index of recently processed webhook events.
+
+    Lookups hit a per-process LRU first and fall back to the shared store, so
+    a redelivery is recognised even when it lands on a different worker.
+    With the webhook log the store row is written by the compactor along
+    with the event itself (``record``), so until then only the worker that
+    took the event knows it; a redelivery to another worker in that window
+    is logged again and folded idempotently.
+    """
+
+    def __init__(self, store: CallStore, capacity: int = WEBHOOK_DEDUP_CAPACITY):
+        self.store = store
+        self.capacity = max(capacity, 1)
+        self._recent: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember_locally(self, call_id: str, fingerprint: str) -> None:
+        key = (call_id, fingerprint)
+        with self._lock:
+            self._recent[key] = None
+            self._recent.move_to_end(key)
+            while len(self._recent) > self.capacity:
+                self._recent.popitem(last=False)
+
+    def seen(self, call_id: str, fingerprint: str) -> bool:
+        key = (call_id, fingerprint)
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return True
+
+        with self.store.snapshot() as txn:
+            found = txn.has_webhook_event(call_id, fingerprint)
+        if found:
+            self.remember_locally(call_id, fingerprint)
+        return found
+
+    def record(self, txn: CallStoreTransaction, call_id: str, fingerprint: str, received_at: Optional[str] = None) -> None:
+        """Store a processed event inside a caller's write transaction."""
+        if received_at is None:
+            received_at = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+        txn.add_webhook_event(call_id, fingerprint, received_at, self.capacity)
+
+    def remember(self, call_id: str, fingerprint: str) -> None:
+        with self.store.transaction() as txn:
+            self.record(txn, call_id, fingerprint)
+        self.remember_locally(call_id, fingerprint)
@@ -0,0 +1,326 @@
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional, List, Callable
+
+
+logger = logging.getLogger(__name__)
+
+# Longest time the writer waits for more events before committing a batch.
+WEBHOOK_LOG_COMMIT_WINDOW_MS = float(os.getenv("RETELL_WEBHOOK_LOG_COMMIT_WINDOW_MS", "5"))
+WEBHOOK_LOG_MAX_BATCH = int(os.getenv("RETELL_WEBHOOK_LOG_MAX_BATCH", "256"))
+# Seconds between compactor passes that fold sealed segments into the call store.
+WEBHOOK_LOG_COMPACT_INTERVAL = float(os.getenv("RETELL_WEBHOOK_LOG_COMPACT_INTERVAL", "1.0"))
+
+_SEGMENT_PREFIX = "wal-"
+_SEGMENT_SUFFIX = ".log"
+
+
+class _PendingAppend:
+    __slots__ = ("line", "done", "error")
+
+    def __init__(self, line: bytes):
+        self.line = line
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+def _pid_is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WebhookLog:
+    """
+    Append-only write-ahead log for incoming webhook events.
+
+    ``append`` returns once the event is durable on disk. Concurrent appends
+    are group-committed: the writer thread gathers every event that arrives
+    within the commit window and issues a single ``fsync`` for the batch.
+
+    Each process writes its own segment files. A compactor thread periodically
+    seals the active segment and hands the records to ``apply_batch`` (which
+    folds them into the call store). ``apply_batch`` returns the records it
+    could not store, or raises; a segment is only deleted once every record in
+    it is stored, otherwise it is cut down to the failed records and retried
+    on the next pass. Segments left behind by a crashed process are replayed
+    too, so ``apply_batch`` must be idempotent.
+    """
+
+    def __init__(
+        self,
+        log_dir: str,
+        apply_batch: Callable[[List[Dict[str, Any]]], Optional[List[Dict[str, Any]]]],
+        commit_window_ms: float = WEBHOOK_LOG_COMMIT_WINDOW_MS,
+        max_batch: int = WEBHOOK_LOG_MAX_BATCH,
+        compact_interval: float = WEBHOOK_LOG_COMPACT_INTERVAL,
+    ):
+        self.log_dir = log_dir
+        self.apply_batch = apply_batch
+        self.commit_window = max(commit_window_ms, 0.0) / 1000.0
+        self.max_batch = max(max_batch, 1)
+        self.compact_interval = compact_interval
+
+        self._token = uuid.uuid4().hex[:8]
+        self._pid = os.getpid()
+        self._sequence = 0
+        self._queue: "queue.Queue[Optional[_PendingAppend]]" = queue.Queue()
+        self._segment_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._segment_file = None
+        self._segment_path: Optional[str] = None
+        self._segment_bytes = 0
+        self._sealed_segments: List[str] = []
+        self._stop_event = threading.Event()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._compactor_thread: Optional[threading.Thread] = None
+
+        os.makedirs(log_dir, exist_ok=True)
+
+    @property
+    def running(self) -> bool:
+        return self._writer_thread is not None and self._writer_thread.is_alive()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.running:
+                return
+            # Forked workers inherit the parent's object; give them their own segments
+            if os.getpid() != self._pid:
+                self._pid = os.getpid()
+                self._token = uuid.uuid4().hex[:8]
+                self._segment_file = None
+                self._sealed_segments = []
+            self._stop_event.clear()
+            with self._segment_lock:
+                self._open_segment()
+            self._writer_thread = threading.Thread(
+                target=self._writer_loop, name="webhook-log-writer", daemon=True
+            )
+            self._compactor_thread = threading.Thread(
+                target=self._compactor_loop, name="webhook-log-compactor", daemon=True
+            )
+            self._writer_thread.start()
+            self._compactor_thread.start()
+            logger.info("Webhook log started in %s", self.log_dir)
+
+    def stop(self) -> None:
+        with self._start_lock:
+            if not self.running:
+                return
+            self._queue.put(None)
+            self._writer_thread.join()
+            self._stop_event.set()
+            self._compactor_thread.join()
+            self.compact()
+            with self._segment_lock:
+                if self._segment_file is not None:
+                    self._segment_file.close()
+                    self._segment_file = None
+                if self._segment_path and os.path.exists(self._segment_path) and self._segment_bytes == 0:
+                    os.remove(self._segment_path)
+            logger.info("Webhook log stopped")
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Durably append one event; blocks until its batch has been fsynced."""
+        if not self.running:
+            self.start()
+        pending = _PendingAppend(
+            (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        )
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+
+    def backlog(self) -> Dict[str, int]:
+        """Appends waiting for fsync and sealed segments waiting to be compacted."""
+        return {"pending_appends": self._queue.qsize(), "sealed_segments": len(self._sealed_segments)}
+
+    def _segment_name(self, sequence: int) -> str:
+        return f"{_SEGMENT_PREFIX}{self._pid}-{self._token}-{sequence:06d}{_SEGMENT_SUFFIX}"
+
+    def _open_segment(self) -> None:
+        self._sequence += 1
+        self._segment_path = os.path.join(self.log_dir, self._segment_name(self._sequence))
+        self._segment_file = open(self._segment_path, "ab")
+        self._segment_bytes = 0
+        # Make the new directory entry durable before acknowledging writes into it
+        dir_fd = os.open(self.log_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _seal_segment(self) -> None:
+        """Close the active segment if it holds records and start a new one."""
+        with self._segment_lock:
+            if self._segment_file is None or self._segment_bytes == 0:
+                return
+            self._segment_file.close()
+            self._sealed_segments.append(self._segment_path)
+            self._open_segment()
+
+    def _writer_loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.commit_window
+            stop_after_batch = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop_after_batch = True
+                    break
+                batch.append(item)
+
+            error: Optional[BaseException] = None
+            try:
+                with self._segment_lock:
+                    data = b"".join(item.line for item in batch)
+                    self._segment_file.write(data)
+                    self._segment_file.flush()
+                    os.fsync(self._segment_file.fileno())
+                    self._segment_bytes += len(data)
+            except BaseException as exc:  # pylint: disable=broad-except
+                logger.error("Failed to commit %d webhook events: %s", len(batch), exc)
+                error = exc
+
+            for item in batch:
+                item.error = error
+                item.done.set()
+
+            if stop_after_batch:
+                return
+
+    def _compactor_loop(self) -> None:
+        while not self._stop_event.wait(self.compact_interval):
+            try:
+                self.compact()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("Webhook log compaction failed: %s", exc)
+
+    def _orphaned_segments(self) -> List[str]:
+        orphaned = []
+        own_marker = f"-{self._token}-"
+        for name in sorted(os.listdir(self.log_dir)):
+            if not (name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)):
+                continue
+            if own_marker in name:
+                continue
+            try:
+                pid = int(name[len(_SEGMENT_PREFIX):].split("-", 1)[0])
+            except ValueError:
+                continue
+            # A live pid that matches ours belongs to a previous incarnation of this process
+            if pid != self._pid and _pid_is_alive(pid):
+                continue
+            orphaned.append(os.path.join(self.log_dir, name))
+        return orphaned
+
+    @staticmethod
+    def _read_segment(path: str) -> List[Dict[str, Any]]:
+        records = []
+        with open(path, "rb") as file:
+            for raw_line in file:
+                if not raw_line.endswith(b"\n"):
+                    # Torn write from a crash before fsync; the sender was never acknowledged
+                    break
+                try:
+                    record = json.loads(raw_line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupt webhook log record in %s", path)
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+        return records
+
+    def _rewrite_segment(self, path: str, records: List[Dict[str, Any]]) -> None:
+        """Atomically replace a segment with just ``records``."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            for record in records:
+                file.write((json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        dir_fd = os.open(self.log_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _fold_segment(self, path: str, claim: bool) -> bool:
+        """Fold one segment; returns False if it is still (partly) on disk afterwards."""
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return True
+        try:
+            if claim:
+                try:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+                if not os.path.exists(path):
+                    return True
+            records = self._read_segment(path)
+            failed: Optional[List[Dict[str, Any]]] = None
+            if records:
+                try:
+                    failed = self.apply_batch(records)
+                except Exception as exc:  # pylint: disable=broad-except
+                    logger.error("Failed to fold %s, keeping it for the next pass: %s", os.path.basename(path), exc)
+                    return False
+            if failed:
+                # Acknowledged events are never dropped; only the stored ones leave the log
+                self._rewrite_segment(path, failed)
+                logger.warning(
+                    "Kept %d of %d webhook events in %s for the next pass",
+                    len(failed), len(records), os.path.basename(path),
+                )
+                return False
+            os.remove(path)
+            logger.info("Compacted %d webhook events from %s", len(records), os.path.basename(path))
+            return True
+        finally:
+            file.close()
+
+    def compact(self) -> int:
+        """Fold every sealed segment into the store; returns the number of segments folded."""
+        with self._compact_lock:
+            self._seal_segment()
+            folded = 0
+
+            for path in self._orphaned_segments():
+                if self._fold_segment(path, claim=True):
+                    folded += 1
+
+            while self._sealed_segments:
+                path = self._sealed_segments[0]
+                if not self._fold_segment(path, claim=False):
+                    # Later segments may hold newer events for the same calls; keep them in order
+                    break
+                self._sealed_segments.pop(0)
+                folded += 1
+
+            return folded
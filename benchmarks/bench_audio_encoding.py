@@ -0,0 +1,233 @@
+"""
+Upload size, Hume turnaround and emotion equivalence of resampled/FLAC audio.
+
+Both channels of the recorded calls in api/retell_results/audio are sent to
+Hume once per variant: the recorded WAV as the baseline, then every
+combination of ``--rates`` and ``--formats`` produced the way
+``HUME_AUDIO_SAMPLE_RATE`` and ``HUME_AUDIO_FORMAT`` produce them in the
+pipeline. For each variant the report gives the bytes uploaded, encode
+time, submit (upload) time and submit-to-predictions turnaround, and how
+closely its prosody predictions match the baseline's: share of segments
+with the same top emotion and the same category, and the mean absolute
+score difference over all emotions.
+
+By default the jobs go to fake_hume.py, which replays recorded predictions
+whatever the audio sounds like, so only the byte counts and upload times
+mean anything there. ``--live`` uses the Hume API configured through
+``HUME_API_KEY`` (and ``HUME_API_BASE_URL``), which is what the
+equivalence check is for.
+
+    python benchmarks/bench_audio_encoding.py --rates 16000,8000 --formats wav,flac
+    HUME_API_KEY=... python benchmarks/bench_audio_encoding.py --live --calls 5 --output audio.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(BENCH_DIR, "..", "api")
+sys.path.insert(0, API_DIR)
+
+from bench_pipeline import add_fake_arguments, compare, git_commit, rounded, start_fakes, stop_fakes, summarize  # noqa: E402
+
+# Segments of a prosody model: (begin, end, emotion name -> score)
+Segment = Tuple[float, float, Dict[str, float]]
+
+
+def channel_files(results_dir: str, calls: int) -> List[List[Tuple[str, bytes]]]:
+    """Both channel files of each recorded call, user first."""
+    calls_files = []
+    for user_path in sorted(glob.glob(os.path.join(results_dir, "audio", "*_user.wav"))):
+        agent_path = user_path[: -len("_user.wav")] + "_agent.wav"
+        if not os.path.exists(agent_path):
+            continue
+        files = []
+        for path in (user_path, agent_path):
+            with open(path, "rb") as file:
+                files.append((os.path.basename(path), file.read()))
+        calls_files.append(files)
+        if calls and len(calls_files) >= calls:
+            break
+    return calls_files
+
+
+def encode_variant(files: List[Tuple[str, bytes]], rate: int, audio_format: str) -> Tuple[List[Tuple[str, bytes]], float]:
+    from audio_encoding import encode_uploads, resample_files
+
+    start = time.perf_counter()
+    uploads = resample_files(files, rate)
+    uploads, _ = encode_uploads(uploads, audio_format)
+    return uploads, time.perf_counter() - start
+
+
+def analyse(uploads: List[Tuple[str, bytes]], client: Any) -> Tuple[List[Dict[str, Any]], float, float]:
+    """Run one Hume job; returns predictions, submit seconds and submit-to-predictions seconds."""
+    from extractor import get_predictions, prepare_audio_files, submit_hume_job, wait_for_job_completion
+
+    start = time.perf_counter()
+    job_id = submit_hume_job(prepare_audio_files(uploads), client)
+    submitted = time.perf_counter()
+    wait_for_job_completion(job_id, client)
+    predictions = get_predictions(job_id, client)
+    return predictions, submitted - start, time.perf_counter() - start
+
+
+def prosody_segments(predictions: List[Dict[str, Any]]) -> Dict[str, List[Segment]]:
+    """Prosody segments per channel, keyed by file name without its extension."""
+    channels: Dict[str, List[Segment]] = {}
+    for item in predictions:
+        stem = os.path.splitext((item.get("source") or {}).get("filename") or "")[0]
+        segments = channels.setdefault(stem, [])
+        for prediction in (item.get("results") or {}).get("predictions") or []:
+            prosody = (prediction.get("models") or {}).get("prosody") or {}
+            for group in prosody.get("grouped_predictions") or []:
+                for segment in group.get("predictions") or []:
+                    time_info = segment.get("time") or {}
+                    scores = {emotion["name"]: emotion["score"] for emotion in segment.get("emotions") or []}
+                    if scores:
+                        segments.append((time_info.get("begin") or 0.0, time_info.get("end") or 0.0, scores))
+    return channels
+
+
+def _best_match(segment: Segment, candidates: List[Segment]) -> Optional[Segment]:
+    best, best_overlap = None, 0.0
+    for candidate in candidates:
+        overlap = min(segment[1], candidate[1]) - max(segment[0], candidate[0])
+        if overlap > best_overlap:
+            best, best_overlap = candidate, overlap
+    return best
+
+
+def equivalence(baseline: Dict[str, List[Segment]], candidate: Dict[str, List[Segment]]) -> Dict[str, Any]:
+    """How closely a variant's prosody predictions follow the baseline's, segment by time overlap."""
+    from emotion_categories import emotion_category
+
+    matched = same_top = same_category = 0
+    diffs: List[float] = []
+    baseline_segments = candidate_segments = 0
+    for stem, segments in baseline.items():
+        others = candidate.get(stem) or []
+        baseline_segments += len(segments)
+        candidate_segments += len(others)
+        for segment in segments:
+            match = _best_match(segment, others)
+            if match is None:
+                continue
+            matched += 1
+            top = max(segment[2], key=segment[2].get)
+            other_top = max(match[2], key=match[2].get)
+            same_top += top == other_top
+            same_category += emotion_category(top).label == emotion_category(other_top).label
+            names = set(segment[2]) | set(match[2])
+            diffs.append(statistics.fmean(abs(segment[2].get(name, 0.0) - match[2].get(name, 0.0)) for name in names))
+    return {
+        "baseline_segments": baseline_segments,
+        "segments": candidate_segments,
+        "matched_segments": matched,
+        "top_emotion_agreement": rounded(same_top / matched if matched else None),
+        "category_agreement": rounded(same_category / matched if matched else None),
+        "mean_abs_score_diff": rounded(statistics.fmean(diffs) if diffs else None, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results-dir", default=os.path.join(API_DIR, "retell_results"))
+    parser.add_argument("--calls", type=int, default=10, help="use only the first N recorded calls (0 = all)")
+    parser.add_argument("--rates", default="16000,8000", help="comma separated sample rates to try")
+    parser.add_argument("--formats", default="wav,flac", help="comma separated upload formats to try")
+    parser.add_argument("--live", action="store_true", help="use the configured Hume API instead of fake_hume.py")
+    add_fake_arguments(parser)
+    parser.add_argument("--output", help="write the report to this file as well as stdout")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args()
+    args.results_dir = os.path.abspath(args.results_dir)
+
+    fakes: Dict[str, Any] = {}
+    if not args.live:
+        fakes = start_fakes(args)
+        os.environ.update(HUME_API_KEY="test", HUME_API_BASE_URL=fakes["hume"][1])
+        os.environ["HUME_POLL_INTERVAL"] = str(args.hume_poll_interval)
+    if not args.keep_rate_limits:
+        os.environ["HUME_RATE_LIMIT"] = "0"
+
+    from audio_encoding import soundfile
+    from extractor import get_hume_client
+
+    formats = [value.strip() for value in args.formats.split(",") if value.strip()]
+    if "flac" in formats and soundfile is None:
+        parser.error("--formats flac needs the soundfile package")
+    variants = [("wav@recorded", 0, "wav")] + [
+        (f"{audio_format}@{rate or 'recorded'}", rate, audio_format)
+        for rate in [int(value) for value in args.rates.split(",") if value.strip()] + [0]
+        for audio_format in formats
+        if (rate, audio_format) != (0, "wav")
+    ]
+
+    calls = channel_files(args.results_dir, args.calls)
+    client = get_hume_client()
+    results: Dict[str, Any] = {}
+    try:
+        for label, rate, audio_format in variants:
+            upload_bytes = 0
+            encode_seconds: List[float] = []
+            submit_seconds: List[float] = []
+            turnaround_seconds: List[float] = []
+            channels: Dict[str, List[Segment]] = {}
+            for index, files in enumerate(calls):
+                uploads, encode_time = encode_variant(files, rate, audio_format)
+                predictions, submit_time, turnaround = analyse(uploads, client)
+                upload_bytes += sum(len(content) for _, content in uploads)
+                encode_seconds.append(encode_time)
+                submit_seconds.append(submit_time)
+                turnaround_seconds.append(turnaround)
+                for stem, channel_segments in prosody_segments(predictions).items():
+                    channels[f"{index}:{stem}"] = channel_segments
+            results[label] = {
+                "upload_bytes": upload_bytes,
+                "encode_seconds": summarize(encode_seconds),
+                "submit_seconds": summarize(submit_seconds),
+                "turnaround_seconds": summarize(turnaround_seconds),
+                "_segments": channels,
+            }
+    finally:
+        stop_fakes(fakes)
+
+    baseline = results["wav@recorded"]
+    for variant in results.values():
+        variant["bytes_vs_recorded"] = rounded(variant["upload_bytes"] / baseline["upload_bytes"] if baseline["upload_bytes"] else None)
+    for variant in results.values():
+        variant["equivalence"] = equivalence(baseline["_segments"], variant["_segments"])
+    for variant in results.values():
+        del variant["_segments"]
+
+    report = {
+        "environment": {
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in {"output", "baseline"}},
+        "calls": len(calls),
+        "variants": results,
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            report["change_vs_baseline"] = compare(report, json.load(file))
+
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(rendered + "\n")
+    print(rendered)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Micro-benchmark for extract_top_emotions.
+
+Hume prediction payloads are rebuilt from the analyses stored in
+api/retell_results: segment timings, text and the recorded top emotion and
+score are real, the remaining scores of each 48-emotion distribution are
+filled in deterministically below the recorded top score.
+
+    python benchmarks/bench_extraction.py --top-n 1 --repeat 20
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+from typing import List, Dict, Any
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+sys.path.insert(0, API_DIR)
+
+from emotion_categories import EMOTION_CATEGORIES, EMOTION_NAMES, DEFAULT_EMOTION_CATEGORY  # noqa: E402
+from prediction_engine import extract_top_emotions_batched  # noqa: E402
+
+HUME_EMOTION_NAMES = list(EMOTION_NAMES)
+
+
+def build_prediction_payloads(results_dir: str, seed: int = 7) -> List[List[Dict[str, Any]]]:
+    """Rebuild one Hume predictions payload per stored call analysis."""
+    rng = random.Random(seed)
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(results_dir, "call_*.json"))):
+        with open(path, "r", encoding="utf-8") as file:
+            stored = json.load(file)
+        predictions = []
+        for result in stored.get("analysis") or []:
+            filename = result.get("filename") or ""
+            if filename.endswith("_combined"):
+                continue
+            models: Dict[str, Any] = {}
+            for source in ("prosody", "burst"):
+                items = []
+                for segment in result.get(source) or []:
+                    top = (segment.get("top_emotions") or [{}])[0]
+                    top_name = top.get("name") or "Calmness"
+                    top_score = float(top.get("score") or 0.5)
+                    emotions = [
+                        {"name": name, "score": top_score if name == top_name else top_score * rng.uniform(0.05, 0.95)}
+                        for name in HUME_EMOTION_NAMES
+                    ]
+                    item = {
+                        "time": {"begin": segment.get("time_start", 0), "end": segment.get("time_end", 0)},
+                        "emotions": emotions,
+                    }
+                    if source == "prosody":
+                        item["text"] = segment.get("text") or ""
+                    items.append(item)
+                models[source] = {"grouped_predictions": [{"id": "unknown", "predictions": items}]}
+            predictions.append({
+                "source": {"filename": filename},
+                "results": {"predictions": [{"models": models}]},
+            })
+        if predictions:
+            payloads.append(predictions)
+    return payloads
+
+
+def legacy_extract_top_emotions(predictions_data: List[Dict[str, Any]], top_n: int = 1) -> List[Dict[str, Any]]:
+    """The per-segment sort-and-enrich loop extract_top_emotions used before the batched engine."""
+    results = []
+    for item in predictions_data:
+        if not isinstance(item, dict) or "results" not in item:
+            continue
+        preds = item.get("results", {}).get("predictions", [])
+        if not preds:
+            continue
+        file_result = {
+            "filename": item.get("source", {}).get("filename", "unknown"),
+            "prosody": [],
+            "burst": [],
+            "metadata": {},
+        }
+        category_counts = {"positive": 0, "neutral": 0, "negative": 0}
+        for pred in preds:
+            if not isinstance(pred, dict) or "models" not in pred:
+                continue
+            models = pred["models"]
+            for source in ("prosody", "burst"):
+                if source not in models or models[source] is None:
+                    continue
+                for group in models[source].get("grouped_predictions", []):
+                    for pred_item in group.get("predictions", []):
+                        time_info = pred_item.get("time", {})
+                        time_start = time_info.get("begin", 0) if isinstance(time_info, dict) else 0
+                        time_end = time_info.get("end", 0) if isinstance(time_info, dict) else 0
+                        emotions = pred_item.get("emotions", [])
+                        if not emotions:
+                            continue
+                        top_emotions = sorted(emotions, key=lambda x: x.get("score", 0), reverse=True)[:top_n]
+                        enriched = []
+                        for emo in top_emotions:
+                            name = emo.get("name", "Unknown")
+                            enriched.append({
+                                "name": name,
+                                "score": round(emo.get("score", 0), 4),
+                                "percentage": round(emo.get("score", 0) * 100, 1),
+                                "category": EMOTION_CATEGORIES.get(name.lower(), DEFAULT_EMOTION_CATEGORY),
+                            })
+                        primary_category = enriched[0]["category"]
+                        category_counts[primary_category] += 1
+                        segment = {"time_start": round(time_start, 2), "time_end": round(time_end, 2)}
+                        if source == "prosody":
+                            segment["text"] = pred_item.get("text", "")
+                        segment.update({
+                            "primary_category": primary_category,
+                            "top_emotions": enriched,
+                            "source": source,
+                        })
+                        file_result[source].append(segment)
+        file_result["metadata"]["category_counts"] = category_counts
+        results.append(file_result)
+    return results
+
+
+def _time(functions: Dict[str, Any], payloads, top_n: int, repeat: int) -> Dict[str, float]:
+    """Best wall time per function; rounds are interleaved so machine noise hits every variant alike."""
+    best = {name: float("inf") for name in functions}
+    for _ in range(repeat):
+        for name, function in functions.items():
+            started = time.perf_counter()
+            for payload in payloads:
+                function(payload, top_n=top_n)
+            best[name] = min(best[name], time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results-dir", default=os.path.join(API_DIR, "retell_results"))
+    parser.add_argument("--top-n", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    payloads = build_prediction_payloads(args.results_dir)
+    segment_count = sum(
+        len(group["predictions"])
+        for payload in payloads
+        for item in payload
+        for pred in item["results"]["predictions"]
+        for model in pred["models"].values()
+        for group in model["grouped_predictions"]
+    )
+
+    for payload in payloads:
+        expected = legacy_extract_top_emotions(payload, top_n=args.top_n)
+        assert extract_top_emotions_batched(payload, top_n=args.top_n) == expected
+        assert extract_top_emotions_batched(payload, top_n=args.top_n, use_numpy=False) == expected
+
+    timings = _time(
+        {
+            "legacy": legacy_extract_top_emotions,
+            "batched_python": lambda payload, top_n: extract_top_emotions_batched(payload, top_n=top_n, use_numpy=False),
+            "batched_numpy": extract_top_emotions_batched,
+        },
+        payloads, args.top_n, args.repeat,
+    )
+
+    report = {
+        "calls": len(payloads),
+        "segments": segment_count,
+        "top_n": args.top_n,
+        "best_of": args.repeat,
+        "seconds": {name: round(value, 6) for name, value in timings.items()},
+        "speedup_vs_legacy": {
+            name: round(timings["legacy"] / value, 2) for name, value in timings.items() if value
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
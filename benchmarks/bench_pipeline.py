@@ -0,0 +1,365 @@
+"""
+End-to-end benchmark of the Retell call pipeline against local fakes.
+
+The recorded calls in api/retell_results (both channels in audio/ plus a
+stored analysis) are replayed through ``_process_retell_call`` with Hume,
+Retell and OpenAI replaced by fake_hume.py, fake_retell.py and
+fake_openai.py on local ports, each with a configurable latency. Every
+concurrency level runs in a fresh worker process on an empty results
+directory (seeded with retell_calls.json only), so caches and peak RSS do
+not carry over between levels. The call store is then timed separately
+against synthetic histories of growing size.
+
+The report is JSON with sorted keys; write one per revision with
+``--output`` and compare against an earlier one with ``--baseline``.
+
+    python benchmarks/bench_pipeline.py --concurrency 1,4,8 --output bench.json
+    python benchmarks/bench_pipeline.py --baseline bench.json --output bench-new.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(BENCH_DIR, "..", "api")
+REPO_DIR = os.path.dirname(os.path.abspath(API_DIR))
+
+from fake_retell import replayable_call_ids  # noqa: E402
+
+FAKES = ("hume", "retell", "openai")
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": rounded(percentile(values, 50)),
+        "p95": rounded(percentile(values, 95)),
+        "p99": rounded(percentile(values, 99)),
+        "max": rounded(max(values) if values else None),
+        "mean": rounded(statistics.fmean(values) if values else None),
+    }
+
+
+def rounded(value: Optional[float], digits: int = 3) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def add_fake_arguments(parser: argparse.ArgumentParser) -> None:
+    """Latency and client options shared by the scripts that run the app against the fakes."""
+    parser.add_argument("--hume-latency-ms", type=float, default=50)
+    parser.add_argument("--hume-job-seconds", type=float, default=1.0)
+    parser.add_argument("--hume-seconds-per-audio-minute", type=float, default=0.0,
+                        help="extra fake Hume job time per minute of the longest file")
+    parser.add_argument("--hume-poll-interval", type=float, default=0.25)
+    parser.add_argument("--retell-latency-ms", type=float, default=30)
+    parser.add_argument("--openai-latency-ms", type=float, default=300)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep the provider rate limiters on")
+
+
+def start_fakes(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the three fake providers; returns name -> (process, base URL)."""
+    latency = {"hume": args.hume_latency_ms, "retell": args.retell_latency_ms, "openai": args.openai_latency_ms}
+    env = dict(
+        os.environ,
+        FAKE_HUME_JOB_SECONDS=str(args.hume_job_seconds),
+        FAKE_HUME_SECONDS_PER_AUDIO_MINUTE=str(args.hume_seconds_per_audio_minute),
+        FAKE_HUME_RESULTS_DIR=args.results_dir,
+        FAKE_RETELL_RESULTS_DIR=args.results_dir,
+    )
+    fakes = {}
+    for name in FAKES:
+        port = free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "--app-dir", BENCH_DIR, f"fake_{name}:app",
+             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            env=dict(env, **{f"FAKE_{name.upper()}_LATENCY_MS": str(latency[name])}),
+        )
+        fakes[name] = (process, f"http://127.0.0.1:{port}")
+    deadline = time.monotonic() + 30
+    for name, (process, base_url) in fakes.items():
+        while True:
+            try:
+                urllib.request.urlopen(f"{base_url}/stats", timeout=1).read()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    stop_fakes(fakes)
+                    raise RuntimeError(f"fake_{name} did not start")
+                time.sleep(0.1)
+    return fakes
+
+
+def stop_fakes(fakes: Dict[str, Any]) -> None:
+    for process, _ in fakes.values():
+        process.terminate()
+    for process, _ in fakes.values():
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def fake_stats(fakes: Dict[str, Any]) -> Dict[str, Any]:
+    stats = {}
+    for name, (_, base_url) in fakes.items():
+        with urllib.request.urlopen(f"{base_url}/stats", timeout=5) as response:
+            stats[name] = json.load(response)
+    return stats
+
+
+def worker_env(args: argparse.Namespace, fakes: Dict[str, Any], workdir: str) -> Dict[str, str]:
+    env = dict(
+        os.environ,
+        RETELL_RESULTS_DIR=workdir,
+        RETELL_WEBHOOK_LOG_ENABLED="false",
+        HUME_API_KEY="bench",
+        HUME_API_BASE_URL=fakes["hume"][1],
+        HUME_POLL_INTERVAL=str(args.hume_poll_interval),
+        RETELL_API_KEY="bench",
+        RETELL_API_BASE_URL=fakes["retell"][1],
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"{fakes['openai'][1]}/v1",
+        TRACING_EXPORTER="",
+    )
+    if not args.keep_rate_limits:
+        # The fakes do not throttle; the client-side limiter would dominate the numbers
+        for name in FAKES:
+            env[f"{name.upper()}_RATE_LIMIT"] = "0"
+    return env
+
+
+def run_level(args: argparse.Namespace, fakes: Dict[str, Any], concurrency: int) -> Dict[str, Any]:
+    """Replay the calls at one concurrency level in a fresh worker process."""
+    workdir = tempfile.mkdtemp(prefix=f"bench_pipeline_c{concurrency}_")
+    try:
+        shutil.copy(os.path.join(args.results_dir, "retell_calls.json"), os.path.join(workdir, "retell_calls.json"))
+        command = [
+            sys.executable, os.path.abspath(__file__), "--worker",
+            "--concurrency", str(concurrency), "--calls", str(args.calls),
+            "--results-dir", args.results_dir, "--recording-base-url", fakes["retell"][1],
+        ]
+        completed = subprocess.run(
+            command, env=worker_env(args, fakes, workdir), cwd=API_DIR,
+            capture_output=True, text=True, check=False,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"worker at concurrency {concurrency} failed:\n{completed.stderr[-4000:]}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def worker(args: argparse.Namespace) -> None:
+    """Runs inside the worker process with the environment pointing at the fakes."""
+    sys.path.insert(0, API_DIR)
+    logging.disable(logging.WARNING)
+    import api_server  # pylint: disable=import-error
+    from metrics import record_timings  # pylint: disable=import-error
+
+    call_ids = replayable_call_ids(args.results_dir)[: args.calls or None]
+    base_url = args.recording_base_url.rstrip("/")
+    rss_before = peak_rss_mb()
+
+    def replay(call_id: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        # The stored timings stop before persisting; an outer run also sees the stages after it
+        with record_timings("retell_call") as timings:
+            try:
+                api_server._process_retell_call({  # pylint: disable=protected-access
+                    "call_id": call_id,
+                    "recording_multi_channel_url": f"{base_url}/recordings/{call_id}.wav",
+                })
+            except Exception as exc:  # pylint: disable=broad-except
+                return {"ok": False, "seconds": time.perf_counter() - started, "error": f"{type(exc).__name__}: {exc}"}
+        return {"ok": True, "seconds": time.perf_counter() - started, "timings": timings.as_dict()}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(replay, call_ids))
+    wall = time.perf_counter() - started
+
+    stage_ms: Dict[str, List[float]] = {}
+    for outcome in outcomes:
+        for span in (outcome.get("timings") or {}).get("spans") or []:
+            stage_ms.setdefault(span["stage"], []).append(span["duration_ms"])
+    succeeded = [outcome for outcome in outcomes if outcome["ok"]]
+    errors: Dict[str, int] = {}
+    for outcome in outcomes:
+        if not outcome["ok"]:
+            errors[outcome["error"][:200]] = errors.get(outcome["error"][:200], 0) + 1
+
+    print(json.dumps({
+        "concurrency": args.concurrency,
+        "calls": len(call_ids),
+        "succeeded": len(succeeded),
+        "errors": errors,
+        "wall_seconds": rounded(wall),
+        "throughput_calls_per_second": rounded(len(succeeded) / wall if wall else None),
+        "end_to_end_seconds": summarize([outcome["seconds"] for outcome in succeeded]),
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stage_ms.items())},
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_at_start_mb": rss_before,
+    }))
+
+
+def bench_store(results_dir: str, sizes: List[int], samples: int, seed: int = 7) -> Dict[str, Any]:
+    """Median cost of the call store operations the pipeline and dashboard use, per history size."""
+    sys.path.insert(0, API_DIR)
+    from call_store import CallStore  # pylint: disable=import-error
+
+    with open(os.path.join(results_dir, "retell_calls.json"), "r", encoding="utf-8") as file:
+        templates = list(((json.load(file) or {}).get("calls") or {}).values())
+    rng = random.Random(seed)
+    report = {}
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix=f"bench_store_{size}_")
+        try:
+            store = CallStore(os.path.join(workdir, "calls.db"))
+            call_ids = [f"call_bench_{index:07d}" for index in range(size)]
+            with store.transaction() as txn:
+                for index, call_id in enumerate(call_ids):
+                    entry = dict(templates[index % len(templates)], call_id=call_id)
+                    entry["start_timestamp"] = 1_700_000_000_000 + index * 60_000
+                    txn.put(call_id, entry)
+
+            def timed(function, repeat: int) -> float:
+                durations = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    function()
+                    durations.append(time.perf_counter() - started)
+                return round(statistics.median(durations) * 1000, 4)
+
+            def update() -> None:
+                call_id = rng.choice(call_ids)
+                with store.transaction() as txn:
+                    entry = txn.get(call_id)
+                    entry["last_updated"] = "2025-01-01T00:00:00Z"
+                    txn.put(call_id, entry)
+
+            report[str(size)] = {
+                "get_ms": timed(lambda: store.get(rng.choice(call_ids)), samples),
+                "update_ms": timed(update, samples),
+                "load_all_ms": timed(store.load_all, max(3, samples // 20)),
+                "db_mb": round(os.path.getsize(store.db_path) / (1024 * 1024), 2),
+            }
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Any, baseline: Any, path: str = "") -> Dict[str, str]:
+    """Relative change of every numeric leaf present in both reports."""
+    changes: Dict[str, str] = {}
+    if isinstance(report, dict) and isinstance(baseline, dict):
+        for key in report:
+            if key in baseline and key not in {"environment", "config"}:
+                changes.update(compare(report[key], baseline[key], f"{path}.{key}" if path else key))
+    elif isinstance(report, (int, float)) and isinstance(baseline, (int, float)) and not isinstance(report, bool):
+        if baseline:
+            changes[path] = f"{(report - baseline) / baseline * 100:+.1f}%"
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results-dir", default=os.path.join(API_DIR, "retell_results"))
+    parser.add_argument("--concurrency", default="1,4,8", help="comma separated concurrency levels")
+    parser.add_argument("--calls", type=int, default=0, help="replay only the first N calls (0 = all)")
+    add_fake_arguments(parser)
+    parser.add_argument("--history-sizes", default="100,1000,10000", help="call store sizes to time")
+    parser.add_argument("--store-samples", type=int, default=200)
+    parser.add_argument("--output", help="write the report to this file as well as stdout")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--recording-base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.results_dir = os.path.abspath(args.results_dir)
+
+    if args.worker:
+        args.concurrency = int(args.concurrency)
+        worker(args)
+        return
+
+    levels = [int(value) for value in args.concurrency.split(",") if value.strip()]
+    fakes = start_fakes(args)
+    try:
+        pipeline = [run_level(args, fakes, level) for level in levels]
+        requests = fake_stats(fakes)
+    finally:
+        stop_fakes(fakes)
+
+    report = {
+        "environment": {
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in {"worker", "recording_base_url", "output", "baseline"}
+        },
+        "pipeline": {str(level["concurrency"]): level for level in pipeline},
+        "fake_requests": requests,
+        "store": bench_store(
+            args.results_dir, [int(value) for value in args.history_sizes.split(",") if value.strip()], args.store_samples,
+        ),
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            report["change_vs_baseline"] = compare(report, json.load(file))
+
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(rendered + "\n")
+    print(rendered)
+
+
+if __name__ == "__main__":
+    main()
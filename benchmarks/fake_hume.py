@@ -0,0 +1,202 @@
+"""
+Local stand-in for the Hume batch API the pipeline uses.
+
+Jobs accept the uploaded channel files, report IN_PROGRESS until
+``FAKE_HUME_JOB_SECONDS`` have passed and then COMPLETED. Predictions for a
+file named like a stored analysis (``call_..._user.wav``) are rebuilt from
+that analysis the way bench_extraction.py does; any other file gets a
+deterministic synthetic distribution every few seconds of its audio.
+``FAKE_HUME_SECONDS_PER_AUDIO_MINUTE`` adds job time in proportion to the
+longest file, like Hume's own turnaround. ``FAKE_HUME_LATENCY_MS`` delays
+every request.
+
+    uvicorn --app-dir benchmarks fake_hume:app --port 8902
+    HUME_API_BASE_URL=http://127.0.0.1:8902 HUME_API_KEY=test python api/api_server.py
+"""
+import asyncio
+import hashlib
+import io
+import os
+import random
+import time
+import uuid
+import wave
+from functools import lru_cache
+from typing import Dict, Any, List
+
+try:
+    import soundfile
+except (ImportError, OSError):
+    soundfile = None
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from bench_extraction import API_DIR, HUME_EMOTION_NAMES, build_prediction_payloads
+
+app = FastAPI(title="Fake Hume")
+
+RESULTS_DIR = os.getenv("FAKE_HUME_RESULTS_DIR", os.path.join(API_DIR, "retell_results"))
+LATENCY_SECONDS = float(os.getenv("FAKE_HUME_LATENCY_MS", "0")) / 1000
+JOB_SECONDS = float(os.getenv("FAKE_HUME_JOB_SECONDS", "1"))
+SECONDS_PER_AUDIO_MINUTE = float(os.getenv("FAKE_HUME_SECONDS_PER_AUDIO_MINUTE", "0"))
+SYNTHETIC_SEGMENT_SECONDS = 4.0
+
+_JOBS: Dict[str, Dict[str, Any]] = {}
+STATS = {"jobs": 0, "status_polls": 0, "prediction_requests": 0, "files": 0}
+
+
+@lru_cache(maxsize=1)
+def _recorded_predictions() -> Dict[str, Dict[str, Any]]:
+    recorded: Dict[str, Dict[str, Any]] = {}
+    for payload in build_prediction_payloads(RESULTS_DIR):
+        for item in payload:
+            recorded[item["source"]["filename"]] = item
+    return recorded
+
+
+def _audio_seconds(content: bytes) -> float:
+    try:
+        with wave.open(io.BytesIO(content), "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate() or 1)
+    except (wave.Error, EOFError):
+        pass
+    if soundfile is not None:
+        # FLAC and the other formats libsndfile reads
+        try:
+            return soundfile.info(io.BytesIO(content)).duration
+        except RuntimeError:
+            pass
+    return 0.0
+
+
+def _synthetic_models(filename: str, seconds: float) -> Dict[str, Any]:
+    rng = random.Random(os.path.splitext(filename)[0])
+    items = []
+    begin = 0.0
+    while begin < seconds:
+        end = min(begin + SYNTHETIC_SEGMENT_SECONDS, seconds)
+        items.append({
+            "time": {"begin": round(begin, 2), "end": round(end, 2)},
+            "text": "",
+            "emotions": [{"name": name, "score": rng.random()} for name in HUME_EMOTION_NAMES],
+        })
+        begin = end
+    return {"prosody": {"grouped_predictions": [{"id": "unknown", "predictions": items}]}}
+
+
+def _models_for(filename: str, seconds: float) -> Dict[str, Any]:
+    recorded = _recorded_predictions()
+    # A channel re-encoded for upload (call_..._user.flac) still replays its recorded analysis
+    recorded = recorded.get(filename) or recorded.get(os.path.splitext(filename)[0] + ".wav")
+    if recorded is None:
+        models = _synthetic_models(filename, seconds)
+    else:
+        models = recorded["results"]["predictions"][0]["models"]
+    # The SDK requires burst descriptions and the grouped-prediction metadata keys
+    shaped = {}
+    for source, model in models.items():
+        groups = []
+        for group in model["grouped_predictions"]:
+            predictions = [
+                {**prediction, "descriptions": []} if source == "burst" else prediction
+                for prediction in group["predictions"]
+            ]
+            groups.append({"id": group["id"], "predictions": predictions})
+        shaped[source] = {"metadata": None, "grouped_predictions": groups}
+    return shaped
+
+
+def _state(job: Dict[str, Any]) -> Dict[str, Any]:
+    now_ms = int(time.time() * 1000)
+    created_ms = job["created_ms"]
+    if now_ms < job["ready_ms"]:
+        return {"status": "IN_PROGRESS", "created_timestamp_ms": created_ms, "started_timestamp_ms": created_ms}
+    return {
+        "status": "COMPLETED",
+        "created_timestamp_ms": created_ms,
+        "started_timestamp_ms": created_ms,
+        "ended_timestamp_ms": job["ready_ms"],
+        "num_predictions": len(job["files"]),
+        "num_errors": 0,
+    }
+
+
+async def _delay() -> None:
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+
+
+@app.post("/v0/batch/jobs")
+async def start_job(request: Request):
+    await _delay()
+    form = await request.form()
+    files: List[Dict[str, Any]] = []
+    for key, value in form.multi_items():
+        if key != "file" or not hasattr(value, "read"):
+            continue
+        content = await value.read()
+        files.append({
+            "filename": value.filename,
+            "content_type": value.content_type,
+            "md5sum": hashlib.md5(content).hexdigest(),
+            "seconds": _audio_seconds(content),
+        })
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    STATS["jobs"] += 1
+    STATS["files"] += len(files)
+    job_id = str(uuid.uuid4())
+    created_ms = int(time.time() * 1000)
+    job_seconds = JOB_SECONDS + SECONDS_PER_AUDIO_MINUTE * max(file["seconds"] for file in files) / 60
+    _JOBS[job_id] = {"files": files, "created_ms": created_ms, "ready_ms": created_ms + int(job_seconds * 1000)}
+    return JSONResponse(content={"job_id": job_id})
+
+
+@app.get("/v0/batch/jobs/{job_id}")
+async def job_details(job_id: str):
+    await _delay()
+    job = _JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No such job")
+    STATS["status_polls"] += 1
+    return JSONResponse(content={
+        "type": "INFERENCE",
+        "job_id": job_id,
+        "request": {
+            "models": {"prosody": {}, "burst": {}},
+            "files": [{key: file[key] for key in ("filename", "content_type", "md5sum")} for file in job["files"]],
+        },
+        "state": _state(job),
+    })
+
+
+@app.get("/v0/batch/jobs/{job_id}/predictions")
+async def job_predictions(job_id: str):
+    await _delay()
+    job = _JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No such job")
+    if _state(job)["status"] != "COMPLETED":
+        raise HTTPException(status_code=400, detail="Job is not complete")
+    STATS["prediction_requests"] += 1
+    return JSONResponse(content=[
+        {
+            "source": {
+                "type": "file",
+                "filename": file["filename"],
+                "content_type": file["content_type"],
+                "md5sum": file["md5sum"],
+            },
+            "results": {
+                "predictions": [{"file": file["filename"], "models": _models_for(file["filename"], file["seconds"])}],
+                "errors": [],
+            },
+        }
+        for file in job["files"]
+    ])
+
+
+@app.get("/stats")
+async def stats():
+    return JSONResponse(content=STATS)
@@ -0,0 +1,200 @@
+"""
+Local stand-in for the parts of the OpenAI API the server uses.
+
+Chat completions answer instantly with canned, deterministic content shaped
+like each helper expects (summary text, outcome JSON, short title/purpose
+labels or the combined JSON object). Files and Batches accept JSONL
+uploads and complete a batch on its first status poll, so batch backfills
+can be exercised end to end:
+
+    uvicorn --app-dir benchmarks fake_openai:app --port 8901
+    OPENAI_BASE_URL=http://127.0.0.1:8901/v1 OPENAI_API_KEY=test python api/api_server.py
+
+``FAKE_OPENAI_LATENCY_MS`` delays every chat completion to mimic the real API.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import time
+from typing import Dict, Any, List
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+app = FastAPI(title="Fake OpenAI")
+
+_FILES: Dict[str, Dict[str, Any]] = {}
+_BATCHES: Dict[str, Dict[str, Any]] = {}
+_IDS = itertools.count(1)
+STATS = {"chat_completions": 0, "batches": 0, "batch_requests": 0}
+LATENCY_SECONDS = float(os.getenv("FAKE_OPENAI_LATENCY_MS", "0")) / 1000
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{next(_IDS)}"
+
+
+def _reply_content(body: Dict[str, Any]) -> str:
+    messages: List[Dict[str, Any]] = body.get("messages") or []
+    prompt = "\n".join(str(message.get("content") or "") for message in messages)
+    digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+    label = ("positive", "neutral", "negative")[digest % 3]
+    outcome = {"positive": "success", "neutral": "pending", "negative": "unsuccessful"}[label]
+    summary = f"Customer sounds {label} overall; the agent explains next steps and the call ends {outcome}."
+
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps({
+            "summary": summary,
+            "overall_emotion": label,
+            "call_outcome": outcome,
+            "confidence": 0.7,
+            "reasoning": "Canned reply from the local stand-in.",
+            "title": "Follow Up",
+            "purpose": "Program Inquiry",
+        })
+    if "overall_emotion" in prompt and "call_outcome" in prompt:
+        return json.dumps({
+            "overall_emotion": label,
+            "call_outcome": outcome,
+            "confidence": 0.7,
+            "reasoning": "Canned reply from the local stand-in.",
+        })
+    if "purpose" in prompt.lower() and (body.get("max_tokens") or 0) <= 16:
+        return "Program Inquiry"
+    if (body.get("max_tokens") or 0) <= 16:
+        return "Follow Up"
+    return summary
+
+
+def _completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    content = _reply_content(body)
+    prompt_chars = sum(len(str(message.get("content") or "")) for message in body.get("messages") or [])
+    return {
+        "id": _new_id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model") or "gpt-4o",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": prompt_chars // 4 + len(content) // 4,
+        },
+    }
+
+
+def _file_object(file_id: str) -> Dict[str, Any]:
+    stored = _FILES[file_id]
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(stored["content"]),
+        "created_at": stored["created_at"],
+        "filename": stored["filename"],
+        "purpose": stored["purpose"],
+        "status": "processed",
+    }
+
+
+def _store_file(filename: str, purpose: str, content: bytes) -> str:
+    file_id = _new_id("file")
+    _FILES[file_id] = {
+        "filename": filename,
+        "purpose": purpose,
+        "content": content,
+        "created_at": int(time.time()),
+    }
+    return file_id
+
+
+def _run_batch(batch: Dict[str, Any]) -> None:
+    lines = []
+    for raw in _FILES[batch["input_file_id"]]["content"].decode("utf-8").splitlines():
+        if not raw.strip():
+            continue
+        request = json.loads(raw)
+        lines.append(json.dumps({
+            "id": _new_id("batch_req"),
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "request_id": _new_id("req"), "body": _completion(request["body"])},
+            "error": None,
+        }))
+        STATS["batch_requests"] += 1
+    batch["output_file_id"] = _store_file(f"{batch['id']}_output.jsonl", "batch_output", ("\n".join(lines) + "\n").encode("utf-8"))
+    batch["status"] = "completed"
+    batch["completed_at"] = int(time.time())
+    batch["request_counts"] = {"total": len(lines), "completed": len(lines), "failed": 0}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    STATS["chat_completions"] += 1
+    body = await request.json()
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    return JSONResponse(content=_completion(body))
+
+
+@app.post("/v1/files")
+async def create_file(file: UploadFile = File(...), purpose: str = Form(...)):
+    file_id = _store_file(file.filename or "upload.jsonl", purpose, await file.read())
+    return JSONResponse(content=_file_object(file_id))
+
+
+@app.get("/v1/files/{file_id}/content")
+async def file_content(file_id: str):
+    if file_id not in _FILES:
+        raise HTTPException(status_code=404, detail="No such file")
+    return PlainTextResponse(_FILES[file_id]["content"].decode("utf-8"))
+
+
+@app.post("/v1/batches")
+async def create_batch(request: Request):
+    body = await request.json()
+    if body.get("input_file_id") not in _FILES:
+        raise HTTPException(status_code=400, detail="Unknown input_file_id")
+    STATS["batches"] += 1
+    batch = {
+        "id": _new_id("batch"),
+        "object": "batch",
+        "endpoint": body.get("endpoint"),
+        "input_file_id": body["input_file_id"],
+        "completion_window": body.get("completion_window"),
+        "status": "in_progress",
+        "created_at": int(time.time()),
+        "metadata": body.get("metadata"),
+        "output_file_id": None,
+        "error_file_id": None,
+    }
+    _BATCHES[batch["id"]] = batch
+    return JSONResponse(content=batch)
+
+
+@app.get("/v1/batches/{batch_id}")
+async def retrieve_batch(batch_id: str):
+    batch = _BATCHES.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="No such batch")
+    if batch["status"] == "in_progress":
+        _run_batch(batch)
+    return JSONResponse(content=batch)
+
+
+@app.post("/v1/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str):
+    batch = _BATCHES.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="No such batch")
+    batch["status"] = "cancelled"
+    return JSONResponse(content=batch)
+
+
+@app.get("/stats")
+async def stats():
+    return JSONResponse(content=STATS)
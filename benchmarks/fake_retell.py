@@ -0,0 +1,181 @@
+"""
+Local stand-in for the Retell endpoints the pipeline calls.
+
+``GET /v2/get-call/{call_id}`` answers with the call as stored in
+api/retell_results (retell_calls.json entry, analysis metadata and the
+stored transcript segments rebuilt into Retell's ``transcript_object``);
+its ``recording_multi_channel_url`` points back at this server, which
+serves the recorded user and agent channels interleaved into one stereo
+WAV. ``FAKE_RETELL_LATENCY_MS`` delays every request.
+
+    uvicorn --app-dir benchmarks fake_retell:app --port 8903
+    RETELL_API_BASE_URL=http://127.0.0.1:8903 RETELL_API_KEY=test python api/api_server.py
+"""
+import asyncio
+import glob
+import io
+import json
+import os
+import wave
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+
+try:
+    import audioop  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - fallback for Python>=3.13
+    from audioop_lts import audioop  # type: ignore
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+
+app = FastAPI(title="Fake Retell")
+
+RESULTS_DIR = os.getenv("FAKE_RETELL_RESULTS_DIR", os.path.join(API_DIR, "retell_results"))
+AUDIO_DIR = os.path.join(RESULTS_DIR, "audio")
+LATENCY_SECONDS = float(os.getenv("FAKE_RETELL_LATENCY_MS", "0")) / 1000
+
+STATS = {"get_call": 0, "recordings": 0}
+
+
+def replayable_call_ids(results_dir: str = RESULTS_DIR) -> List[str]:
+    """Calls with both recorded channels and a stored analysis."""
+    audio_dir = os.path.join(results_dir, "audio")
+    call_ids = []
+    for path in sorted(glob.glob(os.path.join(results_dir, "call_*.json"))):
+        call_id = os.path.splitext(os.path.basename(path))[0]
+        if all(os.path.exists(os.path.join(audio_dir, f"{call_id}_{channel}.wav")) for channel in ("user", "agent")):
+            call_ids.append(call_id)
+    return call_ids
+
+
+@lru_cache(maxsize=1)
+def stored_call_entries() -> Dict[str, Dict[str, Any]]:
+    path = os.path.join(RESULTS_DIR, "retell_calls.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return (json.load(file) or {}).get("calls") or {}
+
+
+@lru_cache(maxsize=None)
+def _stored_analysis(call_id: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(RESULTS_DIR, f"{call_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _transcript_object(stored: Dict[str, Any]) -> List[Dict[str, Any]]:
+    for result in stored.get("analysis") or []:
+        segments = (result.get("metadata") or {}).get("retell_transcript_segments")
+        if segments:
+            return [
+                {
+                    "role": "agent" if segment.get("speaker") == "Agent" else "user",
+                    "content": segment.get("text") or "",
+                    "start": segment.get("start"),
+                    "end": segment.get("end"),
+                }
+                for segment in segments
+            ]
+    return []
+
+
+def build_call(call_id: str, base_url: str) -> Optional[Dict[str, Any]]:
+    """The get-call response for a stored call, or None when it is unknown."""
+    stored = _stored_analysis(call_id)
+    entry = stored_call_entries().get(call_id)
+    if stored is None and entry is None:
+        return None
+    stored = stored or {}
+    retell_metadata = stored.get("retell_metadata") or {}
+    agent = retell_metadata.get("agent") or {}
+    customer = retell_metadata.get("customer") or {}
+    call: Dict[str, Any] = {
+        "call_id": call_id,
+        "call_status": "ended",
+        "agent_id": agent.get("id"),
+        "agent_name": agent.get("name"),
+        "agent_version": agent.get("version"),
+        "start_timestamp": retell_metadata.get("start_timestamp"),
+        "end_timestamp": retell_metadata.get("end_timestamp"),
+        "duration_ms": retell_metadata.get("duration_ms"),
+        "retell_llm_dynamic_variables": {key: value for key, value in customer.items() if value is not None},
+    }
+    for key, value in (entry or {}).items():
+        if key in {"agent_id", "agent_name", "start_timestamp", "end_timestamp", "duration_ms", "user_phone_number"} and value is not None:
+            call[key] = value
+    transcript_object = _transcript_object(stored)
+    call["transcript_object"] = transcript_object
+    call["transcript"] = "\n".join(
+        f"{'Agent' if item['role'] == 'agent' else 'User'}: {item['content']}" for item in transcript_object
+    )
+    call["call_analysis"] = {
+        "call_summary": (entry or {}).get("call_summary") or "",
+        "in_voicemail": False,
+    }
+    call["disconnection_reason"] = "user_hangup"
+    call["recording_multi_channel_url"] = f"{base_url.rstrip('/')}/recordings/{call_id}.wav"
+    return call
+
+
+@lru_cache(maxsize=64)
+def stereo_recording(call_id: str) -> bytes:
+    """Interleave the recorded user (left) and agent (right) channels into one WAV."""
+    channels = []
+    for channel in ("user", "agent"):
+        with wave.open(os.path.join(AUDIO_DIR, f"{call_id}_{channel}.wav"), "rb") as wav:
+            channels.append((wav.getparams(), wav.readframes(wav.getnframes())))
+    (user_params, user_frames), (agent_params, agent_frames) = channels
+    width = user_params.sampwidth
+    if agent_params.sampwidth != width:
+        agent_frames = audioop.lin2lin(agent_frames, agent_params.sampwidth, width)
+    if agent_params.framerate != user_params.framerate:
+        agent_frames, _ = audioop.ratecv(agent_frames, width, 1, agent_params.framerate, user_params.framerate, None)
+    length = max(len(user_frames), len(agent_frames))
+    user_frames = user_frames.ljust(length, b"\x00")
+    agent_frames = agent_frames.ljust(length, b"\x00")
+    stereo = audioop.add(
+        audioop.tostereo(user_frames, width, 1, 0),
+        audioop.tostereo(agent_frames, width, 0, 1),
+        width,
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(2)
+        out.setsampwidth(width)
+        out.setframerate(user_params.framerate)
+        out.writeframes(stereo)
+    return buffer.getvalue()
+
+
+async def _delay() -> None:
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+
+
+@app.get("/v2/get-call/{call_id}")
+async def get_call(call_id: str, request: Request):
+    await _delay()
+    call = build_call(call_id, str(request.base_url))
+    if call is None:
+        raise HTTPException(status_code=404, detail="Call not found")
+    STATS["get_call"] += 1
+    return JSONResponse(content=call)
+
+
+@app.get("/recordings/{call_id}.wav")
+async def recording(call_id: str):
+    await _delay()
+    if not all(os.path.exists(os.path.join(AUDIO_DIR, f"{call_id}_{channel}.wav")) for channel in ("user", "agent")):
+        raise HTTPException(status_code=404, detail="Recording not found")
+    STATS["recordings"] += 1
+    return Response(content=stereo_recording(call_id), media_type="audio/wav")
+
+
+@app.get("/stats")
+async def stats():
+    return JSONResponse(content=STATS)
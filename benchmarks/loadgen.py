@@ -0,0 +1,437 @@
+"""
+Synthetic webhook and dashboard load against the API as the call store grows.
+
+For each store size in ``--sizes`` the store is first filled to that many
+calls, then a fixed-length measurement window sends open-loop (Poisson)
+traffic at the configured rates:
+
+* ``POST /retell/webhook`` with ``call_analyzed`` events for new calls, in
+  the three shapes ``_normalize_retell_payload`` accepts (``{"event",
+  "call"}``, call fields at the top level, and the n8n ``{"body": ...}``
+  wrapper) plus a share of redelivered duplicates;
+* ``GET /retell/calls`` as the dashboard list;
+* ``GET /retell/calls/{call_id}/analysis`` polls for analysed calls and for
+  calls that were just registered.
+
+Payloads are built from the calls stored in api/retell_results with fresh
+ids and timestamps. Latency is measured from each request's scheduled
+send time, so a server that falls behind shows up in the percentiles
+instead of silently lowering the offered rate.
+
+By default the API is started locally on an empty results directory with
+Hume, Retell and OpenAI replaced by the fakes, and the store is filled by
+writing stored-shape entries straight into its database (``--fill
+direct``). With ``--base-url`` an already running server is used and the
+store is filled through the webhook (``--fill webhook``).
+
+    python benchmarks/loadgen.py --sizes 10,100,1000,10000,100000 --output load.json
+    python benchmarks/loadgen.py --base-url http://localhost:8000 --sizes 10,100 --fill webhook
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+from bench_pipeline import (
+    API_DIR, add_fake_arguments, compare, free_port, git_commit, rounded,
+    start_fakes, stop_fakes, summarize, worker_env,
+)
+from fake_retell import build_call, stored_call_entries
+
+PAYLOAD_FORMATS = ("call", "flat", "n8n")
+ENDPOINTS = ("webhook", "list_calls", "poll_analysis")
+
+
+def synthetic_call_id(seed: int, index: int) -> str:
+    """Retell-shaped id (``call_`` plus 27 hex digits), stable for a seed."""
+    return "call_" + hashlib.sha1(f"loadgen-{seed}-{index}".encode()).hexdigest()[:27]
+
+
+class PayloadFactory:
+    """Realistic ``call_analyzed`` payloads cloned from the stored calls."""
+
+    def __init__(self, recording_base_url: str, formats: List[str], seed: int):
+        self.templates = [
+            call for call in (build_call(call_id, recording_base_url) for call_id in sorted(stored_call_entries()))
+            if call and (call.get("duration_ms") or 0) > 0
+        ]
+        if not self.templates:
+            raise RuntimeError("No stored calls to build payloads from")
+        self.formats = formats
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.sent: List[Dict[str, Any]] = []
+        self._next_index = 0
+
+    def new_call(self) -> Dict[str, Any]:
+        index = self._next_index
+        self._next_index += 1
+        template = self.templates[index % len(self.templates)]
+        call_id = synthetic_call_id(self.seed, index)
+        duration_ms = int(template["duration_ms"] * self.rng.uniform(0.8, 1.2))
+        start_ms = int(time.time() * 1000) - self.rng.randint(duration_ms, 3_600_000)
+        base_url = template["recording_multi_channel_url"].rsplit("/", 1)[0]
+        return dict(
+            template,
+            call_id=call_id,
+            start_timestamp=start_ms,
+            end_timestamp=start_ms + duration_ms,
+            duration_ms=duration_ms,
+            recording_multi_channel_url=f"{base_url}/{call_id}.wav",
+        )
+
+    def wrap(self, call: Dict[str, Any], index: int) -> Dict[str, Any]:
+        shape = self.formats[index % len(self.formats)]
+        if shape == "call":
+            return {"event": "call_analyzed", "call": call}
+        if shape == "flat":
+            return {"event": "call_analyzed", **call}
+        return {"body": {"event": "call_analyzed", **call}}
+
+    def next_payload(self, duplicate_ratio: float = 0.0) -> Tuple[str, Dict[str, Any]]:
+        """(call_id, payload); a share of them redeliver an earlier event unchanged."""
+        if self.sent and self.rng.random() < duplicate_ratio:
+            payload = self.rng.choice(self.sent[-1000:])
+        else:
+            call = self.new_call()
+            payload = self.wrap(call, self._next_index)
+            self.sent.append(payload)
+        body = payload.get("body") or payload
+        return (body.get("call") or body)["call_id"], payload
+
+
+def stored_entries(count: int, start: int, seed: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Call store entries in the shape the API writes them, cloned from retell_calls.json."""
+    templates = [entry for entry in stored_call_entries().values() if (entry.get("duration_ms") or 0) > 0]
+    rng = random.Random(seed + start)
+    entries = []
+    for index in range(start, start + count):
+        template = templates[index % len(templates)]
+        # The first pass keeps the real ids so their analysis files resolve by name
+        call_id = template["call_id"] if index < len(templates) else synthetic_call_id(seed, -1 - index)
+        entry = dict(template, call_id=call_id)
+        offset = rng.randint(0, 180 * 86_400_000)
+        entry["start_timestamp"] = (template.get("start_timestamp") or 1_700_000_000_000) - offset
+        entry["end_timestamp"] = entry["start_timestamp"] + (template.get("duration_ms") or 0)
+        entries.append((call_id, entry))
+    return entries
+
+
+def _metric(text: str, name: str) -> Optional[float]:
+    match = re.search(rf"^{name}(?:{{[^}}]*}})? ([0-9.e+-]+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def _backlog(text: str) -> Dict[str, float]:
+    return {
+        kind: float(value)
+        for kind, value in re.findall(r'^webhook_log_backlog\{kind="([^"]+)"\} ([0-9.e+-]+)$', text, re.MULTILINE)
+    }
+
+
+class LoadRun:
+    def __init__(self, args: argparse.Namespace, base_url: str, store_db: Optional[str]):
+        self.args = args
+        self.base_url = base_url.rstrip("/")
+        self.store = None
+        if store_db:
+            sys.path.insert(0, API_DIR)
+            from call_store import CallStore  # pylint: disable=import-error
+            self.store = CallStore(store_db)
+        recording_base = args.recording_base_url or "https://recordings.invalid"
+        self.payloads = PayloadFactory(recording_base, args.formats, args.seed)
+        self.rng = random.Random(args.seed)
+        self.completed_ids: List[str] = []
+        self.registered_ids: List[str] = []
+        self.seeded = 0
+        self.token = ""
+
+    async def login(self, client: httpx.AsyncClient) -> None:
+        response = await client.post("/auth/login", json={"username": self.args.username, "password": self.args.password})
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+
+    async def stored_calls(self, client: httpx.AsyncClient) -> Tuple[Optional[float], Dict[str, float]]:
+        response = await client.get("/metrics", headers={"Authorization": f"Bearer {self.token}"})
+        response.raise_for_status()
+        return _metric(response.text, "retell_calls_stored"), _backlog(response.text)
+
+    async def fill(self, client: httpx.AsyncClient, target: int) -> Dict[str, Any]:
+        stored, _ = await self.stored_calls(client)
+        missing = max(0, target - int(stored or 0))
+        started = time.perf_counter()
+        errors = 0
+        if self.args.fill == "direct":
+            for offset in range(0, missing, 5000):
+                batch = stored_entries(min(5000, missing - offset), self.seeded, self.args.seed)
+                with self.store.transaction() as txn:
+                    for call_id, entry in batch:
+                        txn.put(call_id, entry)
+                self.seeded += len(batch)
+                self.completed_ids.extend(
+                    call_id for call_id, entry in batch if entry.get("analysis_status") == "completed"
+                )
+        else:
+            remaining = missing
+
+            async def sender() -> None:
+                nonlocal remaining, errors
+                while remaining > 0:
+                    remaining -= 1
+                    call_id, payload = self.payloads.next_payload()
+                    try:
+                        response = await client.post("/retell/webhook", json=payload)
+                        if response.status_code >= 400:
+                            errors += 1
+                        else:
+                            self.registered_ids.append(call_id)
+                    except httpx.HTTPError:
+                        errors += 1
+
+            await asyncio.gather(*(sender() for _ in range(self.args.fill_concurrency)))
+        sent_seconds = time.perf_counter() - started
+        # Webhook-log deployments fold events asynchronously; wait until the store has caught up
+        deadline = time.monotonic() + self.args.settle_timeout
+        while True:
+            stored, backlog = await self.stored_calls(client)
+            if (stored or 0) >= target - errors or time.monotonic() > deadline:
+                break
+            await asyncio.sleep(0.5)
+        return {
+            "mode": self.args.fill,
+            "added": missing,
+            "errors": errors,
+            "seconds": rounded(time.perf_counter() - started),
+            "added_per_second": rounded(missing / sent_seconds if sent_seconds else None),
+        }
+
+    async def _request(self, client: httpx.AsyncClient, endpoint: str) -> Tuple[str, Any]:
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if endpoint == "webhook":
+            call_id, payload = self.payloads.next_payload(self.args.duplicate_ratio)
+            response = await client.post("/retell/webhook", json=payload)
+            if response.status_code < 400:
+                self.registered_ids.append(call_id)
+            return endpoint, response
+        if endpoint == "list_calls":
+            return endpoint, await client.get("/retell/calls", headers=headers)
+        pending = self.registered_ids[-200:]
+        if self.completed_ids and (not pending or self.rng.random() < self.args.poll_completed_ratio):
+            call_id = self.rng.choice(self.completed_ids)
+        elif pending:
+            call_id = self.rng.choice(pending)
+        else:
+            return endpoint, None
+        return endpoint, await client.get(f"/retell/calls/{call_id}/analysis", headers=headers)
+
+    async def measure(self, client: httpx.AsyncClient) -> Dict[str, Any]:
+        """Open-loop Poisson arrivals per endpoint for ``--duration`` seconds."""
+        rates = {"webhook": self.args.webhook_rate, "list_calls": self.args.list_rate, "poll_analysis": self.args.poll_rate}
+        loop = asyncio.get_running_loop()
+        begin = loop.time() + 0.1
+        arrivals: List[Tuple[float, str]] = []
+        for endpoint, rate in rates.items():
+            if rate <= 0:
+                continue
+            moment = begin
+            while True:
+                moment += self.rng.expovariate(rate)
+                if moment >= begin + self.args.duration:
+                    break
+                arrivals.append((moment, endpoint))
+        arrivals.sort()
+
+        latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+        statuses: Dict[str, Dict[str, int]] = {endpoint: {} for endpoint in ENDPOINTS}
+
+        async def fire(scheduled: float, endpoint: str) -> None:
+            try:
+                _, response = await asyncio.wait_for(self._request(client, endpoint), self.args.timeout)
+                if response is None:
+                    return
+                status = str(response.status_code)
+            except (httpx.HTTPError, asyncio.TimeoutError) as exc:
+                status = type(exc).__name__
+            statuses[endpoint][status] = statuses[endpoint].get(status, 0) + 1
+            latencies[endpoint].append((loop.time() - scheduled) * 1000)
+
+        tasks = []
+        for scheduled, endpoint in arrivals:
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(scheduled, endpoint)))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - begin
+
+        report = {}
+        for endpoint in ENDPOINTS:
+            if not rates[endpoint]:
+                continue
+            values = latencies[endpoint]
+            # 404 is the expected answer while a freshly registered call has no analysis yet
+            errors = sum(
+                count for status, count in statuses[endpoint].items()
+                if not status.isdigit() or (int(status) >= 400 and status != "404")
+            )
+            report[endpoint] = {
+                "offered_rate": rates[endpoint],
+                "requests": len(values),
+                "errors": errors,
+                "statuses": dict(sorted(statuses[endpoint].items())),
+                "throughput_per_second": rounded(len(values) / elapsed if elapsed else None),
+                "latency_ms": summarize(values),
+            }
+        return report
+
+    async def run(self) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=self.args.max_connections, max_keepalive_connections=self.args.max_connections)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.args.timeout) as client:
+            await self.login(client)
+            if self.args.fill == "webhook":
+                response = await client.get("/retell/calls", headers={"Authorization": f"Bearer {self.token}"})
+                response.raise_for_status()
+                self.completed_ids = [
+                    call["call_id"] for call in response.json().get("calls") or []
+                    if call.get("analysis_status") == "completed"
+                ]
+            steps = {}
+            for size in self.args.sizes:
+                fill = await self.fill(client, size)
+                stored_before, _ = await self.stored_calls(client)
+                endpoints = await self.measure(client)
+                stored_after, backlog = await self.stored_calls(client)
+                steps[str(size)] = {
+                    "fill": fill,
+                    "stored_calls_before": stored_before,
+                    "stored_calls_after": stored_after,
+                    "webhook_log_backlog_after": backlog,
+                    "endpoints": endpoints,
+                }
+                print(f"size {size}: " + ", ".join(
+                    f"{name} p95={stats['latency_ms']['p95']}ms" for name, stats in endpoints.items()
+                ), file=sys.stderr)
+            return steps
+
+
+def start_api(args: argparse.Namespace, fakes: Dict[str, Any], workdir: str) -> Tuple[subprocess.Popen, str]:
+    env = worker_env(args, fakes, workdir)
+    env["RETELL_WEBHOOK_LOG_ENABLED"] = "true" if args.webhook_log else "false"
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--app-dir", API_DIR, "api_server:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=API_DIR,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            urllib.request.urlopen(f"{base_url}/", timeout=1).read()
+            return process, base_url
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("API server did not start")
+            time.sleep(0.2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="load an already running server instead of starting one")
+    parser.add_argument("--username", default=os.getenv("AUTH_USERNAME", "admin"))
+    parser.add_argument("--password", default=os.getenv("AUTH_PASSWORD", "password"))
+    parser.add_argument("--results-dir", default=os.path.join(API_DIR, "retell_results"))
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000", help="store sizes to measure at")
+    parser.add_argument("--fill", choices=("direct", "webhook"), help="how the store grows (default: direct when local)")
+    parser.add_argument("--fill-concurrency", type=int, default=32)
+    parser.add_argument("--settle-timeout", type=float, default=600, help="seconds to wait for the store to catch up")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of measured traffic per size")
+    parser.add_argument("--webhook-rate", type=float, default=20, help="webhook events per second")
+    parser.add_argument("--list-rate", type=float, default=1, help="dashboard list requests per second")
+    parser.add_argument("--poll-rate", type=float, default=5, help="analysis polls per second")
+    parser.add_argument("--poll-completed-ratio", type=float, default=0.5, help="share of polls for analysed calls")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05, help="share of webhooks that are redeliveries")
+    parser.add_argument("--formats", default=",".join(PAYLOAD_FORMATS), help="webhook payload shapes to rotate through")
+    parser.add_argument("--no-webhook-log", dest="webhook_log", action="store_false",
+                        help="start the local server with RETELL_WEBHOOK_LOG_ENABLED=false")
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the report to this file as well as stdout")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+    args.results_dir = os.path.abspath(args.results_dir)
+    args.sizes = sorted(int(value) for value in args.sizes.split(",") if value.strip())
+    args.formats = [value.strip() for value in args.formats.split(",") if value.strip()]
+    unknown = set(args.formats) - set(PAYLOAD_FORMATS)
+    if unknown:
+        parser.error(f"unknown payload formats: {', '.join(sorted(unknown))}")
+    args.fill = args.fill or ("webhook" if args.base_url else "direct")
+    if args.fill == "direct" and args.base_url:
+        parser.error("--fill direct needs the local server; use --fill webhook with --base-url")
+
+    fakes: Dict[str, Any] = {}
+    server = None
+    workdir = None
+    try:
+        if args.base_url:
+            args.recording_base_url = None
+            run = LoadRun(args, args.base_url, None)
+        else:
+            fakes = start_fakes(args)
+            args.recording_base_url = f"{fakes['retell'][1]}/recordings"
+            workdir = tempfile.mkdtemp(prefix="loadgen_")
+            # Analyses of the stored calls, so polls for completed calls read real files
+            for name in os.listdir(args.results_dir):
+                if name.startswith("call_") and name.endswith(".json"):
+                    shutil.copy(os.path.join(args.results_dir, name), workdir)
+            server, base_url = start_api(args, fakes, workdir)
+            run = LoadRun(args, base_url, os.path.join(workdir, "retell_calls.db"))
+        steps = asyncio.run(run.run())
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if fakes:
+            stop_fakes(fakes)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "environment": {"git_commit": git_commit(), "python": sys.version.split()[0], "target": args.base_url or "local"},
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in {"password", "output", "baseline", "recording_base_url"}
+        },
+        "steps": steps,
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            report["change_vs_baseline"] = compare(report, json.load(file))
+
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(rendered + "\n")
+    print(rendered)
+
+
+if __name__ == "__main__":
+    main()